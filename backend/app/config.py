@@ -13,13 +13,97 @@ class Settings(BaseSettings):
     POSTGRES_HOST: str = os.getenv("POSTGRES_HOST", "disc-post-db.postgres.database.azure.com")
     POSTGRES_PORT: int = int(os.getenv("POSTGRES_PORT", "5432"))
     
+    # Async driver URL, derived from DATABASE_URL when empty
+    ASYNC_DATABASE_URL: str = os.getenv("ASYNC_DATABASE_URL", "")
+    
+    # Connection pool of each engine (the sync and the async engine have one each)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # seconds to wait for a connection
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds before a connection is replaced
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    
     # Google Maps API settings
     GOOGLE_MAPS_API_KEY: str = os.getenv("GOOGLE_MAPS_API_KEY", "")
     
-    # Cache settings for geocoding and distance matrix
-    GEOCODING_CACHE_SIZE: int = int(os.getenv("GEOCODING_CACHE_SIZE", "1000"))
+    # Cache backend for geocoding and distance matrix results
+    # ("memory", "sqlite" shared by the workers on a node, "redis", or "kv-local")
+    CACHE_BACKEND: str = os.getenv("CACHE_BACKEND", "sqlite")
+    CACHE_SQLITE_PATH: str = os.getenv("CACHE_SQLITE_PATH", "/tmp/maps_cache.sqlite3")
+    CACHE_REDIS_URL: str = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+    
+    # Cache settings for geocoding and distance matrix (sizes in bytes of serialized values)
+    GEOCODING_CACHE_MAX_BYTES: int = int(os.getenv("GEOCODING_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
     GEOCODING_CACHE_TTL: int = int(os.getenv("GEOCODING_CACHE_TTL", "86400"))  # 24 hours in seconds
-    DISTANCE_MATRIX_CACHE_SIZE: int = int(os.getenv("DISTANCE_MATRIX_CACHE_SIZE", "10000"))
+    DISTANCE_MATRIX_CACHE_MAX_BYTES: int = int(os.getenv("DISTANCE_MATRIX_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
     DISTANCE_MATRIX_CACHE_TTL: int = int(os.getenv("DISTANCE_MATRIX_CACHE_TTL", "86400"))  # 24 hours
+    
+    # Expired geocoding and distance matrix entries are still served for this
+    # long while they are refreshed in the background
+    CACHE_STALE_TTL: int = int(os.getenv("CACHE_STALE_TTL", "604800"))  # 7 days
+    
+    # Scheduled refresh of frequently used cache entries before they go stale
+    CACHE_REFRESH_INTERVAL: int = int(os.getenv("CACHE_REFRESH_INTERVAL", "300"))  # seconds between runs
+    CACHE_REFRESH_AHEAD: int = int(os.getenv("CACHE_REFRESH_AHEAD", "3600"))  # refresh entries going stale within this
+    CACHE_REFRESH_MIN_HITS: int = int(os.getenv("CACHE_REFRESH_MIN_HITS", "3"))
+    CACHE_REFRESH_MAX_KEYS: int = int(os.getenv("CACHE_REFRESH_MAX_KEYS", "200"))  # per run
+    CACHE_REFRESH_TRACKED_KEYS: int = int(os.getenv("CACHE_REFRESH_TRACKED_KEYS", "10000"))
+    CACHE_REFRESH_WORKERS: int = int(os.getenv("CACHE_REFRESH_WORKERS", "2"))
+    
+    # Pooled HTTP connections used by the async Google Maps client
+    MAPS_HTTP_MAX_CONNECTIONS: int = int(os.getenv("MAPS_HTTP_MAX_CONNECTIONS", "20"))
+    MAPS_HTTP_MAX_KEEPALIVE: int = int(os.getenv("MAPS_HTTP_MAX_KEEPALIVE", "10"))
+    MAPS_HTTP_TIMEOUT: float = float(os.getenv("MAPS_HTTP_TIMEOUT", "10"))  # seconds per call
+    
+    # Google API quota shared by all workers ("local" or "sqlite" store)
+    QUOTA_BACKEND: str = os.getenv("QUOTA_BACKEND", "sqlite")
+    QUOTA_STORE_PATH: str = os.getenv("QUOTA_STORE_PATH", "/tmp/maps_quota.sqlite3")
+    GOOGLE_MAPS_REQUESTS_PER_SECOND: float = float(os.getenv("GOOGLE_MAPS_REQUESTS_PER_SECOND", "50"))
+    GOOGLE_MAPS_ELEMENTS_PER_SECOND: float = float(os.getenv("GOOGLE_MAPS_ELEMENTS_PER_SECOND", "1000"))
+    QUOTA_BATCH_RESERVE: float = float(os.getenv("QUOTA_BATCH_RESERVE", "0.2"))  # fraction kept for interactive calls
+    QUOTA_MAX_WAIT: float = float(os.getenv("QUOTA_MAX_WAIT", "30"))  # seconds
+    MAPS_MAX_RETRIES: int = int(os.getenv("MAPS_MAX_RETRIES", "4"))
+    MAPS_RETRY_BASE_DELAY: float = float(os.getenv("MAPS_RETRY_BASE_DELAY", "0.5"))  # seconds
+    MAPS_CALL_DEADLINE: float = float(os.getenv("MAPS_CALL_DEADLINE", "60"))  # seconds per call including quota waits and retries
+    
+    # Predictive distance matrix warm-up for upcoming planning runs
+    MATRIX_WARMUP_ENABLED: bool = os.getenv("MATRIX_WARMUP_ENABLED", "true").lower() == "true"
+    MATRIX_WARMUP_INTERVAL: int = int(os.getenv("MATRIX_WARMUP_INTERVAL", "900"))  # seconds between runs
+    MATRIX_WARMUP_OFFPEAK_START: int = int(os.getenv("MATRIX_WARMUP_OFFPEAK_START", "20"))  # hour of day
+    MATRIX_WARMUP_OFFPEAK_END: int = int(os.getenv("MATRIX_WARMUP_OFFPEAK_END", "6"))  # hour of day
+    MATRIX_WARMUP_ELEMENTS_PER_HOUR: int = int(os.getenv("MATRIX_WARMUP_ELEMENTS_PER_HOUR", "20000"))
+    MATRIX_WARMUP_ORDER_DAYS: int = int(os.getenv("MATRIX_WARMUP_ORDER_DAYS", "2"))  # today and yesterday
+    
+    # Batch geocoding limits
+    GEOCODING_BATCH_CONCURRENCY: int = int(os.getenv("GEOCODING_BATCH_CONCURRENCY", "8"))
+    GEOCODING_RATE_LIMIT: float = float(os.getenv("GEOCODING_RATE_LIMIT", "40"))  # requests per second
+    
+    # Address autocomplete: local results needed before Google is asked, and
+    # the short-lived cache for Google's prefix responses
+    AUTOCOMPLETE_MIN_LOCAL_RESULTS: int = int(os.getenv("AUTOCOMPLETE_MIN_LOCAL_RESULTS", "3"))
+    AUTOCOMPLETE_CACHE_MAX_BYTES: int = int(os.getenv("AUTOCOMPLETE_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+    AUTOCOMPLETE_CACHE_TTL: int = int(os.getenv("AUTOCOMPLETE_CACHE_TTL", "300"))  # 5 minutes
+    
+    # Maximum points per series in analytics time series, larger series are downsampled
+    ANALYTICS_MAX_POINTS: int = int(os.getenv("ANALYTICS_MAX_POINTS", "500"))
+    
+    # Cached analytics responses, invalidated by the analytics data version
+    ANALYTICS_CACHE_MAX_BYTES: int = int(os.getenv("ANALYTICS_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+    ANALYTICS_CACHE_TTL: int = int(os.getenv("ANALYTICS_CACHE_TTL", "300"))  # 5 minutes
+    
+    # Background rebuild of the rollups of changed days; disable when
+    # rebuild_analytics_rollups.py --pending runs from cron instead
+    ANALYTICS_ROLLUP_REFRESH_ENABLED: bool = os.getenv("ANALYTICS_ROLLUP_REFRESH_ENABLED", "true").lower() == "true"
+    ANALYTICS_ROLLUP_REFRESH_INTERVAL: int = int(os.getenv("ANALYTICS_ROLLUP_REFRESH_INTERVAL", "60"))  # seconds
+    
+    # Monthly partitions created ahead of time (see manage_partitions.py)
+    PARTITION_MONTHS_AHEAD: int = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+    
+    # Orders validated and inserted per transaction by the bulk order import
+    ORDER_IMPORT_CHUNK_SIZE: int = int(os.getenv("ORDER_IMPORT_CHUNK_SIZE", "1000"))
+    
+    # Travel time correction model fitted from route history
+    TRAVEL_TIME_CORRECTION_PATH: str = os.getenv("TRAVEL_TIME_CORRECTION_PATH", "travel_time_correction.json")
+    TRAVEL_TIME_TRAFFIC_MAX_AGE: int = int(os.getenv("TRAVEL_TIME_TRAFFIC_MAX_AGE", "900"))  # seconds traffic durations are used uncorrected
 
 settings = Settings() 
\ No newline at end of file
@@ -1,4 +1,6 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from .config import settings
@@ -7,14 +9,74 @@ import urllib.parse
 # Parse the database URL to add SSL requirements if needed
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 
+# Async drivers used in place of the sync ones
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def _pool_options(url: str) -> dict:
+    """
+    Connection pool settings; SQLite keeps the pool SQLAlchemy picks for it
+    """
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+def _async_url() -> tuple:
+    """
+    Async driver URL and connect arguments for DATABASE_URL
+
+    asyncpg does not accept the libpq sslmode option, so it is turned into
+    its ssl argument.
+
+    Raises:
+        ValueError: If DATABASE_URL has no async driver and ASYNC_DATABASE_URL is not set
+    """
+    if settings.ASYNC_DATABASE_URL:
+        url = make_url(settings.ASYNC_DATABASE_URL)
+    else:
+        url = make_url(SQLALCHEMY_DATABASE_URL)
+        backend = url.get_backend_name()
+        if backend not in ASYNC_DRIVERS:
+            raise ValueError(f"No async driver known for {backend} databases, set ASYNC_DATABASE_URL")
+        url = url.set(drivername=ASYNC_DRIVERS[backend])
+    connect_args = {}
+    if url.drivername == "postgresql+asyncpg":
+        sslmode = url.query.get("sslmode")
+        url = url.difference_update_query(["sslmode"])
+        if "azure" in settings.POSTGRES_HOST or sslmode in ("require", "verify-ca", "verify-full"):
+            connect_args["ssl"] = "require"
+    return url, connect_args
+
 # Create engine with SSL configurations for Azure PostgreSQL
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
-    connect_args={"sslmode": "require"} if "azure" in settings.POSTGRES_HOST else {}
+    connect_args={"sslmode": "require"} if "azure" in settings.POSTGRES_HOST else {},
+    **_pool_options(SQLALCHEMY_DATABASE_URL)
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for routes that should not hold a threadpool thread while
+# waiting on the database
+ASYNC_DATABASE_URL, _async_connect_args = _async_url()
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    connect_args=_async_connect_args,
+    **_pool_options(str(ASYNC_DATABASE_URL))
+)
+
+# Rows are serialized after the session is closed, so they must not expire
+# on commit
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 # Dependency to get DB session
@@ -23,4 +85,9 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+# Dependency to get an async DB session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,13 +1,25 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .database import engine, Base
+from .database import engine, async_engine, Base
 from .routes import orders_router, vehicles_router, drivers_router, depots_router, analytics_router
 from .routes.vrp import router as vrp_router
 from .routes.geocoding import router as geocoding_router
+from .services.maps_client import close_async_clients
+from .services.matrix_warmup import start_matrix_warmup
+from .services.analytics_rollup import track_analytics_changes, start_rollup_refresher
+from .services.pool_metrics import track_pool, pool_metrics
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
+# Mark the analytics rollup days touched by every write and bump the
+# version analytics responses are cached under
+track_analytics_changes()
+
+# Count connection checkouts of both pools for /health/db-pool
+track_pool("sync", engine)
+track_pool("async", async_engine.sync_engine)
+
 app = FastAPI(
     title="Vehicle Routing API",
     description="API for optimizing vehicle routes",
@@ -21,6 +33,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allows all methods
     allow_headers=["*"],  # Allows all headers
+    expose_headers=["X-Next-Cursor"],  # Cursor of the next list page
 )
 
 # Include routers
@@ -32,6 +45,20 @@ app.include_router(vrp_router)
 app.include_router(geocoding_router)
 app.include_router(analytics_router)
 
+@app.on_event("startup")
+def startup():
+    # Warm distance matrices for upcoming planning runs during off-peak hours
+    start_matrix_warmup()
+    # Rebuild analytics rollups of changed days outside of requests
+    start_rollup_refresher()
+
+@app.on_event("shutdown")
+async def shutdown():
+    # Close pooled Google Maps connections
+    await close_async_clients()
+    # Close pooled async database connections
+    await async_engine.dispose()
+
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the Vehicle Routing API"}
@@ -47,4 +74,11 @@ async def health_check():
             "analytics": True
         }
     }
-    return api_status 
\ No newline at end of file
+    return api_status
+
+@app.get("/health/db-pool")
+def db_pool_health():
+    """
+    Connection pool state and checkout counters of the sync and async engines
+    """
+    return pool_metrics()
@@ -2,5 +2,15 @@ from .order import Order
 from .vehicle import Vehicle
 from .driver import Driver
 from .depot import Depot
-from .route_history import RouteHistory
-from .analytics import RouteAnalytics, DriverPerformance, VehicleUsage 
\ No newline at end of file
+from .route_history import RouteHistory, RouteDetail
+from .analytics import (
+    RouteAnalytics,
+    DriverPerformance,
+    VehicleUsage,
+    DailyDriverStats,
+    DailyVehicleStats,
+    DailyDepotStats,
+    RollupPendingDay,
+    AnalyticsDataVersion
+)
+from .geocode_cache import GeocodeCacheEntry 
\ No newline at end of file
@@ -1,13 +1,20 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Float, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, Float, JSON, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.sql import func
 from ..database import Base
 
+# Source tables below are partitioned by month of date once
+# manage_partitions.py has run
+
 class RouteAnalytics(Base):
     __tablename__ = "route_analytics"
+    __table_args__ = (
+        Index("ix_route_analytics_date", "date"),
+        Index("ix_route_analytics_route_history_id", "route_history_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     date = Column(DateTime(timezone=True), server_default=func.now())
-    route_history_id = Column(Integer, ForeignKey("route_history.id"), nullable=True)
+    route_history_id = Column(Integer, nullable=True)  # route_history is partitioned, so not a foreign key
     planned_vs_actual_time_diff = Column(Float, nullable=True)  # in minutes
     planned_vs_actual_distance_diff = Column(Float, nullable=True)  # in km
     efficiency_score = Column(Float, nullable=True)  # calculated metric
@@ -17,6 +24,10 @@ class RouteAnalytics(Base):
 
 class DriverPerformance(Base):
     __tablename__ = "driver_performance"
+    __table_args__ = (
+        Index("ix_driver_performance_date", "date"),
+        Index("ix_driver_performance_driver_date", "driver_id", "date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     driver_id = Column(Integer, ForeignKey("drivers.id"), nullable=False)
@@ -30,6 +41,10 @@ class DriverPerformance(Base):
 
 class VehicleUsage(Base):
     __tablename__ = "vehicle_usage"
+    __table_args__ = (
+        Index("ix_vehicle_usage_date", "date"),
+        Index("ix_vehicle_usage_vehicle_date", "vehicle_id", "date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     vehicle_id = Column(Integer, ForeignKey("vehicles.id"), nullable=False)
@@ -38,4 +53,72 @@ class VehicleUsage(Base):
     fuel_consumption = Column(Float, nullable=True)  # estimated
     maintenance_status = Column(String(50), nullable=True)
     utilization_rate = Column(Float, nullable=True)  # percentage
-    notes = Column(Text, nullable=True) 
\ No newline at end of file
+    notes = Column(Text, nullable=True) 
+# Daily rollups kept up to date by services.analytics_rollup. Averages are
+# stored as sum and count so they combine exactly across days.
+
+class DailyDriverStats(Base):
+    __tablename__ = "daily_driver_stats"
+    __table_args__ = (UniqueConstraint("day", "driver_id"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False, index=True)
+    driver_id = Column(Integer, ForeignKey("drivers.id"), nullable=False)
+    # From route_history
+    routes = Column(Integer, default=0)
+    distance = Column(Float, default=0)  # in km
+    duration = Column(Float, default=0)  # in minutes
+    orders = Column(Integer, default=0)
+    # From driver_performance
+    performance_records = Column(Integer, default=0)
+    routes_completed = Column(Integer, default=0)
+    performance_distance = Column(Float, default=0)  # in km
+    on_time_rate_sum = Column(Float, default=0)
+    on_time_rate_count = Column(Integer, default=0)
+    delivery_time_sum = Column(Float, default=0)
+    delivery_time_count = Column(Integer, default=0)
+
+class DailyVehicleStats(Base):
+    __tablename__ = "daily_vehicle_stats"
+    __table_args__ = (UniqueConstraint("day", "vehicle_id"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False, index=True)
+    vehicle_id = Column(Integer, ForeignKey("vehicles.id"), nullable=False)
+    # From route_history
+    routes = Column(Integer, default=0)
+    route_distance = Column(Float, default=0)  # in km
+    # From vehicle_usage
+    usage_records = Column(Integer, default=0)
+    distance_traveled = Column(Float, default=0)  # in km
+    fuel_consumption = Column(Float, default=0)
+    fuel_count = Column(Integer, default=0)
+    utilization_sum = Column(Float, default=0)
+    utilization_count = Column(Integer, default=0)
+
+class DailyDepotStats(Base):
+    __tablename__ = "daily_depot_stats"
+
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False, index=True)
+    depot_id = Column(Integer, ForeignKey("depots.id"), nullable=True)  # null for routes without a depot
+    # From route_history
+    routes = Column(Integer, default=0)
+    distance = Column(Float, default=0)  # in km
+    duration = Column(Float, default=0)  # in minutes
+    orders = Column(Integer, default=0)
+    # From route_analytics
+    efficiency_sum = Column(Float, default=0)
+    efficiency_count = Column(Integer, default=0)
+
+class RollupPendingDay(Base):
+    __tablename__ = "analytics_rollup_pending"
+
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False, index=True)  # day whose rollups need rebuilding
+
+class AnalyticsDataVersion(Base):
+    __tablename__ = "analytics_data_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)  # bumped by every write to the analytics source tables
@@ -1,14 +1,22 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Index, Integer, String, DateTime, Float
 from sqlalchemy.sql import func
 from ..database import Base
 
 class Depot(Base):
     __tablename__ = "depots"
+    __table_args__ = (
+        # Sort key of keyset pagination by creation time
+        Index("ix_depots_created_at_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
     address = Column(String(255), nullable=False)
     capacity = Column(String(50), nullable=True)
     status = Column(String(20), nullable=True, default="Active")
+    lat = Column(Float, nullable=True)
+    lng = Column(Float, nullable=True)
+    formatted_address = Column(String(255), nullable=True)
+    place_id = Column(String(255), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now()) 
\ No newline at end of file
@@ -1,9 +1,13 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Index, Integer, String, DateTime
 from sqlalchemy.sql import func
 from ..database import Base
 
 class Driver(Base):
     __tablename__ = "drivers"
+    __table_args__ = (
+        # Sort key of keyset pagination by creation time
+        Index("ix_drivers_created_at_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, DateTime, Float, JSON
+from sqlalchemy.sql import func
+from ..database import Base
+
+class GeocodeCacheEntry(Base):
+    __tablename__ = "geocode_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    cache_key = Column(String(300), nullable=False, unique=True, index=True)  # canonical address or place:<place_id>
+    lat = Column(Float, nullable=True)
+    lng = Column(Float, nullable=True)
+    formatted_address = Column(String(255), nullable=True)
+    place_id = Column(String(255), nullable=True)
+    payload = Column(JSON, nullable=True)  # extra fields such as address_components
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -1,9 +1,15 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Float
+from sqlalchemy import Column, Index, Integer, String, Text, DateTime, Float
+from sqlalchemy.orm import validates
 from sqlalchemy.sql import func
 from ..database import Base
+from ..utils.parsing import parse_quantity, parse_time_of_day, parse_duration
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        # Sort key of keyset pagination by creation time
+        Index("ix_orders_created_at_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     address = Column(String(255), nullable=False)
@@ -16,5 +22,34 @@ class Order(Base):
     end_time = Column(String(50), nullable=True)
     duration = Column(String(50), nullable=True)
     load = Column(String(50), nullable=True)
+    # Typed copies of the string columns above, kept in sync on write
+    start_seconds = Column(Integer, nullable=True)  # seconds from midnight
+    end_seconds = Column(Integer, nullable=True)  # seconds from midnight
+    duration_seconds = Column(Integer, nullable=True)
+    load_value = Column(Float, nullable=True)
+    lat = Column(Float, nullable=True)
+    lng = Column(Float, nullable=True)
+    formatted_address = Column(String(255), nullable=True)
+    place_id = Column(String(255), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now()) 
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    @validates("start_time")
+    def _validate_start_time(self, key, value):
+        self.start_seconds = parse_time_of_day(value)
+        return value
+
+    @validates("end_time")
+    def _validate_end_time(self, key, value):
+        self.end_seconds = parse_time_of_day(value)
+        return value
+
+    @validates("duration")
+    def _validate_duration(self, key, value):
+        self.duration_seconds = parse_duration(value)
+        return value
+
+    @validates("load")
+    def _validate_load(self, key, value):
+        self.load_value = parse_quantity(value)
+        return value
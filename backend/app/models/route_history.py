@@ -1,10 +1,17 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Float, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Float, LargeBinary, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..database import Base
 
 class RouteHistory(Base):
     __tablename__ = "route_history"
+    # Partitioned by month of date_created once manage_partitions.py has run
+    __table_args__ = (
+        Index("ix_route_history_date_created", "date_created"),
+        Index("ix_route_history_driver_date", "driver_id", "date_created"),
+        Index("ix_route_history_vehicle_date", "vehicle_id", "date_created"),
+        Index("ix_route_history_depot_date", "depot_id", "date_created"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False)
@@ -15,7 +22,16 @@ class RouteHistory(Base):
     driver_id = Column(Integer, ForeignKey("drivers.id"), nullable=True)
     vehicle_id = Column(Integer, ForeignKey("vehicles.id"), nullable=True)
     depot_id = Column(Integer, ForeignKey("depots.id"), nullable=True)
-    route_data = Column(JSON, nullable=True)  # Store complete route data including waypoints
     actual_completion_time = Column(Float, nullable=True)
     actual_distance = Column(Float, nullable=True)
-    notes = Column(Text, nullable=True) 
\ No newline at end of file
+    notes = Column(Text, nullable=True)
+
+class RouteDetail(Base):
+    __tablename__ = "route_details"
+
+    # Complete route data of a route, kept out of route_history so listing
+    # routes never loads it
+    route_history_id = Column(Integer, primary_key=True)  # route_history is partitioned, so not a foreign key
+    date_created = Column(DateTime(timezone=True), nullable=True)
+    polyline = Column(Text, nullable=True)  # encoded polyline of the waypoint coordinates
+    data = Column(LargeBinary, nullable=False)  # zlib-compressed JSON of the rest of the route data
@@ -1,13 +1,25 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Index, Integer, String, DateTime, Float
+from sqlalchemy.orm import validates
 from sqlalchemy.sql import func
 from ..database import Base
+from ..utils.parsing import parse_quantity
 
 class Vehicle(Base):
     __tablename__ = "vehicles"
+    __table_args__ = (
+        # Sort key of keyset pagination by creation time
+        Index("ix_vehicles_created_at_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     plate_number = Column(String(50), nullable=False, unique=True)
     type = Column(String(50), nullable=False)
     capacity = Column(String(50), nullable=True)
+    capacity_value = Column(Float, nullable=True)  # typed copy of capacity
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now()) 
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    @validates("capacity")
+    def _validate_capacity(self, key, value):
+        self.capacity_value = parse_quantity(value)
+        return value
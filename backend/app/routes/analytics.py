@@ -1,9 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional, Dict, Any
-from datetime import datetime, timedelta
-from ..database import get_db
-from ..models import RouteHistory, RouteAnalytics, DriverPerformance, VehicleUsage
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Dict, Any, Tuple
+from datetime import datetime, time, timedelta, timezone
+from ..config import settings
+from ..database import get_async_db
+from ..services.analytics import (
+    route_totals,
+    average_efficiency,
+    top_drivers as top_performing_drivers,
+    vehicle_utilization,
+    driver_metrics,
+    vehicle_metrics,
+    route_performance,
+    parse_route_fields,
+    list_routes,
+    get_route,
+    as_utc
+)
+from ..services.analytics_rollup import day_start
+from ..services.analytics_cache import cached_response
 from ..schemas import (
     RouteHistory as RouteHistorySchema,
     RouteAnalytics as RouteAnalyticsSchema,
@@ -18,81 +33,58 @@ router = APIRouter(
     tags=["analytics"],
 )
 
+def _date_range(start_date: Optional[datetime], end_date: Optional[datetime]) -> Tuple[datetime, datetime]:
+    """
+    Requested date range in UTC, defaulting to the last 30 days
+
+    The default range runs from midnight 30 days ago to the end of today,
+    so it is day-aligned and served from the daily rollups.
+    """
+    if end_date:
+        end_date = as_utc(end_date)
+    else:
+        end_date = datetime.combine(datetime.now(timezone.utc).date(), time.max, tzinfo=timezone.utc)
+    if start_date:
+        start_date = as_utc(start_date)
+    else:
+        start_date = day_start(end_date.date() - timedelta(days=30))
+    return start_date, end_date
+
+# The endpoints run on the async engine; cache access goes through the
+# async cache methods, which move blocking backends off the event loop
+
 @router.get("/summary", response_model=AnalyticsSummary)
-def get_analytics_summary(
+async def get_analytics_summary(
+    request: Request,
+    response: Response,
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get summary analytics data for the dashboard
     """
-    # Default to last 30 days if no dates provided
-    if not end_date:
-        end_date = datetime.now()
-    if not start_date:
-        start_date = end_date - timedelta(days=30)
+    start_date, end_date = _date_range(start_date, end_date)
+    return await cached_response(
+        request, response, db, lambda: _analytics_summary(start_date, end_date, db),
+        date_range=(start_date, end_date)
+    )
+
+async def _analytics_summary(
+    start_date: datetime,
+    end_date: datetime,
+    db: AsyncSession
+):
     
     try:
-        # Query route history within date range
-        routes = db.query(RouteHistory).filter(
-            RouteHistory.date_created >= start_date,
-            RouteHistory.date_created <= end_date
-        ).all()
-        
-        # Calculate summary metrics
-        total_routes = len(routes)
-        total_distance = sum(route.total_distance or 0 for route in routes)
-        total_duration = sum(route.total_duration or 0 for route in routes)
-        total_orders = sum(route.total_orders or 0 for route in routes)
-        
-        # Get driver performance data
-        driver_performances = db.query(DriverPerformance).filter(
-            DriverPerformance.date >= start_date,
-            DriverPerformance.date <= end_date
-        ).all()
-        
-        # Get top performing drivers
-        top_drivers = []
-        for dp in driver_performances[:5]:  # Limit to top 5
-            driver = db.query(db.models.Driver).filter(db.models.Driver.id == dp.driver_id).first()
-            if driver:
-                top_drivers.append({
-                    "id": driver.id,
-                    "name": driver.name,
-                    "routes_completed": dp.routes_completed,
-                    "on_time_rate": dp.on_time_delivery_rate,
-                    "total_distance": dp.total_distance
-                })
-        
-        # Get vehicle utilization data
-        vehicle_usages = db.query(VehicleUsage).filter(
-            VehicleUsage.date >= start_date,
-            VehicleUsage.date <= end_date
-        ).all()
-        
-        vehicle_util = []
-        for vu in vehicle_usages:
-            vehicle = db.query(db.models.Vehicle).filter(db.models.Vehicle.id == vu.vehicle_id).first()
-            if vehicle:
-                vehicle_util.append({
-                    "id": vehicle.id,
-                    "name": vehicle.name,
-                    "distance_traveled": vu.distance_traveled,
-                    "utilization_rate": vu.utilization_rate
-                })
-        
-        # Calculate average efficiency score from route analytics
-        route_analytics = db.query(RouteAnalytics).filter(
-            RouteAnalytics.date >= start_date,
-            RouteAnalytics.date <= end_date
-        ).all()
-        
-        efficiency_scores = [ra.efficiency_score for ra in route_analytics if ra.efficiency_score is not None]
-        avg_efficiency = sum(efficiency_scores) / len(efficiency_scores) if efficiency_scores else None
+        # Totals, top drivers and vehicle utilization are aggregated in SQL
+        totals = await route_totals(db, start_date, end_date)
+        top_drivers = await top_performing_drivers(db, start_date, end_date)
+        vehicle_util = await vehicle_utilization(db, start_date, end_date)
+        avg_efficiency = await average_efficiency(db, start_date, end_date)
         
         # If no data is found, provide demo data
-        if not routes and not top_drivers and not vehicle_util:
+        if not totals["total_routes"] and not top_drivers and not vehicle_util:
             return {
                 "total_routes": 24,
                 "total_distance": 1250.5,
@@ -132,10 +124,7 @@ def get_analytics_summary(
             }
         
         return {
-            "total_routes": total_routes,
-            "total_distance": total_distance,
-            "total_duration": total_duration,
-            "total_orders": total_orders,
+            **totals,
             "avg_efficiency_score": avg_efficiency,
             "top_performing_drivers": top_drivers,
             "vehicle_utilization": vehicle_util
@@ -182,30 +171,40 @@ def get_analytics_summary(
         }
 
 @router.get("/route-performance", response_model=TimeSeriesData)
-def get_route_performance(
+async def get_route_performance(
+    request: Request,
+    response: Response,
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
     metric: str = Query("distance", description="Metric to analyze: distance, duration, efficiency"),
-    db: Session = Depends(get_db)
+    granularity: str = Query("day", pattern="^(hour|day|week|month)$", description="Bucket size: hour, day, week, month"),
+    max_points: int = Query(settings.ANALYTICS_MAX_POINTS, ge=3, description="Maximum points per series"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Get time series data for route performance
+    Get time series data for route performance, averaged per time bucket
     """
-    # Default to last 30 days if no dates provided
-    if not end_date:
-        end_date = datetime.now()
-    if not start_date:
-        start_date = end_date - timedelta(days=30)
+    start_date, end_date = _date_range(start_date, end_date)
+    return await cached_response(
+        request, response, db, lambda: _route_performance(start_date, end_date, metric, granularity, max_points, db),
+        date_range=(start_date, end_date)
+    )
+
+async def _route_performance(
+    start_date: datetime,
+    end_date: datetime,
+    metric: str,
+    granularity: str,
+    max_points: int,
+    db: AsyncSession
+):
     
     try:
-        # Query route history within date range
-        routes = db.query(RouteHistory).filter(
-            RouteHistory.date_created >= start_date,
-            RouteHistory.date_created <= end_date
-        ).order_by(RouteHistory.date_created).all()
+        # Bucket and aggregate routes in SQL, downsampled to max_points
+        series = await route_performance(db, start_date, end_date, metric, granularity, max_points)
         
         # If no routes found, return demo data
-        if not routes:
+        if not series["labels"]:
             return {
                 "labels": ['Jan 1', 'Jan 2', 'Jan 3', 'Jan 4', 'Jan 5', 'Jan 6', 'Jan 7'],
                 "datasets": [
@@ -224,41 +223,18 @@ def get_route_performance(
                 ]
             }
         
-        # Prepare time series data
-        dates = []
-        planned_values = []
-        actual_values = []
-        
-        for route in routes:
-            date_str = route.date_created.strftime("%Y-%m-%d")
-            dates.append(date_str)
-            
-            if metric == "distance":
-                planned_values.append(route.total_distance or 0)
-                actual_values.append(route.actual_distance or 0)
-            elif metric == "duration":
-                planned_values.append(route.total_duration or 0)
-                actual_values.append(route.actual_completion_time or 0)
-            elif metric == "efficiency":
-                # Get efficiency score from route analytics
-                analytics = db.query(RouteAnalytics).filter(
-                    RouteAnalytics.route_history_id == route.id
-                ).first()
-                planned_values.append(100)  # Baseline efficiency is 100%
-                actual_values.append(analytics.efficiency_score if analytics and analytics.efficiency_score else 0)
-        
         return {
-            "labels": dates,
+            "labels": series["labels"],
             "datasets": [
                 {
                     "label": f"Planned {metric}",
-                    "data": planned_values,
+                    "data": series["planned"],
                     "borderColor": "rgb(53, 162, 235)",
                     "backgroundColor": "rgba(53, 162, 235, 0.5)"
                 },
                 {
                     "label": f"Actual {metric}",
-                    "data": actual_values,
+                    "data": series["actual"],
                     "borderColor": "rgb(255, 99, 132)",
                     "backgroundColor": "rgba(255, 99, 132, 0.5)"
                 }
@@ -286,24 +262,33 @@ def get_route_performance(
         }
 
 @router.get("/driver-performance", response_model=TimeSeriesData)
-def get_driver_performance(
+async def get_driver_performance(
+    request: Request,
+    response: Response,
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
     metric: str = Query("on_time_rate", description="Metric to analyze: on_time_rate, avg_time, distance"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get time series data for driver performance
     """
-    # Default to last 30 days if no dates provided
-    if not end_date:
-        end_date = datetime.now()
-    if not start_date:
-        start_date = end_date - timedelta(days=30)
+    start_date, end_date = _date_range(start_date, end_date)
+    return await cached_response(
+        request, response, db, lambda: _driver_performance(start_date, end_date, metric, db),
+        date_range=(start_date, end_date)
+    )
+
+async def _driver_performance(
+    start_date: datetime,
+    end_date: datetime,
+    metric: str,
+    db: AsyncSession
+):
     
     try:
-        # Get all drivers
-        drivers = db.query(db.models.Driver).all()
+        # Per-driver performance over the range, one row per driver
+        drivers = await driver_metrics(db, start_date, end_date)
         
         # If no drivers found, return demo data
         if not drivers:
@@ -326,32 +311,15 @@ def get_driver_performance(
             }
         
         # Prepare time series data
-        labels = [driver.name for driver in drivers]
-        data = []
-        
-        for driver in drivers:
-            # Get latest performance record for this driver
-            performance = db.query(DriverPerformance).filter(
-                DriverPerformance.driver_id == driver.id,
-                DriverPerformance.date >= start_date,
-                DriverPerformance.date <= end_date
-            ).order_by(DriverPerformance.date.desc()).first()
-            
-            if performance:
-                if metric == "on_time_rate":
-                    data.append(performance.on_time_delivery_rate or 0)
-                elif metric == "avg_time":
-                    data.append(performance.avg_time_per_delivery or 0)
-                elif metric == "distance":
-                    data.append(performance.total_distance or 0)
-            else:
-                # Add default values if no performance data
-                if metric == "on_time_rate":
-                    data.append(90)  # Default 90% on-time rate
-                elif metric == "avg_time":
-                    data.append(25)  # Default 25 minutes
-                else:
-                    data.append(400)  # Default 400 km
+        labels = [driver["name"] for driver in drivers]
+        # Default values for drivers without performance data:
+        # 90% on-time rate, 25 minutes per delivery, 400 km
+        default = {"on_time_rate": 90, "avg_time": 25}.get(metric, 400)
+        metric_key = metric if metric in ("on_time_rate", "avg_time") else "distance"
+        data = [
+            driver[metric_key] if driver[metric_key] is not None else default
+            for driver in drivers
+        ]
         
         return {
             "labels": labels,
@@ -392,24 +360,33 @@ def get_driver_performance(
         }
 
 @router.get("/vehicle-usage", response_model=TimeSeriesData)
-def get_vehicle_usage(
+async def get_vehicle_usage(
+    request: Request,
+    response: Response,
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
     metric: str = Query("utilization", description="Metric to analyze: utilization, distance, fuel"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get time series data for vehicle usage
     """
-    # Default to last 30 days if no dates provided
-    if not end_date:
-        end_date = datetime.now()
-    if not start_date:
-        start_date = end_date - timedelta(days=30)
+    start_date, end_date = _date_range(start_date, end_date)
+    return await cached_response(
+        request, response, db, lambda: _vehicle_usage(start_date, end_date, metric, db),
+        date_range=(start_date, end_date)
+    )
+
+async def _vehicle_usage(
+    start_date: datetime,
+    end_date: datetime,
+    metric: str,
+    db: AsyncSession
+):
     
     try:
-        # Get all vehicles
-        vehicles = db.query(db.models.Vehicle).all()
+        # Per-vehicle usage over the range, one row per vehicle
+        vehicles = await vehicle_metrics(db, start_date, end_date)
         
         # If no vehicles found, return demo data
         if not vehicles:
@@ -432,32 +409,15 @@ def get_vehicle_usage(
             }
         
         # Prepare time series data
-        labels = [vehicle.name for vehicle in vehicles]
-        data = []
-        
-        for vehicle in vehicles:
-            # Get latest usage record for this vehicle
-            usage = db.query(VehicleUsage).filter(
-                VehicleUsage.vehicle_id == vehicle.id,
-                VehicleUsage.date >= start_date,
-                VehicleUsage.date <= end_date
-            ).order_by(VehicleUsage.date.desc()).first()
-            
-            if usage:
-                if metric == "utilization":
-                    data.append(usage.utilization_rate or 0)
-                elif metric == "distance":
-                    data.append(usage.distance_traveled or 0)
-                elif metric == "fuel":
-                    data.append(usage.fuel_consumption or 0)
-            else:
-                # Add default values if no usage data
-                if metric == "utilization":
-                    data.append(75)  # Default 75% utilization
-                elif metric == "distance":
-                    data.append(300)  # Default 300 km
-                else:
-                    data.append(35)  # Default 35L fuel
+        labels = [vehicle["name"] for vehicle in vehicles]
+        # Default values for vehicles without usage data:
+        # 75% utilization, 300 km, 35L fuel
+        default = {"utilization": 75, "distance": 300}.get(metric, 35)
+        metric_key = metric if metric in ("utilization", "distance") else "fuel"
+        data = [
+            vehicle[metric_key] if vehicle[metric_key] is not None else default
+            for vehicle in vehicles
+        ]
         
         return {
             "labels": labels,
@@ -497,27 +457,29 @@ def get_vehicle_usage(
             ]
         }
 
-@router.get("/route-history", response_model=List[RouteHistorySchema])
-def get_route_history(
+@router.get("/route-history", response_model=List[RouteHistorySchema], response_model_exclude_unset=True)
+async def get_route_history(
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
     limit: int = Query(10, ge=1, le=100),
-    db: Session = Depends(get_db)
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,name,total_distance,route_data"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get route history data
+
+    Route data is only included when selected with fields, or through
+    /route-history/{route_id}.
     """
-    # Default to last 30 days if no dates provided
-    if not end_date:
-        end_date = datetime.now()
-    if not start_date:
-        start_date = end_date - timedelta(days=30)
+    start_date, end_date = _date_range(start_date, end_date)
+    
+    try:
+        selected = parse_route_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     try:
-        routes = db.query(RouteHistory).filter(
-            RouteHistory.date_created >= start_date,
-            RouteHistory.date_created <= end_date
-        ).order_by(RouteHistory.date_created.desc()).limit(limit).all()
+        routes = await list_routes(db, start_date, end_date, limit, selected)
         
         # If no routes found, return demo data
         if not routes:
@@ -564,4 +526,14 @@ def get_route_history(
                 "actual_distance": 125.0 + i*11,
                 "notes": "Demo route data"
             })
-        return demo_routes
\ No newline at end of file
+        return demo_routes
+
+@router.get("/route-history/{route_id}", response_model=RouteHistorySchema)
+async def get_route_detail(route_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Get one route including its route data
+    """
+    route = await get_route(db, route_id)
+    if route is None:
+        raise HTTPException(status_code=404, detail="Route not found")
+    return route
@@ -1,28 +1,67 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy.sql import Select
+from typing import Callable, List, Optional
 
-from ..database import get_db
+from ..database import get_db, get_async_db
 from ..models import Depot
-from ..schemas import DepotCreate, DepotResponse, DepotUpdate
+from ..schemas import DepotCreate, DepotResponse, DepotUpdate, DepotBatch, BatchResult
+from ..services.pagination import PageParams, paginate, export_ndjson
+from ..services.batch_ops import apply_batch
+from ..services.geocoding_queue import enqueue_geocode
+from ..services.address_index import index_address, unindex_address
 
 router = APIRouter(
     prefix="/depots",
     tags=["Depots"]
 )
 
+def depot_filters(
+    status: Optional[str] = Query(None, description="Depot status, e.g. Active")
+) -> Callable[[Select], Select]:
+    """Filters of the depot list and export"""
+    def apply(statement: Select) -> Select:
+        if status:
+            statement = statement.filter(Depot.status == status)
+        return statement
+    return apply
+
 @router.post("/", response_model=DepotResponse, status_code=status.HTTP_201_CREATED)
 def create_depot(depot: DepotCreate, db: Session = Depends(get_db)):
     db_depot = Depot(**depot.dict())
     db.add(db_depot)
     db.commit()
     db.refresh(db_depot)
+    enqueue_geocode("depot", db_depot.id, db_depot.address)
+    index_address(db_depot.address)
     return db_depot
 
+@router.post("/batch", response_model=BatchResult)
+def batch_depots(batch: DepotBatch, db: Session = Depends(get_db)):
+    """
+    Create, update and delete many depots in one transaction
+
+    Items that cannot be applied are reported in their result and skipped.
+    """
+    return apply_batch(db, Depot, batch, geocode_entity="depot")
+
 @router.get("/", response_model=List[DepotResponse])
-def get_depots(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    depots = db.query(Depot).offset(skip).limit(limit).all()
-    return depots
+async def get_depots(
+    response: Response,
+    page: PageParams = Depends(),
+    filters: Callable[[Select], Select] = Depends(depot_filters),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await paginate(db, filters(select(Depot)), Depot, page, response)
+
+@router.get("/export")
+def export_depots(
+    page: PageParams = Depends(),
+    filters: Callable[[Select], Select] = Depends(depot_filters)
+):
+    return export_ndjson(Depot, DepotResponse, page, filters, "depots.ndjson")
 
 @router.get("/{depot_id}", response_model=DepotResponse)
 def get_depot(depot_id: int, db: Session = Depends(get_db)):
@@ -38,11 +77,24 @@ def update_depot(depot_id: int, depot: DepotUpdate, db: Session = Depends(get_db
         raise HTTPException(status_code=404, detail="Depot not found")
     
     update_data = depot.dict(exclude_unset=True)
+    old_address = db_depot.address
+    address_changed = "address" in update_data and update_data["address"] != old_address
     for key, value in update_data.items():
         setattr(db_depot, key, value)
     
+    # Stored coordinates belong to the old address until the queue catches up
+    if address_changed:
+        db_depot.lat = None
+        db_depot.lng = None
+        db_depot.formatted_address = None
+        db_depot.place_id = None
+    
     db.commit()
     db.refresh(db_depot)
+    if address_changed:
+        enqueue_geocode("depot", db_depot.id, db_depot.address)
+        unindex_address(old_address)
+        index_address(db_depot.address)
     return db_depot
 
 @router.delete("/{depot_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -51,6 +103,8 @@ def delete_depot(depot_id: int, db: Session = Depends(get_db)):
     if db_depot is None:
         raise HTTPException(status_code=404, detail="Depot not found")
     
+    address = db_depot.address
     db.delete(db_depot)
     db.commit()
+    unindex_address(address)
     return None 
\ No newline at end of file
@@ -1,16 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy.sql import Select
+from typing import Callable, List, Optional
 
-from ..database import get_db
+from ..database import get_db, get_async_db
 from ..models import Driver
-from ..schemas import DriverCreate, DriverResponse, DriverUpdate
+from ..schemas import DriverCreate, DriverResponse, DriverUpdate, DriverBatch, BatchResult
+from ..services.pagination import PageParams, paginate, export_ndjson
+from ..services.batch_ops import apply_batch
 
 router = APIRouter(
     prefix="/drivers",
     tags=["Drivers"]
 )
 
+def driver_filters(
+    search: Optional[str] = Query(None, max_length=100, description="Part of the name or email")
+) -> Callable[[Select], Select]:
+    """Filters of the driver list and export"""
+    def apply(statement: Select) -> Select:
+        if search:
+            pattern = f"%{search}%"
+            statement = statement.filter(or_(Driver.name.ilike(pattern), Driver.email.ilike(pattern)))
+        return statement
+    return apply
+
 @router.post("/", response_model=DriverResponse, status_code=status.HTTP_201_CREATED)
 def create_driver(driver: DriverCreate, db: Session = Depends(get_db)):
     db_driver = Driver(**driver.dict())
@@ -19,10 +35,30 @@ def create_driver(driver: DriverCreate, db: Session = Depends(get_db)):
     db.refresh(db_driver)
     return db_driver
 
+@router.post("/batch", response_model=BatchResult)
+def batch_drivers(batch: DriverBatch, db: Session = Depends(get_db)):
+    """
+    Create, update and delete many drivers in one transaction
+
+    Items that cannot be applied are reported in their result and skipped.
+    """
+    return apply_batch(db, Driver, batch, unique_field="email")
+
 @router.get("/", response_model=List[DriverResponse])
-def get_drivers(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    drivers = db.query(Driver).offset(skip).limit(limit).all()
-    return drivers
+async def get_drivers(
+    response: Response,
+    page: PageParams = Depends(),
+    filters: Callable[[Select], Select] = Depends(driver_filters),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await paginate(db, filters(select(Driver)), Driver, page, response)
+
+@router.get("/export")
+def export_drivers(
+    page: PageParams = Depends(),
+    filters: Callable[[Select], Select] = Depends(driver_filters)
+):
+    return export_ndjson(Driver, DriverResponse, page, filters, "drivers.ndjson")
 
 @router.get("/{driver_id}", response_model=DriverResponse)
 def get_driver(driver_id: int, db: Session = Depends(get_db)):
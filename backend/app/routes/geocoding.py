@@ -1,28 +1,39 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from pydantic import BaseModel
+import json
 import logging
 
 # Import services
 try:
-    from ..services.geocoding import geocode_address, get_place_autocomplete, get_place_details
+    from ..services.geocoding import (
+        geocode_address_async, autocomplete_address_async, get_place_details_async, geocode_batch
+    )
 except ImportError:
     # Mock implementations if services are not available
     logging.warning("Geocoding services not available, using mock implementations")
     
-    def geocode_address(address):
+    async def geocode_address_async(address):
         return {"lat": 0, "lng": 0, "formatted_address": address}
     
-    def get_place_autocomplete(input_text, session_token=None):
+    async def autocomplete_address_async(input_text, session_token=None):
         return [{"description": f"Mock result for {input_text}", "place_id": "mock_place_id"}]
     
-    def get_place_details(place_id, session_token=None):
+    async def get_place_details_async(place_id, session_token=None):
         return {"formatted_address": "Mock Address", "lat": 0, "lng": 0}
+    
+    async def geocode_batch(addresses):
+        for idx, address in enumerate(addresses):
+            yield {"index": idx, "address": address, "lat": 0, "lng": 0, "formatted_address": address, "status": "OK"}
 
 # Models
 class GeocodingRequest(BaseModel):
     address: str
 
+class BatchGeocodingRequest(BaseModel):
+    addresses: List[str]
+
 class PlaceAutocompleteRequest(BaseModel):
     input: str
     session_token: Optional[str] = None
@@ -57,7 +68,7 @@ async def geocode(request: GeocodingRequest):
     """
     Geocode an address to get latitude and longitude coordinates
     """
-    result = geocode_address(request.address)
+    result = await geocode_address_async(request.address)
     
     if result:
         return {
@@ -74,12 +85,24 @@ async def geocode(request: GeocodingRequest):
             "status": "NOT_FOUND"
         }
 
+@router.post("/batch")
+async def geocode_many(request: BatchGeocodingRequest):
+    """
+    Geocode many addresses at once, streaming one NDJSON line per address as
+    results become available
+    """
+    async def stream():
+        async for result in geocode_batch(request.addresses):
+            yield json.dumps(result) + "\n"
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
 @router.post("/autocomplete", response_model=PlaceAutocompleteResponse)
 async def autocomplete(request: PlaceAutocompleteRequest):
     """
     Get place autocomplete suggestions for an address
     """
-    results = get_place_autocomplete(request.input, request.session_token)
+    results = await autocomplete_address_async(request.input, request.session_token)
     
     return {
         "predictions": results,
@@ -91,7 +114,7 @@ async def place_details(request: PlaceDetailsRequest):
     """
     Get detailed information about a place using its place_id
     """
-    result = get_place_details(request.place_id, request.session_token)
+    result = await get_place_details_async(request.place_id, request.session_token)
     
     if result:
         return {
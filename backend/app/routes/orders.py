@@ -1,28 +1,79 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Response, UploadFile, status
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy.sql import Select
+from typing import Callable, List, Optional
 
-from ..database import get_db
+from ..database import get_db, get_async_db
 from ..models import Order
-from ..schemas import OrderCreate, OrderResponse, OrderUpdate
+from ..schemas import OrderCreate, OrderResponse, OrderUpdate, OrderImportResult
+from ..services.pagination import PageParams, paginate, export_ndjson
+from ..services.geocoding_queue import enqueue_geocode
+from ..services.address_index import index_address, unindex_address
+from ..services.order_import import import_format, import_orders
 
 router = APIRouter(
     prefix="/orders",
     tags=["Orders"]
 )
 
+def order_filters(
+    geocoded: Optional[bool] = Query(None, description="Only orders with (true) or without (false) coordinates"),
+    search: Optional[str] = Query(None, max_length=100, description="Part of the address, customer name or order number")
+) -> Callable[[Select], Select]:
+    """Filters of the order list and export"""
+    def apply(statement: Select) -> Select:
+        if geocoded is not None:
+            statement = statement.filter(Order.lat.isnot(None) if geocoded else Order.lat.is_(None))
+        if search:
+            pattern = f"%{search}%"
+            statement = statement.filter(or_(
+                Order.address.ilike(pattern),
+                Order.customer_name.ilike(pattern),
+                Order.order_number.ilike(pattern)
+            ))
+        return statement
+    return apply
+
 @router.post("/", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
 def create_order(order: OrderCreate, db: Session = Depends(get_db)):
     db_order = Order(**order.dict())
     db.add(db_order)
     db.commit()
     db.refresh(db_order)
+    enqueue_geocode("order", db_order.id, db_order.address)
+    index_address(db_order.address)
     return db_order
 
+@router.post("/import", response_model=OrderImportResult)
+def import_orders_file(file: UploadFile = File(...), db: Session = Depends(get_db)):
+    """
+    Import orders from a CSV, JSON or NDJSON file
+
+    Rows that fail validation are reported by row number and skipped; the
+    rest are imported and queued for geocoding.
+    """
+    file_format = import_format(file.filename, file.content_type)
+    if file_format is None:
+        raise HTTPException(status_code=400, detail="Unsupported file type, upload a .csv, .json or .ndjson file")
+    return import_orders(db, file.file, file_format)
+
 @router.get("/", response_model=List[OrderResponse])
-def get_orders(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    orders = db.query(Order).offset(skip).limit(limit).all()
-    return orders
+async def get_orders(
+    response: Response,
+    page: PageParams = Depends(),
+    filters: Callable[[Select], Select] = Depends(order_filters),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await paginate(db, filters(select(Order)), Order, page, response)
+
+@router.get("/export")
+def export_orders(
+    page: PageParams = Depends(),
+    filters: Callable[[Select], Select] = Depends(order_filters)
+):
+    return export_ndjson(Order, OrderResponse, page, filters, "orders.ndjson")
 
 @router.get("/{order_id}", response_model=OrderResponse)
 def get_order(order_id: int, db: Session = Depends(get_db)):
@@ -38,11 +89,24 @@ def update_order(order_id: int, order: OrderUpdate, db: Session = Depends(get_db
         raise HTTPException(status_code=404, detail="Order not found")
     
     update_data = order.dict(exclude_unset=True)
+    old_address = db_order.address
+    address_changed = "address" in update_data and update_data["address"] != old_address
     for key, value in update_data.items():
         setattr(db_order, key, value)
     
+    # Stored coordinates belong to the old address until the queue catches up
+    if address_changed:
+        db_order.lat = None
+        db_order.lng = None
+        db_order.formatted_address = None
+        db_order.place_id = None
+    
     db.commit()
     db.refresh(db_order)
+    if address_changed:
+        enqueue_geocode("order", db_order.id, db_order.address)
+        unindex_address(old_address)
+        index_address(db_order.address)
     return db_order
 
 @router.delete("/{order_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -51,6 +115,8 @@ def delete_order(order_id: int, db: Session = Depends(get_db)):
     if db_order is None:
         raise HTTPException(status_code=404, detail="Order not found")
     
+    address = db_order.address
     db.delete(db_order)
     db.commit()
+    unindex_address(address)
     return None 
\ No newline at end of file
@@ -1,16 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy.sql import Select
+from typing import Callable, List, Optional
 
-from ..database import get_db
+from ..database import get_db, get_async_db
 from ..models import Vehicle
-from ..schemas import VehicleCreate, VehicleResponse, VehicleUpdate
+from ..schemas import VehicleCreate, VehicleResponse, VehicleUpdate, VehicleBatch, BatchResult
+from ..services.pagination import PageParams, paginate, export_ndjson
+from ..services.batch_ops import apply_batch
 
 router = APIRouter(
     prefix="/vehicles",
     tags=["Vehicles"]
 )
 
+def vehicle_filters(
+    type: Optional[str] = Query(None, description="Vehicle type")
+) -> Callable[[Select], Select]:
+    """Filters of the vehicle list and export"""
+    def apply(statement: Select) -> Select:
+        if type:
+            statement = statement.filter(Vehicle.type == type)
+        return statement
+    return apply
+
 @router.post("/", response_model=VehicleResponse, status_code=status.HTTP_201_CREATED)
 def create_vehicle(vehicle: VehicleCreate, db: Session = Depends(get_db)):
     db_vehicle = Vehicle(**vehicle.dict())
@@ -19,10 +34,30 @@ def create_vehicle(vehicle: VehicleCreate, db: Session = Depends(get_db)):
     db.refresh(db_vehicle)
     return db_vehicle
 
+@router.post("/batch", response_model=BatchResult)
+def batch_vehicles(batch: VehicleBatch, db: Session = Depends(get_db)):
+    """
+    Create, update and delete many vehicles in one transaction
+
+    Items that cannot be applied are reported in their result and skipped.
+    """
+    return apply_batch(db, Vehicle, batch, unique_field="plate_number")
+
 @router.get("/", response_model=List[VehicleResponse])
-def get_vehicles(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    vehicles = db.query(Vehicle).offset(skip).limit(limit).all()
-    return vehicles
+async def get_vehicles(
+    response: Response,
+    page: PageParams = Depends(),
+    filters: Callable[[Select], Select] = Depends(vehicle_filters),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await paginate(db, filters(select(Vehicle)), Vehicle, page, response)
+
+@router.get("/export")
+def export_vehicles(
+    page: PageParams = Depends(),
+    filters: Callable[[Select], Select] = Depends(vehicle_filters)
+):
+    return export_ndjson(Vehicle, VehicleResponse, page, filters, "vehicles.ndjson")
 
 @router.get("/{vehicle_id}", response_model=VehicleResponse)
 def get_vehicle(vehicle_id: int, db: Session = Depends(get_db)):
@@ -1,11 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
-from pydantic import BaseModel
+from datetime import date
+from pydantic import BaseModel, Field
 import logging
 
+from ..database import get_db
+from ..models import Vehicle, Depot
+from ..services.solve_inputs import build_solve_inputs
+from ..services.order_snapshot import load_order_snapshot
+
 # Import services
 try:
-    from ..services.vrp_solver import solve_vrp
+    from ..services.vrp_solver import solve_vrp, solve_vrp_async
 except ImportError:
     # Mock implementation if service is not available
     logging.warning("VRP solver not available, using mock implementation")
@@ -24,6 +31,9 @@ except ImportError:
             "total_distance": 10000,
             "total_time": 1200
         }
+    
+    async def solve_vrp_async(locations, num_vehicles=1, depot_index=0, **kwargs):
+        return solve_vrp(locations, num_vehicles, depot_index, **kwargs)
 
 # Models
 class Location(BaseModel):
@@ -43,10 +53,24 @@ class VRPRequest(BaseModel):
     demands: Optional[List[int]] = None
     time_windows: Optional[List[TimeWindow]] = None
     max_time_per_vehicle: Optional[List[int]] = None
+    service_times: Optional[List[int]] = None  # seconds spent at each location
+    vehicle_types: Optional[List[str]] = None  # e.g. "Van", "Cargo Bike", "Truck 7.5t"
+    aggregate_colocated: bool = True
+
+class SolveFromDbRequest(BaseModel):
+    depot_id: int
+    vehicle_ids: List[int]
+    order_ids: Optional[List[int]] = None
+    order_date: Optional[date] = Field(
+        None,
+        description="Orders created on this day; orders have no delivery date, so this filters on created_at"
+    )
+    aggregate_colocated: bool = True
 
 class RouteStop(BaseModel):
     location_index: int
     address: str
+    order_id: Optional[int] = None
 
 class Route(BaseModel):
     vehicle_id: int
@@ -69,13 +93,60 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+def _format_result(result: Dict[str, Any], addresses: List[str], order_ids: Optional[List[Optional[int]]] = None) -> Dict[str, Any]:
+    """
+    Convert a solver result into the VRP response format
+    """
+    if result["status"] != "OK":
+        return {
+            "status": result["status"],
+            "routes": [],
+            "total_distance": 0,
+            "total_time": 0,
+            "message": "Failed to solve VRP"
+        }
+    
+    # Convert routes to response format
+    routes = []
+    for route_data in result["routes"]:
+        route_stops = []
+        for location_idx in route_data["route"]:
+            if location_idx < len(addresses):
+                route_stops.append({
+                    "location_index": location_idx,
+                    "address": addresses[location_idx],
+                    "order_id": order_ids[location_idx] if order_ids else None
+                })
+        
+        routes.append({
+            "vehicle_id": route_data["vehicle_id"],
+            "stops": route_stops,
+            "distance": route_data["distance"],
+            "time": route_data.get("time"),
+            "load": route_data.get("load")
+        })
+    
+    return {
+        "status": "OK",
+        "routes": routes,
+        "total_distance": result["total_distance"],
+        "total_time": result["total_time"]
+    }
+
 @router.post("/solve", response_model=VRPResponse)
 async def solve_vehicle_routing_problem(request: VRPRequest):
     """
     Solve a Vehicle Routing Problem
     """
+    if request.vehicle_types is not None and len(request.vehicle_types) != request.num_vehicles:
+        raise HTTPException(status_code=422, detail="vehicle_types must have one entry per vehicle")
+    
     # Extract addresses from locations
     addresses = [location.address for location in request.locations]
+    coordinates = [
+        (location.lat, location.lng) if location.lat is not None and location.lng is not None else None
+        for location in request.locations
+    ]
     
     # Convert time windows if provided
     time_windows = None
@@ -84,53 +155,66 @@ async def solve_vehicle_routing_problem(request: VRPRequest):
     
     try:
         # Solve VRP
-        result = solve_vrp(
+        result = await solve_vrp_async(
             locations=addresses,
             num_vehicles=request.num_vehicles,
             depot_index=request.depot_index,
             vehicle_capacities=request.vehicle_capacities,
             demands=request.demands,
             time_windows=time_windows,
-            max_time_per_vehicle=request.max_time_per_vehicle
+            max_time_per_vehicle=request.max_time_per_vehicle,
+            service_times=request.service_times,
+            coordinates=coordinates,
+            aggregate_colocated=request.aggregate_colocated,
+            vehicle_types=request.vehicle_types
         )
         
-        if result["status"] != "OK":
-            return {
-                "status": result["status"],
-                "routes": [],
-                "total_distance": 0,
-                "total_time": 0,
-                "message": "Failed to solve VRP"
-            }
-        
-        # Convert routes to response format
-        routes = []
-        for route_data in result["routes"]:
-            route_stops = []
-            for location_idx in route_data["route"]:
-                if location_idx < len(addresses):
-                    route_stops.append({
-                        "location_index": location_idx,
-                        "address": addresses[location_idx]
-                    })
-            
-            routes.append({
-                "vehicle_id": route_data["vehicle_id"],
-                "stops": route_stops,
-                "distance": route_data["distance"],
-                "time": route_data.get("time"),
-                "load": route_data.get("load")
-            })
+        return _format_result(result, addresses)
         
+    except Exception as e:
+        logging.error(f"Error solving VRP: {str(e)}")
         return {
-            "status": "OK",
-            "routes": routes,
-            "total_distance": result["total_distance"],
-            "total_time": result["total_time"]
+            "status": "ERROR",
+            "routes": [],
+            "total_distance": 0,
+            "total_time": 0,
+            "message": str(e)
         }
-        
+
+@router.post("/solve-from-db", response_model=VRPResponse)
+def solve_from_database(request: SolveFromDbRequest, db: Session = Depends(get_db)):
+    """
+    Solve a Vehicle Routing Problem for stored orders, vehicles and a depot
+    """
+    if request.order_ids is None and request.order_date is None:
+        raise HTTPException(status_code=400, detail="Either order_ids or order_date is required")
+    
+    depot = db.query(Depot).filter(Depot.id == request.depot_id).first()
+    if depot is None:
+        raise HTTPException(status_code=404, detail="Depot not found")
+    
+    vehicles = db.query(Vehicle).filter(Vehicle.id.in_(request.vehicle_ids)).order_by(Vehicle.id).all()
+    missing_vehicles = sorted(set(request.vehicle_ids) - {vehicle.id for vehicle in vehicles})
+    if missing_vehicles or not vehicles:
+        raise HTTPException(status_code=404, detail=f"Vehicles not found: {missing_vehicles}")
+    
+    snapshot = load_order_snapshot(db, order_ids=request.order_ids, order_date=request.order_date)
+    if request.order_ids is not None:
+        missing_orders = sorted(set(request.order_ids) - set(snapshot["id"].tolist()))
+        if missing_orders:
+            detail = "Orders not found" if request.order_date is None else f"Orders not found on {request.order_date}"
+            raise HTTPException(status_code=404, detail=f"{detail}: {missing_orders}")
+    if len(snapshot["id"]) == 0:
+        raise HTTPException(status_code=404, detail="No orders found")
+    
+    inputs = build_solve_inputs(depot, snapshot, vehicles)
+    order_ids = inputs.pop("order_ids")
+    
+    try:
+        result = solve_vrp(aggregate_colocated=request.aggregate_colocated, **inputs)
+        return _format_result(result, inputs["locations"], order_ids)
     except Exception as e:
-        logging.error(f"Error solving VRP: {str(e)}")
+        logging.error(f"Error solving VRP from database: {str(e)}")
         return {
             "status": "ERROR",
             "routes": [],
@@ -23,12 +23,25 @@ class OrderUpdate(OrderBase):
 
 class OrderResponse(OrderBase):
     id: int
+    lat: Optional[float] = None
+    lng: Optional[float] = None
+    formatted_address: Optional[str] = None
+    place_id: Optional[str] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
 
     class Config:
         orm_mode = True
 
+class OrderImportError(BaseModel):
+    row: int
+    error: str
+
+class OrderImportResult(BaseModel):
+    imported: int
+    failed: int
+    errors: List[OrderImportError]
+
 # Vehicle Schemas
 class VehicleBase(BaseModel):
     plate_number: str
@@ -50,6 +63,14 @@ class VehicleResponse(VehicleBase):
     class Config:
         orm_mode = True
 
+class VehicleBatchUpdate(VehicleUpdate):
+    id: int
+
+class VehicleBatch(BaseModel):
+    create: List[VehicleCreate] = []
+    update: List[VehicleBatchUpdate] = []
+    delete: List[int] = []
+
 # Driver Schemas
 class DriverBase(BaseModel):
     name: str
@@ -73,6 +94,14 @@ class DriverResponse(DriverBase):
     class Config:
         orm_mode = True
 
+class DriverBatchUpdate(DriverUpdate):
+    id: int
+
+class DriverBatch(BaseModel):
+    create: List[DriverCreate] = []
+    update: List[DriverBatchUpdate] = []
+    delete: List[int] = []
+
 # Depot Schemas
 class DepotBase(BaseModel):
     name: str
@@ -89,12 +118,37 @@ class DepotUpdate(DepotBase):
 
 class DepotResponse(DepotBase):
     id: int
+    lat: Optional[float] = None
+    lng: Optional[float] = None
+    formatted_address: Optional[str] = None
+    place_id: Optional[str] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
 
     class Config:
         orm_mode = True
 
+class DepotBatchUpdate(DepotUpdate):
+    id: int
+
+class DepotBatch(BaseModel):
+    create: List[DepotCreate] = []
+    update: List[DepotBatchUpdate] = []
+    delete: List[int] = []
+
+# Batch Schemas
+class BatchItemResult(BaseModel):
+    action: str  # "create", "update" or "delete"
+    index: int  # position in the request list
+    id: Optional[int] = None
+    status: str  # "created", "updated", "deleted", "not_found" or "conflict"
+    error: Optional[str] = None
+
+class BatchResult(BaseModel):
+    applied: int
+    failed: int
+    results: List[BatchItemResult]
+
 # Route History Schemas
 class RouteHistoryBase(BaseModel):
     name: str
@@ -0,0 +1,152 @@
+from typing import List, Dict, Any, Tuple, Optional
+from bisect import bisect_left, insort
+from sqlalchemy import func, literal
+import threading
+import logging
+from ..database import SessionLocal
+from ..models import Order, Depot, GeocodeCacheEntry
+from .location_keys import normalize_address
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Only the first few words of an address start their own search term
+MAX_INDEXED_WORDS = 6
+
+class AddressPrefixIndex:
+    """
+    In-memory prefix index over known addresses
+
+    Terms are kept in a sorted list so a prefix lookup is a bisect followed
+    by a short scan. Each address is indexed from its start and from the
+    start of each of its first words, so "main st" finds "12 Main St".
+    """
+
+    def __init__(self):
+        self._terms: List[Tuple[str, str]] = []  # (term, normalized address)
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.built = False
+
+    @staticmethod
+    def _terms_for(key: str) -> List[str]:
+        words = key.split(" ")
+        return [" ".join(words[i:]) for i in range(min(len(words), MAX_INDEXED_WORDS))]
+
+    def add(self, address: str, place_id: Optional[str] = None, count: int = 1) -> None:
+        """
+        Add an address, or bump its usage count if it is already known
+        """
+        key = normalize_address(address)
+        if not key:
+            return
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry["count"] += count
+                entry["place_id"] = place_id or entry["place_id"]
+                return
+            self._entries[key] = {"description": address, "place_id": place_id, "count": count}
+            for term in self._terms_for(key):
+                insort(self._terms, (term, key))
+
+    def remove(self, address: str) -> None:
+        """
+        Drop one use of an address, removing it once nothing references it
+        """
+        key = normalize_address(address)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry["count"] -= 1
+            if entry["count"] > 0:
+                return
+            del self._entries[key]
+            for term in self._terms_for(key):
+                idx = bisect_left(self._terms, (term, key))
+                if idx < len(self._terms) and self._terms[idx] == (term, key):
+                    del self._terms[idx]
+
+    def search(self, prefix: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Find known addresses matching a prefix, most used first
+
+        Args:
+            prefix: Text typed so far
+            limit: Maximum number of results
+
+        Returns:
+            list: Entries with description, place_id and count
+        """
+        prefix = normalize_address(prefix)
+        if not prefix:
+            return []
+        with self._lock:
+            matches: Dict[str, bool] = {}
+            idx = bisect_left(self._terms, (prefix, ""))
+            # Scan a bounded window; popular prefixes have many matches
+            while idx < len(self._terms) and len(matches) < limit * 10:
+                term, key = self._terms[idx]
+                if not term.startswith(prefix):
+                    break
+                matches[key] = matches.get(key, False) or term == key
+                idx += 1
+            ranked = sorted(
+                matches.items(),
+                key=lambda item: (not item[1], -self._entries[item[0]]["count"])
+            )
+            return [dict(self._entries[key]) for key, _ in ranked[:limit]]
+
+    def build(self) -> None:
+        """
+        Load all known addresses from orders, depots and stored place details
+        """
+        db = SessionLocal()
+        try:
+            sources = [
+                db.query(Order.address, func.max(Order.place_id), func.count(Order.id)).group_by(Order.address).all(),
+                db.query(Depot.address, func.max(Depot.place_id), func.count(Depot.id)).group_by(Depot.address).all(),
+                db.query(GeocodeCacheEntry.formatted_address, GeocodeCacheEntry.place_id, literal(1)).filter(
+                    GeocodeCacheEntry.formatted_address.isnot(None)
+                ).all()
+            ]
+        except Exception as e:
+            logger.error(f"Error building address index: {str(e)}")
+            return
+        finally:
+            db.close()
+
+        for rows in sources:
+            for address, place_id, count in rows:
+                self.add(address, place_id, count)
+        self.built = True
+        logger.info(f"Built address index with {len(self._entries)} addresses")
+
+# Shared index for this worker
+address_index = AddressPrefixIndex()
+_build_lock = threading.Lock()
+
+def search_known_addresses(prefix: str, limit: int = 5) -> List[Dict[str, Any]]:
+    """
+    Search the shared index, building it on first use
+    """
+    if not address_index.built:
+        with _build_lock:
+            if not address_index.built:
+                address_index.build()
+    return address_index.search(prefix, limit)
+
+def index_address(address: str, place_id: Optional[str] = None) -> None:
+    """
+    Record a newly written address; ignored until the index is built from the database
+    """
+    if address_index.built:
+        address_index.add(address, place_id)
+
+def unindex_address(address: str) -> None:
+    """
+    Record that a stored address is no longer referenced
+    """
+    if address_index.built:
+        address_index.remove(address)
@@ -0,0 +1,534 @@
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import date, datetime, time, timezone
+from sqlalchemy import DateTime, and_, func, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+import logging
+from ..models import (
+    RouteHistory,
+    RouteAnalytics,
+    DriverPerformance,
+    VehicleUsage,
+    Driver,
+    Vehicle,
+    DailyDriverStats,
+    DailyVehicleStats,
+    DailyDepotStats
+)
+from .analytics_rollup import has_pending_days
+from .route_details import load_route_data
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Number of drivers listed as top performers in the summary
+TOP_DRIVERS_LIMIT = 5
+
+# Route history fields always listed, since every listed route needs them
+ROUTE_KEY_FIELDS = ["id", "name", "date_created"]
+
+# Fields listed by default, everything but the route data
+ROUTE_LIST_FIELDS = [column.name for column in RouteHistory.__table__.columns]
+
+# Label format of each time series granularity
+GRANULARITY_FORMATS = {
+    "hour": "%Y-%m-%d %H:00",
+    "day": "%Y-%m-%d",
+    "week": "%Y-%m-%d",
+    "month": "%Y-%m"
+}
+
+def as_utc(moment: datetime) -> datetime:
+    """
+    Aware UTC datetime; naive datetimes are taken to be UTC
+    """
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc)
+
+def rollup_days(start_date: datetime, end_date: datetime) -> Optional[Tuple[date, date]]:
+    """
+    First and last UTC day of a day-aligned range, or None if the range is
+    not day-aligned
+
+    The end of a range is inclusive, so a range is day-aligned when it
+    starts at midnight and ends on the last microsecond of a day; any other
+    range is read from the source tables, which give the same totals.
+    """
+    start_date, end_date = as_utc(start_date), as_utc(end_date)
+    if start_date.time() != time.min or end_date.time() != time.max:
+        return None
+    if end_date.date() < start_date.date():
+        return None
+    return start_date.date(), end_date.date()
+
+async def _rollup_range(db: AsyncSession, start_date: datetime, end_date: datetime) -> Optional[Tuple[date, date]]:
+    """
+    Days to read from the rollups, or None to read the source tables
+
+    Rollups are rebuilt in the background, so a range holding a day that
+    changed since its last rebuild is read from the source tables.
+    """
+    days = rollup_days(start_date, end_date)
+    if days is None:
+        return None
+    try:
+        if await has_pending_days(db, *days):
+            return None
+    except Exception as e:
+        logger.error(f"Error checking pending analytics rollups: {str(e)}")
+        return None
+    return days
+
+def _ratio(total, count) -> Optional[float]:
+    return float(total) / count if count else None
+
+async def route_totals(db: AsyncSession, start_date: datetime, end_date: datetime) -> Dict[str, Any]:
+    """
+    Count routes and sum their distance, duration and orders in one query
+
+    Args:
+        db: Async database session
+        start_date: Start of the range (inclusive)
+        end_date: End of the range (inclusive)
+
+    Returns:
+        dict: total_routes, total_distance, total_duration and total_orders
+    """
+    days = await _rollup_range(db, start_date, end_date)
+    if days is not None:
+        statement = select(
+            func.coalesce(func.sum(DailyDepotStats.routes), 0),
+            func.coalesce(func.sum(DailyDepotStats.distance), 0),
+            func.coalesce(func.sum(DailyDepotStats.duration), 0),
+            func.coalesce(func.sum(DailyDepotStats.orders), 0)
+        ).where(DailyDepotStats.day.between(*days))
+    else:
+        statement = select(
+            func.count(RouteHistory.id),
+            func.coalesce(func.sum(RouteHistory.total_distance), 0),
+            func.coalesce(func.sum(RouteHistory.total_duration), 0),
+            func.coalesce(func.sum(RouteHistory.total_orders), 0)
+        ).where(
+            RouteHistory.date_created >= start_date,
+            RouteHistory.date_created <= end_date
+        )
+    total_routes, total_distance, total_duration, total_orders = (await db.execute(statement)).one()
+
+    return {
+        "total_routes": int(total_routes),
+        "total_distance": float(total_distance),
+        "total_duration": float(total_duration),
+        "total_orders": int(total_orders)
+    }
+
+async def average_efficiency(db: AsyncSession, start_date: datetime, end_date: datetime) -> Optional[float]:
+    """
+    Average efficiency score of the route analytics in a range
+    """
+    days = await _rollup_range(db, start_date, end_date)
+    if days is not None:
+        total, count = (await db.execute(select(
+            func.sum(DailyDepotStats.efficiency_sum),
+            func.sum(DailyDepotStats.efficiency_count)
+        ).where(DailyDepotStats.day.between(*days)))).one()
+        return _ratio(total, count)
+
+    return await db.scalar(select(func.avg(RouteAnalytics.efficiency_score)).where(
+        RouteAnalytics.date >= start_date,
+        RouteAnalytics.date <= end_date
+    ))
+
+async def top_drivers(
+    db: AsyncSession,
+    start_date: datetime,
+    end_date: datetime,
+    limit: int = TOP_DRIVERS_LIMIT
+) -> List[Dict[str, Any]]:
+    """
+    Drivers with the best on-time rate in a range, aggregated per driver
+
+    Args:
+        db: Async database session
+        start_date: Start of the range (inclusive)
+        end_date: End of the range (inclusive)
+        limit: Maximum number of drivers
+
+    Returns:
+        list: Drivers with id, name, routes_completed, on_time_rate and total_distance
+    """
+    days = await _rollup_range(db, start_date, end_date)
+    if days is not None:
+        on_time_rate = func.sum(DailyDriverStats.on_time_rate_sum) / func.nullif(
+            func.sum(DailyDriverStats.on_time_rate_count), 0
+        )
+        routes_completed = func.coalesce(func.sum(DailyDriverStats.routes_completed), 0)
+        total_distance = func.coalesce(func.sum(DailyDriverStats.performance_distance), 0)
+        statement = select(
+            Driver.id, Driver.name, routes_completed, on_time_rate, total_distance
+        ).join(
+            DailyDriverStats, DailyDriverStats.driver_id == Driver.id
+        ).where(
+            DailyDriverStats.day.between(*days),
+            DailyDriverStats.performance_records > 0
+        )
+    else:
+        on_time_rate = func.avg(DriverPerformance.on_time_delivery_rate)
+        routes_completed = func.coalesce(func.sum(DriverPerformance.routes_completed), 0)
+        total_distance = func.coalesce(func.sum(DriverPerformance.total_distance), 0)
+        statement = select(
+            Driver.id, Driver.name, routes_completed, on_time_rate, total_distance
+        ).join(
+            DriverPerformance, DriverPerformance.driver_id == Driver.id
+        ).where(
+            DriverPerformance.date >= start_date,
+            DriverPerformance.date <= end_date
+        )
+    rows = (await db.execute(statement.group_by(
+        Driver.id, Driver.name
+    ).order_by(
+        on_time_rate.desc().nullslast(), routes_completed.desc()
+    ).limit(limit))).all()
+
+    return [
+        {
+            "id": driver_id,
+            "name": name,
+            "routes_completed": int(completed),
+            "on_time_rate": float(rate) if rate is not None else None,
+            "total_distance": float(distance)
+        }
+        for driver_id, name, completed, rate, distance in rows
+    ]
+
+async def vehicle_utilization(db: AsyncSession, start_date: datetime, end_date: datetime) -> List[Dict[str, Any]]:
+    """
+    Distance and average utilization per vehicle in a range, most utilized first
+
+    Args:
+        db: Async database session
+        start_date: Start of the range (inclusive)
+        end_date: End of the range (inclusive)
+
+    Returns:
+        list: Vehicles with id, name, distance_traveled and utilization_rate
+    """
+    days = await _rollup_range(db, start_date, end_date)
+    if days is not None:
+        utilization_rate = func.sum(DailyVehicleStats.utilization_sum) / func.nullif(
+            func.sum(DailyVehicleStats.utilization_count), 0
+        )
+        statement = select(
+            Vehicle.id,
+            Vehicle.plate_number,
+            func.coalesce(func.sum(DailyVehicleStats.distance_traveled), 0),
+            utilization_rate
+        ).join(
+            DailyVehicleStats, DailyVehicleStats.vehicle_id == Vehicle.id
+        ).where(
+            DailyVehicleStats.day.between(*days),
+            DailyVehicleStats.usage_records > 0
+        )
+    else:
+        utilization_rate = func.avg(VehicleUsage.utilization_rate)
+        statement = select(
+            Vehicle.id,
+            Vehicle.plate_number,
+            func.coalesce(func.sum(VehicleUsage.distance_traveled), 0),
+            utilization_rate
+        ).join(
+            VehicleUsage, VehicleUsage.vehicle_id == Vehicle.id
+        ).where(
+            VehicleUsage.date >= start_date,
+            VehicleUsage.date <= end_date
+        )
+    rows = (await db.execute(statement.group_by(
+        Vehicle.id, Vehicle.plate_number
+    ).order_by(
+        utilization_rate.desc().nullslast()
+    ))).all()
+
+    return [
+        {
+            "id": vehicle_id,
+            "name": plate_number,
+            "distance_traveled": float(distance),
+            "utilization_rate": float(rate) if rate is not None else None
+        }
+        for vehicle_id, plate_number, distance, rate in rows
+    ]
+
+async def driver_metrics(db: AsyncSession, start_date: datetime, end_date: datetime) -> List[Dict[str, Any]]:
+    """
+    Performance of every driver over a range
+
+    Drivers without performance records in the range are included with None
+    values.
+
+    Args:
+        db: Async database session
+        start_date: Start of the range (inclusive)
+        end_date: End of the range (inclusive)
+
+    Returns:
+        list: Drivers with name, on_time_rate, avg_time and distance
+    """
+    days = await _rollup_range(db, start_date, end_date)
+    if days is not None:
+        stats = DailyDriverStats
+        statement = select(
+            Driver.id,
+            Driver.name,
+            func.sum(stats.on_time_rate_sum) / func.nullif(func.sum(stats.on_time_rate_count), 0),
+            func.sum(stats.delivery_time_sum) / func.nullif(func.sum(stats.delivery_time_count), 0),
+            func.sum(stats.performance_distance),
+            func.sum(stats.performance_records)
+        ).outerjoin(
+            stats, and_(stats.driver_id == Driver.id, stats.day.between(*days))
+        )
+    else:
+        statement = select(
+            Driver.id,
+            Driver.name,
+            func.avg(DriverPerformance.on_time_delivery_rate),
+            func.avg(DriverPerformance.avg_time_per_delivery),
+            func.sum(DriverPerformance.total_distance),
+            func.count(DriverPerformance.id)
+        ).outerjoin(
+            DriverPerformance,
+            and_(
+                DriverPerformance.driver_id == Driver.id,
+                DriverPerformance.date >= start_date,
+                DriverPerformance.date <= end_date
+            )
+        )
+    rows = (await db.execute(statement.group_by(Driver.id, Driver.name).order_by(Driver.id))).all()
+
+    return [
+        {
+            "id": driver_id,
+            "name": name,
+            "on_time_rate": float(on_time_rate) if on_time_rate is not None else None,
+            "avg_time": float(avg_time) if avg_time is not None else None,
+            "distance": float(distance or 0) if records else None
+        }
+        for driver_id, name, on_time_rate, avg_time, distance, records in rows
+    ]
+
+async def vehicle_metrics(db: AsyncSession, start_date: datetime, end_date: datetime) -> List[Dict[str, Any]]:
+    """
+    Usage of every vehicle over a range
+
+    Vehicles without usage records in the range are included with None
+    values.
+
+    Args:
+        db: Async database session
+        start_date: Start of the range (inclusive)
+        end_date: End of the range (inclusive)
+
+    Returns:
+        list: Vehicles with name, utilization, distance and fuel
+    """
+    days = await _rollup_range(db, start_date, end_date)
+    if days is not None:
+        stats = DailyVehicleStats
+        statement = select(
+            Vehicle.id,
+            Vehicle.plate_number,
+            func.sum(stats.utilization_sum) / func.nullif(func.sum(stats.utilization_count), 0),
+            func.sum(stats.distance_traveled),
+            func.sum(stats.fuel_consumption),
+            func.sum(stats.usage_records),
+            func.sum(stats.fuel_count)
+        ).outerjoin(
+            stats, and_(stats.vehicle_id == Vehicle.id, stats.day.between(*days))
+        )
+    else:
+        statement = select(
+            Vehicle.id,
+            Vehicle.plate_number,
+            func.avg(VehicleUsage.utilization_rate),
+            func.sum(VehicleUsage.distance_traveled),
+            func.sum(VehicleUsage.fuel_consumption),
+            func.count(VehicleUsage.id),
+            func.count(VehicleUsage.fuel_consumption)
+        ).outerjoin(
+            VehicleUsage,
+            and_(
+                VehicleUsage.vehicle_id == Vehicle.id,
+                VehicleUsage.date >= start_date,
+                VehicleUsage.date <= end_date
+            )
+        )
+    rows = (await db.execute(statement.group_by(Vehicle.id, Vehicle.plate_number).order_by(Vehicle.id))).all()
+
+    return [
+        {
+            "id": vehicle_id,
+            "name": plate_number,
+            "utilization": float(utilization) if utilization is not None else None,
+            "distance": float(distance or 0) if records else None,
+            "fuel": float(fuel) if fuel_count else None
+        }
+        for vehicle_id, plate_number, utilization, distance, fuel, records, fuel_count in rows
+    ]
+
+async def route_performance(
+    db: AsyncSession,
+    start_date: datetime,
+    end_date: datetime,
+    metric: str,
+    granularity: str,
+    max_points: int
+) -> Dict[str, Any]:
+    """
+    Planned and actual route metric per time bucket
+
+    Routes are bucketed with date_trunc and averaged per bucket in one
+    query; efficiency scores are joined from route analytics. Series longer
+    than max_points are downsampled with LTTB.
+
+    Args:
+        db: Async database session
+        start_date: Start of the range (inclusive)
+        end_date: End of the range (inclusive)
+        metric: "distance", "duration" or "efficiency"
+        granularity: "hour", "day", "week" or "month"
+        max_points: Maximum number of points per series
+
+    Returns:
+        dict: labels, planned and actual values, empty if there are no routes
+    """
+    bucket = func.date_trunc(granularity, RouteHistory.date_created, type_=DateTime).label("bucket")
+    if metric == "efficiency":
+        # Baseline efficiency is 100%
+        planned = literal(100.0)
+        actual = func.avg(RouteAnalytics.efficiency_score)
+    elif metric == "duration":
+        planned = func.avg(RouteHistory.total_duration)
+        actual = func.avg(RouteHistory.actual_completion_time)
+    else:
+        planned = func.avg(RouteHistory.total_distance)
+        actual = func.avg(RouteHistory.actual_distance)
+
+    statement = select(bucket, planned, actual).select_from(RouteHistory)
+    if metric == "efficiency":
+        statement = statement.outerjoin(RouteAnalytics, RouteAnalytics.route_history_id == RouteHistory.id)
+    rows = (await db.execute(statement.where(
+        RouteHistory.date_created >= start_date,
+        RouteHistory.date_created <= end_date
+    ).group_by(bucket).order_by(bucket))).all()
+
+    planned_values = [float(row[1] or 0) for row in rows]
+    actual_values = [float(row[2] or 0) for row in rows]
+    keep = lttb_indices([planned_values, actual_values], max_points)
+    label_format = GRANULARITY_FORMATS[granularity]
+    return {
+        "labels": [rows[i][0].strftime(label_format) for i in keep],
+        "planned": [planned_values[i] for i in keep],
+        "actual": [actual_values[i] for i in keep]
+    }
+
+def lttb_indices(series: List[List[float]], threshold: int) -> List[int]:
+    """
+    Indices of the points kept by Largest-Triangle-Three-Buckets downsampling
+
+    The points between the first and last are split into threshold - 2
+    buckets and the point of each bucket forming the largest triangle with
+    the previously kept point and the average of the next bucket is kept.
+    Triangle areas are summed over all series so they share one set of
+    labels.
+
+    Args:
+        series: Equally long value lists
+        threshold: Number of points to keep
+
+    Returns:
+        list: Sorted indices of the kept points
+    """
+    n = len(series[0]) if series else 0
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+
+    every = (n - 2) / (threshold - 2)
+    kept = [0]
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        next_x = (end + next_end - 1) / 2
+        next_y = [sum(values[end:next_end]) / (next_end - end) for values in series]
+
+        def area(j: int) -> float:
+            return sum(
+                abs((a - next_x) * (values[j] - values[a]) - (a - j) * (avg_y - values[a]))
+                for values, avg_y in zip(series, next_y)
+            )
+
+        a = max(range(start, end), key=area)
+        kept.append(a)
+    kept.append(n - 1)
+    return kept
+
+def parse_route_fields(fields: Optional[str]) -> List[str]:
+    """
+    Route history fields selected by a comma-separated fields parameter
+
+    Raises:
+        ValueError: If a field is unknown
+    """
+    if not fields:
+        return ROUTE_LIST_FIELDS
+    selected = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in selected if field not in ROUTE_LIST_FIELDS and field != "route_data"]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return ROUTE_KEY_FIELDS + [field for field in selected if field not in ROUTE_KEY_FIELDS]
+
+async def list_routes(
+    db: AsyncSession,
+    start_date: datetime,
+    end_date: datetime,
+    limit: int,
+    fields: List[str]
+) -> List[Dict[str, Any]]:
+    """
+    Most recent routes in a range, with only the selected fields
+
+    Only the selected columns are queried; route data is loaded from
+    route_details in one query when selected.
+
+    Args:
+        db: Async database session
+        start_date: Start of the range (inclusive)
+        end_date: End of the range (inclusive)
+        limit: Maximum number of routes
+        fields: Fields to return, see parse_route_fields()
+
+    Returns:
+        list: One dict per route
+    """
+    columns = [getattr(RouteHistory, field) for field in fields if field != "route_data"]
+    rows = (await db.execute(select(*columns).where(
+        RouteHistory.date_created >= start_date,
+        RouteHistory.date_created <= end_date
+    ).order_by(RouteHistory.date_created.desc()).limit(limit))).all()
+    routes = [dict(row._mapping) for row in rows]
+
+    if "route_data" in fields:
+        route_data = await load_route_data(db, [route["id"] for route in routes])
+        for route in routes:
+            route["route_data"] = route_data.get(route["id"])
+    return routes
+
+async def get_route(db: AsyncSession, route_id: int) -> Optional[Dict[str, Any]]:
+    """
+    One route with its route data, or None if it does not exist
+    """
+    route = await db.scalar(select(RouteHistory).where(RouteHistory.id == route_id))
+    if route is None:
+        return None
+    result = {field: getattr(route, field) for field in ROUTE_LIST_FIELDS}
+    result["route_data"] = (await load_route_data(db, [route_id])).get(route_id)
+    return result
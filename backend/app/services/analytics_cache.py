@@ -0,0 +1,73 @@
+from typing import Any, Awaitable, Callable, Optional, Tuple
+from datetime import datetime
+import hashlib
+import logging
+from fastapi import Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..config import settings
+from .cache_backend import create_cache
+from .analytics_rollup import data_version
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Analytics responses keyed by endpoint, query parameters, date range days and data version
+analytics_cache = create_cache("analytics", settings.ANALYTICS_CACHE_MAX_BYTES, settings.ANALYTICS_CACHE_TTL)
+
+async def cached_response(
+    request: Request,
+    response: Response,
+    db: AsyncSession,
+    compute: Callable[[], Awaitable[Any]],
+    date_range: Optional[Tuple[datetime, datetime]] = None
+) -> Any:
+    """
+    Serve an analytics response from the cache, or compute and cache it
+
+    The cache key and ETag derive from the endpoint, its query parameters,
+    the days of the resolved date range and the analytics data version, so
+    any write to the source tables invalidates them, and so does a default
+    range moving on to the next day. A request whose If-None-Match holds the
+    current ETag gets an empty 304 without computing anything.
+
+    Args:
+        request: Incoming request
+        response: Response whose headers receive the ETag
+        db: Async database session
+        compute: Builds the response body
+        date_range: Resolved (start, end) of the request, including defaults
+
+    Returns:
+        The response body, or a 304 response
+    """
+    try:
+        version = await data_version(db)
+    except Exception as e:
+        # Without a version nothing can be validated, so skip the cache
+        logger.error(f"Error reading analytics data version: {str(e)}")
+        return await compute()
+
+    query = sorted(request.query_params.multi_items())
+    days = tuple(moment.date().isoformat() for moment in date_range) if date_range else ()
+    digest = hashlib.sha1(repr((request.url.path, query, days)).encode("utf-8")).hexdigest()[:16]
+    etag = f'W/"{version}-{digest}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if _matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+
+    key = (request.url.path, tuple(query), days, version)
+    body = await analytics_cache.get_async(key)
+    if body is None:
+        body = await compute()
+        await analytics_cache.set_async(key, body)
+    response.headers.update(headers)
+    return body
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    """
+    Weak comparison of an If-None-Match header against an ETag
+    """
+    opaque = lambda tag: tag[2:] if tag.startswith("W/") else tag
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or opaque(etag) in {opaque(tag) for tag in tags if tag}
@@ -0,0 +1,306 @@
+from typing import Dict, List, Optional, Set, Any
+from datetime import date, datetime, time, timedelta, timezone
+from itertools import chain
+from sqlalchemy import event, func, inspect, select, union, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+import threading
+import time as clock
+import logging
+from ..config import settings
+from ..database import SessionLocal
+from ..models import (
+    RouteHistory,
+    RouteAnalytics,
+    DriverPerformance,
+    VehicleUsage,
+    DailyDriverStats,
+    DailyVehicleStats,
+    DailyDepotStats,
+    RollupPendingDay,
+    AnalyticsDataVersion
+)
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Source tables feeding the rollups and the column each one is bucketed by
+_SOURCE_DATES = {
+    RouteHistory: "date_created",
+    RouteAnalytics: "date",
+    DriverPerformance: "date",
+    VehicleUsage: "date"
+}
+
+# Postgres advisory lock held while rebuilding, so workers do not race on a day
+ROLLUP_LOCK_ID = 42042
+
+_worker = None
+_worker_lock = threading.Lock()
+
+def track_analytics_changes() -> None:
+    """
+    Record the days touched by every flush of a source table, so
+    refresh_rollups() only rebuilds those, and bump the analytics data
+    version
+    """
+    if not event.contains(SessionLocal, "before_flush", _mark_changed_days):
+        event.listen(SessionLocal, "before_flush", _mark_changed_days)
+
+def _mark_changed_days(session: Session, flush_context, instances) -> None:
+    days: Set[date] = set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        attribute = _SOURCE_DATES.get(type(obj))
+        if attribute is None:
+            continue
+        if obj in session.dirty and not session.is_modified(obj):
+            continue
+        history = inspect(obj).attrs[attribute].history
+        values = [value for value in chain(history.added, history.unchanged, history.deleted) if value is not None]
+        if not values and obj in session.new:
+            # Dated by the server default, now()
+            days.add(datetime.now(timezone.utc).date())
+        days.update(_day_of(value) for value in values)
+    for day in days:
+        session.add(RollupPendingDay(day=day))
+    if days:
+        bump_data_version(session)
+
+def bump_data_version(db: Session) -> None:
+    """
+    Increment the analytics data version in the current transaction
+    """
+    bumped = db.execute(
+        update(AnalyticsDataVersion).where(AnalyticsDataVersion.id == 1).values(
+            version=AnalyticsDataVersion.version + 1
+        ).execution_options(synchronize_session=False)
+    ).rowcount
+    if not bumped:
+        db.add(AnalyticsDataVersion(id=1, version=1))
+
+async def data_version(db: AsyncSession) -> int:
+    """
+    Current analytics data version, changed by every write to a source table
+    """
+    return await db.scalar(select(AnalyticsDataVersion.version).where(AnalyticsDataVersion.id == 1)) or 0
+
+def _day_of(value: Any) -> date:
+    """
+    UTC day of a source timestamp; naive timestamps are taken to be UTC
+    """
+    if isinstance(value, str):
+        # SQLite returns DATE() as text
+        return date.fromisoformat(value[:10])
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        return value.date()
+    return value
+
+def day_start(day: date) -> datetime:
+    """
+    Start of a UTC day, the boundary the rollups are bucketed by
+    """
+    return datetime.combine(day, time.min, tzinfo=timezone.utc)
+
+async def has_pending_days(db: AsyncSession, first_day: date, last_day: date) -> bool:
+    """
+    Whether any day in the range changed since its rollups were last rebuilt
+    """
+    pending = await db.scalar(select(RollupPendingDay.id).where(RollupPendingDay.day.between(first_day, last_day)).limit(1))
+    return pending is not None
+
+def start_rollup_refresher() -> None:
+    """
+    Start the background thread rebuilding changed days if enabled in settings
+    """
+    global _worker
+    if not settings.ANALYTICS_ROLLUP_REFRESH_ENABLED:
+        return
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name="analytics-rollups", daemon=True)
+            _worker.start()
+
+def _run() -> None:
+    """
+    Rebuild the rollups of changed days on every interval
+    """
+    while True:
+        db = SessionLocal()
+        try:
+            refresh_rollups(db)
+        except Exception as e:
+            logger.error(f"Error refreshing analytics rollups: {str(e)}")
+        finally:
+            db.close()
+        clock.sleep(settings.ANALYTICS_ROLLUP_REFRESH_INTERVAL)
+
+def refresh_rollups(db: Session) -> int:
+    """
+    Rebuild the rollups of every day marked as changed
+
+    Returns:
+        int: Number of days rebuilt; 0 if another worker holds the lock
+    """
+    pending = db.query(RollupPendingDay.id, RollupPendingDay.day).all()
+    if not pending:
+        return 0
+    try:
+        if not _try_lock(db):
+            return 0
+        days = sorted({day for _, day in pending})
+        for day in days:
+            _rebuild_day(db, day)
+        db.query(RollupPendingDay).filter(
+            RollupPendingDay.id.in_([pending_id for pending_id, _ in pending])
+        ).delete(synchronize_session=False)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    logger.info(f"Rebuilt analytics rollups for {len(days)} days")
+    return len(days)
+
+def rebuild_rollups(db: Session, since: Optional[date] = None) -> int:
+    """
+    Rebuild the rollups of every day with source rows, e.g. after loading
+    history outside the ORM
+
+    Args:
+        db: Database session
+        since: Only rebuild this day and later
+
+    Returns:
+        int: Number of days rebuilt
+    """
+    selects = []
+    for model, attribute in _SOURCE_DATES.items():
+        column = getattr(model, attribute)
+        query = db.query(func.date(_utc(db, column)).label("day"))
+        if since is not None:
+            query = query.filter(column >= day_start(since))
+        selects.append(query.statement)
+    days = sorted(_day_of(day) for (day,) in db.execute(union(*selects)) if day is not None)
+    try:
+        for day in days:
+            _rebuild_day(db, day)
+            db.commit()
+        bump_data_version(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return len(days)
+
+def _try_lock(db: Session) -> bool:
+    if db.bind.dialect.name != "postgresql":
+        return True
+    return db.execute(func.pg_try_advisory_xact_lock(ROLLUP_LOCK_ID)).scalar()
+
+def _utc(db: Session, column):
+    # Postgres casts a timestamptz to a date in the session time zone
+    if db.bind.dialect.name == "postgresql":
+        return func.timezone("UTC", column)
+    return column
+
+def _within(start: datetime, end: datetime, column) -> tuple:
+    return column >= start, column < end
+
+def _sum(column):
+    return func.coalesce(func.sum(column), 0)
+
+def _rebuild_day(db: Session, day: date) -> None:
+    """
+    Replace the driver, vehicle and depot rollups of one UTC day
+    """
+    start = day_start(day)
+    end = start + timedelta(days=1)
+    for model in (DailyDriverStats, DailyVehicleStats, DailyDepotStats):
+        db.query(model).filter(model.day == day).delete(synchronize_session=False)
+
+    drivers: Dict[int, Dict[str, Any]] = {}
+    for driver_id, routes, distance, duration, orders in db.query(
+        RouteHistory.driver_id,
+        func.count(RouteHistory.id),
+        _sum(RouteHistory.total_distance),
+        _sum(RouteHistory.total_duration),
+        _sum(RouteHistory.total_orders)
+    ).filter(
+        RouteHistory.driver_id.isnot(None), *_within(start, end, RouteHistory.date_created)
+    ).group_by(RouteHistory.driver_id):
+        drivers[driver_id] = {"routes": routes, "distance": distance, "duration": duration, "orders": orders}
+    for driver_id, records, completed, distance, on_time_sum, on_time_count, delivery_sum, delivery_count in db.query(
+        DriverPerformance.driver_id,
+        func.count(DriverPerformance.id),
+        _sum(DriverPerformance.routes_completed),
+        _sum(DriverPerformance.total_distance),
+        _sum(DriverPerformance.on_time_delivery_rate),
+        func.count(DriverPerformance.on_time_delivery_rate),
+        _sum(DriverPerformance.avg_time_per_delivery),
+        func.count(DriverPerformance.avg_time_per_delivery)
+    ).filter(*_within(start, end, DriverPerformance.date)).group_by(DriverPerformance.driver_id):
+        drivers.setdefault(driver_id, {}).update({
+            "performance_records": records,
+            "routes_completed": completed,
+            "performance_distance": distance,
+            "on_time_rate_sum": on_time_sum,
+            "on_time_rate_count": on_time_count,
+            "delivery_time_sum": delivery_sum,
+            "delivery_time_count": delivery_count
+        })
+
+    vehicles: Dict[int, Dict[str, Any]] = {}
+    for vehicle_id, routes, distance in db.query(
+        RouteHistory.vehicle_id,
+        func.count(RouteHistory.id),
+        _sum(RouteHistory.total_distance)
+    ).filter(
+        RouteHistory.vehicle_id.isnot(None), *_within(start, end, RouteHistory.date_created)
+    ).group_by(RouteHistory.vehicle_id):
+        vehicles[vehicle_id] = {"routes": routes, "route_distance": distance}
+    for vehicle_id, records, distance, fuel, fuel_count, utilization_sum, utilization_count in db.query(
+        VehicleUsage.vehicle_id,
+        func.count(VehicleUsage.id),
+        _sum(VehicleUsage.distance_traveled),
+        _sum(VehicleUsage.fuel_consumption),
+        func.count(VehicleUsage.fuel_consumption),
+        _sum(VehicleUsage.utilization_rate),
+        func.count(VehicleUsage.utilization_rate)
+    ).filter(*_within(start, end, VehicleUsage.date)).group_by(VehicleUsage.vehicle_id):
+        vehicles.setdefault(vehicle_id, {}).update({
+            "usage_records": records,
+            "distance_traveled": distance,
+            "fuel_consumption": fuel,
+            "fuel_count": fuel_count,
+            "utilization_sum": utilization_sum,
+            "utilization_count": utilization_count
+        })
+
+    depots: Dict[Optional[int], Dict[str, Any]] = {}
+    for depot_id, routes, distance, duration, orders in db.query(
+        RouteHistory.depot_id,
+        func.count(RouteHistory.id),
+        _sum(RouteHistory.total_distance),
+        _sum(RouteHistory.total_duration),
+        _sum(RouteHistory.total_orders)
+    ).filter(*_within(start, end, RouteHistory.date_created)).group_by(RouteHistory.depot_id):
+        depots[depot_id] = {"routes": routes, "distance": distance, "duration": duration, "orders": orders}
+    for depot_id, efficiency_sum, efficiency_count in db.query(
+        RouteHistory.depot_id,
+        _sum(RouteAnalytics.efficiency_score),
+        func.count(RouteAnalytics.efficiency_score)
+    ).select_from(RouteAnalytics).outerjoin(
+        RouteHistory, RouteHistory.id == RouteAnalytics.route_history_id
+    ).filter(*_within(start, end, RouteAnalytics.date)).group_by(RouteHistory.depot_id):
+        depots.setdefault(depot_id, {}).update({
+            "efficiency_sum": efficiency_sum,
+            "efficiency_count": efficiency_count
+        })
+
+    db.bulk_insert_mappings(DailyDriverStats, _rows(day, "driver_id", drivers))
+    db.bulk_insert_mappings(DailyVehicleStats, _rows(day, "vehicle_id", vehicles))
+    db.bulk_insert_mappings(DailyDepotStats, _rows(day, "depot_id", depots))
+
+def _rows(day: date, key: str, groups: Dict[Any, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [{"day": day, key: group_id, **values} for group_id, values in groups.items()]
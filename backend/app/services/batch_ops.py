@@ -0,0 +1,193 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+from pydantic import BaseModel
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from .geocoding_queue import enqueue_geocode
+from .address_index import index_address, unindex_address
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Columns that belong to the geocoded address of a row
+GEOCODE_COLUMNS = ("lat", "lng", "formatted_address", "place_id")
+
+def apply_batch(
+    db: Session,
+    model,
+    batch: BaseModel,
+    unique_field: Optional[str] = None,
+    geocode_entity: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Apply the creates, updates and deletes of a batch request in one transaction
+
+    Rows to update or delete and holders of the unique field are loaded
+    with one IN query each. Items that cannot be applied (unknown id, id
+    used twice, unique value taken) are skipped and reported; the others
+    are written in one flush, which batches the inserts and updates, and
+    one DELETE ... IN. If the database rejects that, e.g. a delete of a row
+    still referenced elsewhere, the items are applied one by one under
+    savepoints and only the rejected ones fail.
+
+    Args:
+        db: Database session
+        model: Model of the rows
+        batch: Request with create, update (items with id) and delete (ids) lists
+        unique_field: Column with a unique constraint, checked before writing
+        geocode_entity: Geocoding queue entity for models with an address
+
+    Returns:
+        dict: applied and failed counts and one result per item
+    """
+    results = []
+    ids = [item.id for item in batch.update] + list(batch.delete)
+    existing = {row.id: row for row in db.query(model).filter(model.id.in_(ids))} if ids else {}
+
+    # Current holders of the unique values used in the batch
+    holders = {}
+    claimed = set()
+    if unique_field:
+        column = getattr(model, unique_field)
+        values = [getattr(item, unique_field) for item in batch.create]
+        values += [getattr(item, unique_field) for item in batch.update if unique_field in item.__fields_set__]
+        values = [value for value in values if value is not None]
+        if values:
+            holders = dict(db.query(column, model.id).filter(column.in_(values)).all())
+
+    def is_taken(data: Dict[str, Any], row_id: Optional[int] = None) -> bool:
+        value = data.get(unique_field) if unique_field else None
+        if value is None:
+            return False
+        if value in claimed or holders.get(value, row_id) != row_id:
+            return True
+        claimed.add(value)
+        return False
+
+    def failed(action: str, index: int, row_id: Optional[int], status: str, error: str) -> None:
+        results.append({"action": action, "index": index, "id": row_id, "status": status, "error": error})
+
+    creates: List[Tuple[int, Dict[str, Any]]] = []
+    for index, item in enumerate(batch.create):
+        data = item.dict()
+        if is_taken(data):
+            failed("create", index, None, "conflict", f"{unique_field} already exists")
+            continue
+        creates.append((index, data))
+
+    touched = set()
+    updates: List[Tuple[int, int, Dict[str, Any], Optional[str]]] = []
+    for index, item in enumerate(batch.update):
+        data = item.dict(exclude_unset=True)
+        row_id = data.pop("id")
+        row = existing.get(row_id)
+        if row is None:
+            failed("update", index, row_id, "not_found", f"{model.__name__} not found")
+            continue
+        if row_id in touched:
+            failed("update", index, row_id, "conflict", "id appears more than once in the batch")
+            continue
+        if is_taken(data, row_id):
+            failed("update", index, row_id, "conflict", f"{unique_field} already exists")
+            continue
+        touched.add(row_id)
+        updates.append((index, row_id, data, getattr(row, "address", None)))
+
+    deletes: List[Tuple[int, int, Optional[str]]] = []
+    for index, row_id in enumerate(batch.delete):
+        row = existing.get(row_id)
+        if row is None:
+            failed("delete", index, row_id, "not_found", f"{model.__name__} not found")
+            continue
+        if row_id in touched:
+            failed("delete", index, row_id, "conflict", "id appears more than once in the batch")
+            continue
+        touched.add(row_id)
+        deletes.append((index, row_id, getattr(row, "address", None)))
+
+    def is_readdressed(data: Dict[str, Any], old_address: Optional[str]) -> bool:
+        return bool(geocode_entity) and "address" in data and data["address"] != old_address
+
+    def create(data: Dict[str, Any]):
+        row = model(**data)
+        db.add(row)
+        return row
+
+    def update(row_id: int, data: Dict[str, Any], old_address: Optional[str]) -> None:
+        row = existing[row_id]
+        for key, value in data.items():
+            setattr(row, key, value)
+        # Stored coordinates belong to the old address until the queue catches up
+        if is_readdressed(data, old_address):
+            for key in GEOCODE_COLUMNS:
+                setattr(row, key, None)
+
+    def delete(row_ids: List[int]) -> None:
+        db.query(model).filter(model.id.in_(row_ids)).delete(synchronize_session=False)
+
+    try:
+        created = [(index, create(data)) for index, data in creates]
+        for _, row_id, data, old_address in updates:
+            update(row_id, data, old_address)
+        updated = updates
+        deleted = deletes
+        db.flush()
+        if deleted:
+            delete([row_id for _, row_id, _ in deleted])
+        # Read before commit expires the rows
+        created_rows = [(index, row.id, getattr(row, "address", None)) for index, row in created]
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        logger.warning(f"{model.__name__} batch rejected by the database, applying items one by one: {str(e.orig).splitlines()[0]}")
+        created_rows, updated, deleted = _apply_items(db, creates, updates, deletes, create, update, delete, failed)
+
+    results.extend({"action": "create", "index": index, "id": row_id, "status": "created"} for index, row_id, _ in created_rows)
+    results.extend({"action": "update", "index": index, "id": row_id, "status": "updated"} for index, row_id, _, _ in updated)
+    results.extend({"action": "delete", "index": index, "id": row_id, "status": "deleted"} for index, row_id, _ in deleted)
+    results.sort(key=lambda result: (["create", "update", "delete"].index(result["action"]), result["index"]))
+
+    if geocode_entity:
+        for _, row_id, address in created_rows:
+            enqueue_geocode(geocode_entity, row_id, address)
+            index_address(address)
+        for _, row_id, data, old_address in updated:
+            if is_readdressed(data, old_address):
+                enqueue_geocode(geocode_entity, row_id, data["address"])
+                unindex_address(old_address)
+                index_address(data["address"])
+        for _, _, address in deleted:
+            unindex_address(address)
+
+    failures = sum(1 for result in results if "error" in result)
+    return {"applied": len(results) - failures, "failed": failures, "results": results}
+
+def _apply_items(db: Session, creates, updates, deletes, create, update, delete, failed) -> tuple:
+    """
+    Apply batch items one by one, each under a savepoint, in one transaction
+
+    Items the database rejects are reported as conflicts and the rest are
+    kept.
+
+    Returns:
+        tuple: (created rows, updated items, deleted items)
+    """
+    def apply(action: str, index: int, row_id: Optional[int], write: Callable[[], Any]) -> Any:
+        try:
+            with db.begin_nested():
+                written = write()
+                db.flush()
+            return written if written is not None else True
+        except IntegrityError as e:
+            failed(action, index, row_id, "conflict", f"Rejected by the database: {str(e.orig).splitlines()[0]}")
+            return None
+
+    created_rows = []
+    for index, data in creates:
+        row = apply("create", index, None, lambda: create(data))
+        if row is not None:
+            created_rows.append((index, row.id, getattr(row, "address", None)))
+    updated = [item for item in updates if apply("update", item[0], item[1], lambda: update(*item[1:]))]
+    deleted = [item for item in deletes if apply("delete", item[0], item[1], lambda: delete([item[1]]))]
+    db.commit()
+    return created_rows, updated, deleted
@@ -0,0 +1,459 @@
+from typing import Any, Callable, Dict, List, Tuple, Optional, NamedTuple
+from abc import ABC, abstractmethod
+from cachetools import TTLCache
+from datetime import date, datetime
+from decimal import Decimal
+import asyncio
+import json
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+import logging
+import numpy as np
+from ..config import settings
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Values larger than this are zlib-compressed before storing
+COMPRESS_THRESHOLD = 512
+
+# Format markers; entries written by older formats read as misses
+_RAW = b"\x02"
+_COMPRESSED = b"\x03"
+
+# Array dtypes that may be stored as raw bytes
+_ARRAY_DTYPES = {"bool", "uint8", "int32", "int64", "float32", "float64"}
+
+# Cacheable classes by name: (class, to JSON-compatible state, from state)
+_CACHE_TYPES: Dict[str, Tuple[type, Callable[[Any], Any], Callable[[Any], Any]]] = {}
+
+def register_cache_type(name: str, cls: type, encode: Callable[[Any], Any], decode: Callable[[Any], Any]) -> None:
+    """
+    Allow instances of a class to be cached
+
+    Args:
+        name: Stable name stored with each value
+        cls: The class
+        encode: Turns an instance into JSON-compatible state; numpy arrays are allowed
+        decode: Rebuilds an instance from that state
+    """
+    _CACHE_TYPES[name] = (cls, encode, decode)
+
+def serialize(value: Any) -> bytes:
+    """
+    Encode a cache value as compact bytes
+
+    Values are stored as JSON. Numpy arrays are stored as raw bytes with
+    their dtype and shape after the JSON document, and instances of
+    registered classes as their encoded state. Tuples come back as lists.
+
+    Raises:
+        TypeError: If the value holds anything else
+    """
+    blobs: List[bytes] = []
+    offset = 0
+
+    def encode(obj: Any) -> Any:
+        nonlocal offset
+        if isinstance(obj, np.ndarray):
+            if obj.dtype.name not in _ARRAY_DTYPES:
+                raise TypeError(f"Cannot cache arrays of dtype {obj.dtype.name}")
+            data = np.ascontiguousarray(obj).tobytes()
+            blobs.append(data)
+            offset += len(data)
+            return {"__ndarray__": [offset - len(data), len(data)], "dtype": obj.dtype.name, "shape": list(obj.shape)}
+        if isinstance(obj, np.generic):
+            return obj.item()
+        if isinstance(obj, Decimal):
+            return float(obj)
+        if isinstance(obj, (datetime, date)):
+            return obj.isoformat()
+        for name, (cls, to_state, _) in _CACHE_TYPES.items():
+            if type(obj) is cls:
+                return {"__type__": name, "state": to_state(obj)}
+        raise TypeError(f"Cannot cache values of type {type(obj).__name__}")
+
+    document = json.dumps(value, default=encode, separators=(",", ":")).encode("utf-8")
+    data = struct.pack(">I", len(document)) + document + b"".join(blobs)
+    if len(data) > COMPRESS_THRESHOLD:
+        return _COMPRESSED + zlib.compress(data)
+    return _RAW + data
+
+def deserialize(data: bytes) -> Any:
+    """
+    Decode bytes produced by serialize
+
+    Raises:
+        ValueError: If the data is not in this format
+    """
+    marker, data = data[:1], data[1:]
+    if marker == _COMPRESSED:
+        data = zlib.decompress(data)
+    elif marker != _RAW:
+        raise ValueError("Unknown cache value format")
+    size = struct.unpack(">I", data[:4])[0]
+    blobs = memoryview(data)[4 + size:]
+
+    def decode(obj: Dict[str, Any]) -> Any:
+        if "__ndarray__" in obj:
+            start, length = obj["__ndarray__"]
+            if obj["dtype"] not in _ARRAY_DTYPES:
+                raise ValueError(f"Unexpected array dtype {obj['dtype']}")
+            return np.frombuffer(blobs[start:start + length], dtype=obj["dtype"]).reshape(obj["shape"]).copy()
+        if "__type__" in obj:
+            if obj["__type__"] not in _CACHE_TYPES:
+                raise ValueError(f"Unknown cached type {obj['__type__']}")
+            return _CACHE_TYPES[obj["__type__"]][2](obj["state"])
+        return obj
+
+    return json.loads(data[4:4 + size].decode("utf-8"), object_hook=decode)
+
+def encode_key(key: Any) -> str:
+    """
+    Turn a cache key (string or cachetools hash key tuple) into a stable string
+    """
+    if isinstance(key, str):
+        return key
+    return repr(tuple(key))
+
+class CacheEntry(NamedTuple):
+    value: Any
+    fresh_until: float
+
+    @property
+    def stale(self) -> bool:
+        return self.fresh_until <= time.time()
+
+class CacheBackend(ABC):
+    """
+    Mapping-style cache interface shared by all backends
+
+    Supports `in`, item access and assignment so backends can be used with
+    `cachetools.cached` and wherever a TTLCache was used before.
+
+    Entries are fresh for `ttl` seconds and then kept for another `stale_ttl`
+    seconds, during which item access still returns them. Use lookup() to
+    tell stale entries apart.
+
+    Values that cannot be serialized are not cached. Async code should use
+    the *_async methods, which run blocking backends in a worker thread.
+    """
+
+    ttl: int = 0
+    stale_ttl: int = 0
+
+    # Whether reads and writes wait on disk or network I/O
+    blocking: bool = True
+
+    @abstractmethod
+    def _get(self, key: str) -> Optional[CacheEntry]:
+        ...
+
+    @abstractmethod
+    def _set(self, key: str, entry: CacheEntry) -> None:
+        ...
+
+    @abstractmethod
+    def _delete(self, key: str) -> None:
+        ...
+
+    def lookup(self, key: Any) -> Optional[CacheEntry]:
+        """
+        Get the entry for a key including its freshness, or None on a miss
+        """
+        return self._get(encode_key(key))
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        entry = self._get(encode_key(key))
+        return entry.value if entry is not None else default
+
+    def __getitem__(self, key: Any) -> Any:
+        entry = self._get(encode_key(key))
+        if entry is None:
+            raise KeyError(key)
+        return entry.value
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        try:
+            self._set(encode_key(key), CacheEntry(value, time.time() + self.ttl))
+        except TypeError as e:
+            logger.warning(f"Not caching value for {encode_key(key)}: {str(e)}")
+
+    def __delitem__(self, key: Any) -> None:
+        self._delete(encode_key(key))
+
+    def __contains__(self, key: Any) -> bool:
+        return self._get(encode_key(key)) is not None
+
+    async def _run(self, function: Callable, *args) -> Any:
+        if not self.blocking:
+            return function(*args)
+        return await asyncio.to_thread(function, *args)
+
+    async def lookup_async(self, key: Any) -> Optional[CacheEntry]:
+        return await self._run(self.lookup, key)
+
+    async def get_async(self, key: Any, default: Any = None) -> Any:
+        return await self._run(self.get, key, default)
+
+    async def set_async(self, key: Any, value: Any) -> None:
+        await self._run(self.__setitem__, key, value)
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    Per-process cache bounded by the serialized size of its values
+    """
+
+    blocking = False
+
+    def __init__(self, max_bytes: int, ttl: int, stale_ttl: int = 0):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._cache = TTLCache(maxsize=max_bytes, ttl=ttl + stale_ttl, getsizeof=lambda item: item[1])
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            item = self._cache.get(key)
+        return item[0] if item is not None else None
+
+    def _set(self, key: str, entry: CacheEntry) -> None:
+        item = (entry, len(serialize(entry.value)))
+        with self._lock:
+            try:
+                self._cache[key] = item
+            except ValueError:
+                # Larger than the whole cache
+                pass
+
+    def _delete(self, key: str) -> None:
+        with self._lock:
+            self._cache.pop(key, None)
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Cache in a SQLite file shared by every worker on the node
+
+    Entries expire after the TTL; when the namespace grows beyond max_bytes
+    the least recently used entries are evicted. Access times are collected
+    in memory and written in batches, so reads do not write.
+    """
+
+    # Check the total size after this many writes
+    EVICTION_CHECK_INTERVAL = 100
+
+    # Seconds between writes of collected access times
+    ACCESS_FLUSH_INTERVAL = 30
+
+    def __init__(self, path: str, namespace: str, max_bytes: int, ttl: int, stale_ttl: int = 0):
+        self.path = path
+        self.namespace = namespace
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._accessed: Dict[str, float] = {}
+        self._flushed_at = time.time()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries ("
+            "namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, size INTEGER NOT NULL, "
+            "fresh_until REAL NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL, "
+            "PRIMARY KEY (namespace, key))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_entries_accessed ON cache_entries (namespace, accessed_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def _get(self, key: str) -> Optional[CacheEntry]:
+        conn = self._connection()
+        now = time.time()
+        row = conn.execute(
+            "SELECT value, fresh_until FROM cache_entries WHERE namespace = ? AND key = ? AND expires_at > ?",
+            (self.namespace, key, now)
+        ).fetchone()
+        if row is None:
+            return None
+        with self._lock:
+            self._accessed[key] = now
+            flush = now - self._flushed_at >= self.ACCESS_FLUSH_INTERVAL
+        if flush:
+            self._flush_accessed()
+        try:
+            return CacheEntry(deserialize(row[0]), row[1])
+        except ValueError:
+            return None
+
+    def _set(self, key: str, entry: CacheEntry) -> None:
+        data = serialize(entry.value)
+        now = time.time()
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache_entries (namespace, key, value, size, fresh_until, expires_at, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (self.namespace, key, data, len(data), entry.fresh_until, entry.fresh_until + self.stale_ttl, now)
+        )
+        with self._lock:
+            self._writes += 1
+            evict = self._writes % self.EVICTION_CHECK_INTERVAL == 0
+        if evict:
+            self._evict()
+
+    def _delete(self, key: str) -> None:
+        self._connection().execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+            (self.namespace, key)
+        )
+
+    def _flush_accessed(self) -> None:
+        """
+        Write the access times collected since the last flush
+        """
+        with self._lock:
+            accessed, self._accessed = self._accessed, {}
+            self._flushed_at = time.time()
+        if accessed:
+            self._connection().executemany(
+                "UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ? AND accessed_at < ?",
+                [(at, self.namespace, key, at) for key, at in accessed.items()]
+            )
+
+    def _evict(self) -> None:
+        self._flush_accessed()
+        conn = self._connection()
+        conn.execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND expires_at <= ?",
+            (self.namespace, time.time())
+        )
+        total = conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM cache_entries WHERE namespace = ?",
+            (self.namespace,)
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Drop least recently used entries until the namespace fits again
+        excess = total - self.max_bytes
+        freed = 0
+        victims = []
+        for key, size in conn.execute(
+            "SELECT key, size FROM cache_entries WHERE namespace = ? ORDER BY accessed_at",
+            (self.namespace,)
+        ):
+            victims.append((self.namespace, key))
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", victims)
+        logger.info(f"Evicted {len(victims)} entries from cache {self.namespace}")
+
+class LocalKeyValueClient:
+    """
+    In-process stand-in for a network key-value store such as Redis
+
+    Implements the subset of the redis-py client used by KeyValueCacheBackend.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[bytes, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._data.get(name)
+            if entry is None or entry[1] <= time.time():
+                self._data.pop(name, None)
+                return None
+            return entry[0]
+
+    def set(self, name: str, value: bytes, ex: Optional[int] = None) -> bool:
+        with self._lock:
+            self._data[name] = (value, time.time() + ex if ex else float("inf"))
+        return True
+
+    def delete(self, name: str) -> int:
+        with self._lock:
+            return 1 if self._data.pop(name, None) is not None else 0
+
+class KeyValueCacheBackend(CacheBackend):
+    """
+    Cache in a network key-value store shared by all workers and nodes
+
+    Size-aware eviction is left to the store (e.g. Redis maxmemory with an
+    LRU policy); entries expire once their stale period is over.
+    """
+
+    def __init__(self, client, namespace: str, ttl: int, stale_ttl: int = 0):
+        self.client = client
+        self.blocking = not isinstance(client, LocalKeyValueClient)
+        self.namespace = namespace
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+
+    def _name(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _get(self, key: str) -> Optional[CacheEntry]:
+        data = self.client.get(self._name(key))
+        if data is None:
+            return None
+        try:
+            return CacheEntry(*deserialize(data))
+        except ValueError:
+            return None
+
+    def _set(self, key: str, entry: CacheEntry) -> None:
+        ex = max(1, int(entry.fresh_until - time.time()) + self.stale_ttl)
+        self.client.set(self._name(key), serialize(tuple(entry)), ex=ex)
+
+    def _delete(self, key: str) -> None:
+        self.client.delete(self._name(key))
+
+_kv_client = None
+
+def _get_kv_client():
+    """
+    Get the shared key-value client for the configured backend
+    """
+    global _kv_client
+    if _kv_client is None:
+        if settings.CACHE_BACKEND == "redis":
+            import redis
+            _kv_client = redis.Redis.from_url(settings.CACHE_REDIS_URL)
+        else:
+            _kv_client = LocalKeyValueClient()
+    return _kv_client
+
+def create_cache(namespace: str, max_bytes: int, ttl: int, stale_ttl: int = 0) -> CacheBackend:
+    """
+    Create a cache for one namespace using the backend selected in settings
+
+    Args:
+        namespace: Cache name, keeps entries of different caches apart
+        max_bytes: Size budget for backends that evict locally
+        ttl: Seconds an entry stays fresh
+        stale_ttl: Seconds an expired entry is still served while it is refreshed
+
+    Returns:
+        CacheBackend: Cache instance
+
+    Raises:
+        ImportError: If the redis backend is selected without the redis package
+    """
+    backend = settings.CACHE_BACKEND
+    if backend == "sqlite":
+        return SQLiteCacheBackend(settings.CACHE_SQLITE_PATH, namespace, max_bytes, ttl, stale_ttl)
+    if backend in ("redis", "kv-local"):
+        return KeyValueCacheBackend(_get_kv_client(), namespace, ttl, stale_ttl)
+    return MemoryCacheBackend(max_bytes, ttl, stale_ttl)
@@ -0,0 +1,154 @@
+from typing import Any, Callable, Dict, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+import logging
+from ..config import settings
+from .cache_backend import CacheBackend, encode_key
+from .quota_governor import call_priority, BATCH
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+class CacheRefresher:
+    """
+    Keeps cached values fresh without making interactive requests wait
+
+    Stale hits are served immediately and refreshed in the background. Hits
+    are counted per key, and a scheduler thread re-fetches the hottest keys
+    shortly before they go stale. Counts decay every cycle so keys that are
+    no longer used drop out.
+    """
+
+    def __init__(self):
+        # (cache id, key) -> [hits, cache, key, loader]
+        self._tracked: Dict[Tuple[int, str], list] = {}
+        self._inflight: set = set()
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._scheduler: Optional[threading.Thread] = None
+
+    def get(self, cache: CacheBackend, key: Any, loader: Callable[[], Any], default: Any = None) -> Any:
+        """
+        Read a cached value, refreshing it in the background if it is stale
+
+        Args:
+            cache: Cache to read
+            key: Cache key
+            loader: Fetches a fresh value for the key without using the cache;
+                a None result keeps the current entry
+            default: Returned on a miss
+
+        Returns:
+            The cached value, stale or not, or default on a miss
+        """
+        return self._serve(cache, key, loader, cache.lookup(key), default)
+
+    async def get_async(self, cache: CacheBackend, key: Any, loader: Callable[[], Any], default: Any = None) -> Any:
+        """
+        Non-blocking variant of get for use on the event loop
+        """
+        return self._serve(cache, key, loader, await cache.lookup_async(key), default)
+
+    def _serve(self, cache: CacheBackend, key: Any, loader: Callable[[], Any], entry, default: Any) -> Any:
+        if entry is None:
+            return default
+        self._record_hit(cache, key, loader)
+        if entry.stale:
+            self.submit(cache, key, loader)
+        return entry.value
+
+    def _record_hit(self, cache: CacheBackend, key: Any, loader: Callable[[], Any]) -> None:
+        tracked_key = (id(cache), encode_key(key))
+        with self._lock:
+            tracked = self._tracked.get(tracked_key)
+            if tracked is not None:
+                tracked[0] += 1
+                tracked[3] = loader
+            elif len(self._tracked) < settings.CACHE_REFRESH_TRACKED_KEYS:
+                self._tracked[tracked_key] = [1, cache, key, loader]
+        self._ensure_scheduler()
+
+    def submit(self, cache: CacheBackend, key: Any, loader: Callable[[], Any]) -> None:
+        """
+        Refresh one key in the background unless a refresh is already running
+        """
+        inflight_key = (id(cache), encode_key(key))
+        with self._lock:
+            if inflight_key in self._inflight:
+                return
+            self._inflight.add(inflight_key)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=settings.CACHE_REFRESH_WORKERS,
+                    thread_name_prefix="cache-refresh"
+                )
+        self._executor.submit(self._refresh, cache, key, loader, inflight_key)
+
+    def _refresh(self, cache: CacheBackend, key: Any, loader: Callable[[], Any], inflight_key) -> None:
+        try:
+            with call_priority(BATCH):
+                value = loader()
+            if value is not None:
+                cache[key] = value
+        except Exception as e:
+            logger.error(f"Error refreshing cache entry: {str(e)}")
+        finally:
+            with self._lock:
+                self._inflight.discard(inflight_key)
+
+    def _ensure_scheduler(self) -> None:
+        """
+        Start the scheduler thread on first use
+        """
+        if self._scheduler is not None and self._scheduler.is_alive():
+            return
+        with self._lock:
+            if self._scheduler is None or not self._scheduler.is_alive():
+                self._scheduler = threading.Thread(target=self._run, name="cache-refresh-scheduler", daemon=True)
+                self._scheduler.start()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(settings.CACHE_REFRESH_INTERVAL)
+            try:
+                self.refresh_hot_keys()
+            except Exception as e:
+                logger.error(f"Error refreshing hot cache keys: {str(e)}")
+
+    def refresh_hot_keys(self) -> int:
+        """
+        Refresh the most used keys that go stale within CACHE_REFRESH_AHEAD
+
+        Returns:
+            int: Number of refreshes started
+        """
+        with self._lock:
+            candidates = sorted(
+                (tracked for tracked in self._tracked.values() if tracked[0] >= settings.CACHE_REFRESH_MIN_HITS),
+                key=lambda tracked: -tracked[0]
+            )
+            # Decay counts so only recent popularity matters
+            for tracked_key, tracked in list(self._tracked.items()):
+                tracked[0] //= 2
+                if tracked[0] == 0:
+                    del self._tracked[tracked_key]
+
+        horizon = time.time() + settings.CACHE_REFRESH_AHEAD
+        started = 0
+        for _, cache, key, loader in candidates:
+            if started >= settings.CACHE_REFRESH_MAX_KEYS:
+                break
+            # Another worker sharing the cache may already have refreshed it
+            entry = cache.lookup(key)
+            if entry is None or entry.fresh_until > horizon:
+                continue
+            self.submit(cache, key, loader)
+            started += 1
+
+        if started:
+            logger.info(f"Refreshing {started} hot cache entries")
+        return started
+
+# Shared refresher for this worker
+refresher = CacheRefresher()
@@ -0,0 +1,257 @@
+from typing import List, Dict, Any, Tuple, Optional
+import time
+import numpy as np
+from .maps_client import MapsApiError
+from .cache_backend import register_cache_type
+
+# Value used for element pairs without a route
+UNREACHABLE = 999999
+
+# Status reported for elements that were never requested
+NOT_CALCULATED = "NOT_CALCULATED"
+
+class CompactMatrix:
+    """
+    Distance matrix stored as packed arrays
+
+    Distances and durations are int32 arrays, element success is a packed
+    bitmask and only failed elements keep their status string. The Google
+    response dict is rebuilt by to_result() when a caller needs it.
+
+    fetched_at is when the data was fetched from Google (epoch seconds), or
+    the oldest fetch for assembled matrices; None if unknown.
+    """
+
+    def __init__(
+        self,
+        origins: List[str],
+        destinations: List[str],
+        distances: np.ndarray,
+        durations: np.ndarray,
+        ok_bits: np.ndarray,
+        statuses: Optional[Dict[int, str]] = None,
+        durations_in_traffic: Optional[np.ndarray] = None,
+        fetched_at: Optional[float] = None
+    ):
+        self.origins = origins
+        self.destinations = destinations
+        self.distances = distances
+        self.durations = durations
+        self.ok_bits = ok_bits
+        self.statuses = statuses or {}
+        self.durations_in_traffic = durations_in_traffic
+        self.fetched_at = fetched_at
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return len(self.origins), len(self.destinations)
+
+    @property
+    def ok(self) -> np.ndarray:
+        """
+        Boolean matrix of elements with a valid route
+        """
+        n, m = self.shape
+        return np.unpackbits(self.ok_bits, count=n * m).reshape(n, m).astype(bool)
+
+    def has_live_traffic(self, max_age: float) -> bool:
+        """
+        Whether durations in traffic are available and fetched within max_age seconds
+        """
+        return (
+            self.durations_in_traffic is not None
+            and self.fetched_at is not None
+            and time.time() - self.fetched_at <= max_age
+        )
+
+    @classmethod
+    def from_result(cls, origins: List[str], destinations: List[str], result: Dict[str, Any]) -> "CompactMatrix":
+        """
+        Pack a distance matrix API response
+
+        Args:
+            origins: Origins in the order they were requested
+            destinations: Destinations in the order they were requested
+            result: Distance matrix response
+
+        Raises:
+            MapsApiError: If the response status is not OK
+        """
+        if result.get("status") != "OK":
+            raise MapsApiError(result.get("status"), result.get("error_message"))
+
+        n, m = len(origins), len(destinations)
+        distances = np.zeros((n, m), dtype=np.int32)
+        durations = np.zeros((n, m), dtype=np.int32)
+        durations_in_traffic = None
+        ok = np.zeros((n, m), dtype=bool)
+        statuses: Dict[int, str] = {}
+
+        for i, row in enumerate(result.get("rows", [])):
+            for j, element in enumerate(row.get("elements", [])):
+                if element.get("status") != "OK":
+                    statuses[i * m + j] = element.get("status")
+                    continue
+                ok[i, j] = True
+                distances[i, j] = element.get("distance", {}).get("value", 0)
+                durations[i, j] = element.get("duration", {}).get("value", 0)
+                if "duration_in_traffic" in element:
+                    if durations_in_traffic is None:
+                        durations_in_traffic = np.zeros((n, m), dtype=np.int32)
+                    durations_in_traffic[i, j] = element["duration_in_traffic"].get("value", 0)
+
+        return cls(origins, destinations, distances, durations, np.packbits(ok), statuses, durations_in_traffic, time.time())
+
+    @classmethod
+    def assemble(cls, locations: List[str], tiles: List[Tuple[int, int, "CompactMatrix"]]) -> "CompactMatrix":
+        """
+        Build the full matrix between all locations from fetched tiles
+
+        Self-distances are zero; elements not covered by any tile are left
+        NOT_CALCULATED. Durations in traffic are kept only if every tile has
+        them.
+
+        Args:
+            locations: All locations
+            tiles: (origin offset, destination offset, tile) tuples
+        """
+        n = len(locations)
+        distances = np.zeros((n, n), dtype=np.int32)
+        durations = np.zeros((n, n), dtype=np.int32)
+        durations_in_traffic = np.zeros((n, n), dtype=np.int32) if tiles else None
+        ok = np.eye(n, dtype=bool)
+        statuses: Dict[int, str] = {}
+        fetched = [tile.fetched_at for _, _, tile in tiles]
+        fetched_at = min(fetched) if fetched and None not in fetched else None
+
+        for i, j, tile in tiles:
+            rows, cols = tile.shape
+            block = (slice(i, i + rows), slice(j, j + cols))
+            distances[block] = tile.distances
+            durations[block] = tile.durations
+            ok[block] = tile.ok
+            if tile.durations_in_traffic is None:
+                durations_in_traffic = None
+            elif durations_in_traffic is not None:
+                durations_in_traffic[block] = tile.durations_in_traffic
+            for index, status in tile.statuses.items():
+                k, l = divmod(index, cols)
+                statuses[(i + k) * n + j + l] = status
+
+        return cls(
+            locations.copy(), locations.copy(), distances, durations, np.packbits(ok), statuses,
+            durations_in_traffic, fetched_at
+        )
+
+    def take(self, origins: List[str], destinations: List[str]) -> "CompactMatrix":
+        """
+        Select the given origins and destinations, in that order
+        """
+        if origins == self.origins and destinations == self.destinations:
+            return self
+        row_of = {origin: i for i, origin in enumerate(self.origins)}
+        col_of = {destination: j for j, destination in enumerate(self.destinations)}
+        rows = np.array([row_of[origin] for origin in origins], dtype=np.intp)
+        cols = np.array([col_of[destination] for destination in destinations], dtype=np.intp)
+        grid = np.ix_(rows, cols)
+        m = len(self.destinations)
+        statuses = {}
+        for k, i in enumerate(rows):
+            for l, j in enumerate(cols):
+                status = self.statuses.get(int(i) * m + int(j))
+                if status is not None:
+                    statuses[k * len(destinations) + l] = status
+        return CompactMatrix(
+            list(origins),
+            list(destinations),
+            self.distances[grid],
+            self.durations[grid],
+            np.packbits(self.ok[grid]),
+            statuses,
+            self.durations_in_traffic[grid] if self.durations_in_traffic is not None else None,
+            self.fetched_at
+        )
+
+    def arrays(self, unreachable: int = UNREACHABLE, traffic: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Distance (meters) and duration (seconds) matrices with failed elements
+        set to the unreachable value
+
+        Args:
+            unreachable: Value of failed elements
+            traffic: Use durations in traffic where available
+        """
+        ok = self.ok
+        durations = self.durations_in_traffic if traffic and self.durations_in_traffic is not None else self.durations
+        return (
+            np.where(ok, self.distances, unreachable).astype(np.int32),
+            np.where(ok, durations, unreachable).astype(np.int32)
+        )
+
+    def to_result(
+        self,
+        origins: Optional[List[str]] = None,
+        destinations: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Rebuild the distance matrix response shape
+
+        Args:
+            origins: Labels for the origin addresses, defaults to the stored keys
+            destinations: Labels for the destination addresses, defaults to the stored keys
+        """
+        ok = self.ok
+        m = len(self.destinations)
+        rows = []
+        for i in range(len(self.origins)):
+            elements = []
+            for j in range(m):
+                if not ok[i, j]:
+                    elements.append({"status": self.statuses.get(i * m + j, NOT_CALCULATED)})
+                    continue
+                element = {
+                    "status": "OK",
+                    "distance": _distance_value(int(self.distances[i, j])),
+                    "duration": _duration_value(int(self.durations[i, j]))
+                }
+                if self.durations_in_traffic is not None:
+                    element["duration_in_traffic"] = _duration_value(int(self.durations_in_traffic[i, j]))
+                elements.append(element)
+            rows.append({"elements": elements})
+
+        return {
+            "status": "OK",
+            "origin_addresses": list(origins if origins is not None else self.origins),
+            "destination_addresses": list(destinations if destinations is not None else self.destinations),
+            "rows": rows
+        }
+
+def _matrix_state(matrix: CompactMatrix) -> Dict[str, Any]:
+    return {
+        "origins": matrix.origins,
+        "destinations": matrix.destinations,
+        "distances": matrix.distances,
+        "durations": matrix.durations,
+        "ok_bits": matrix.ok_bits,
+        "statuses": sorted(matrix.statuses.items()),
+        "durations_in_traffic": matrix.durations_in_traffic,
+        "fetched_at": matrix.fetched_at,
+    }
+
+def _matrix_from_state(state: Dict[str, Any]) -> CompactMatrix:
+    return CompactMatrix(**{**state, "statuses": {int(index): status for index, status in state["statuses"]}})
+
+register_cache_type("compact_matrix", CompactMatrix, _matrix_state, _matrix_from_state)
+
+def _distance_value(meters: int) -> Dict[str, Any]:
+    text = f"{meters / 1000:.1f} km" if meters >= 1000 else f"{meters} m"
+    return {"value": meters, "text": text}
+
+def _duration_value(seconds: int) -> Dict[str, Any]:
+    hours, minutes = divmod(round(seconds / 60), 60)
+    parts = []
+    if hours:
+        parts.append(f"{hours} hour" if hours == 1 else f"{hours} hours")
+    if minutes or not hours:
+        parts.append(f"{minutes} min" if minutes == 1 else f"{minutes} mins")
+    return {"value": seconds, "text": " ".join(parts)}
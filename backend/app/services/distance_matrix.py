@@ -1,28 +1,50 @@
 import googlemaps
-from cachetools import TTLCache, cached
-from functools import lru_cache
+from cachetools import cached
+from functools import lru_cache, partial
 import hashlib
 import json
 from typing import List, Dict, Any, Tuple, Optional
+import asyncio
 from ..config import settings
+from .maps_client import get_async_client, MapsApiError
+from .compact_matrix import CompactMatrix
+from .location_keys import location_id
+from .cache_backend import create_cache
+from .cache_refresh import refresher
+from .quota_governor import call_with_quota, call_with_quota_async
 import logging
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
-# Initialize Google Maps client
-gmaps = googlemaps.Client(key=settings.GOOGLE_MAPS_API_KEY) if settings.GOOGLE_MAPS_API_KEY else None
+# Initialize Google Maps client; quota retries are handled by the quota governor
+gmaps = googlemaps.Client(key=settings.GOOGLE_MAPS_API_KEY, retry_over_query_limit=False) if settings.GOOGLE_MAPS_API_KEY else None
 
-# Create cache for distance matrix results
-distance_matrix_cache = TTLCache(
-    maxsize=settings.DISTANCE_MATRIX_CACHE_SIZE, 
-    ttl=settings.DISTANCE_MATRIX_CACHE_TTL
+# Create cache for distance matrix results; expired entries are served while they are refreshed
+distance_matrix_cache = create_cache(
+    "distance_matrix",
+    settings.DISTANCE_MATRIX_CACHE_MAX_BYTES,
+    settings.DISTANCE_MATRIX_CACHE_TTL,
+    stale_ttl=settings.CACHE_STALE_TTL
 )
 
+# Request options of the tiles fetched by batch_distance_matrix (fetch_matrix defaults)
+_TILE_OPTIONS = {
+    "mode": "driving",
+    "avoid": None,
+    "units": "metric",
+    "departure_time": "now",
+    "traffic_model": None
+}
+
 def _generate_cache_key(origins, destinations, **kwargs) -> str:
     """
     Generate a cache key for the distance matrix request
     
+    Locations are keyed by their canonical location IDs, so different
+    spellings of an address and nearby coordinates on the same grid cell
+    share cache entries.
+    
     Args:
         origins: List of origin addresses or coordinates
         destinations: List of destination addresses or coordinates
@@ -33,8 +55,8 @@ def _generate_cache_key(origins, destinations, **kwargs) -> str:
     """
     # Create a string representation of the request
     key_dict = {
-        'origins': sorted(origins) if isinstance(origins, list) else origins,
-        'destinations': sorted(destinations) if isinstance(destinations, list) else destinations,
+        'origins': sorted(_location_ids(origins)),
+        'destinations': sorted(_location_ids(destinations)),
         **kwargs
     }
     
@@ -42,6 +64,12 @@ def _generate_cache_key(origins, destinations, **kwargs) -> str:
     key_str = json.dumps(key_dict, sort_keys=True)
     return hashlib.md5(key_str.encode()).hexdigest()
 
+def _location_ids(locations: List[str]) -> List[str]:
+    """
+    Canonical IDs of the locations of a request, used as matrix rows and columns
+    """
+    return [location_id(location) for location in locations]
+
 def get_distance_matrix(
     origins: List[str],
     destinations: List[str],
@@ -66,14 +94,55 @@ def get_distance_matrix(
     Returns:
         dict: Distance matrix response
     """
-    if not gmaps:
-        logger.error("Google Maps API key not configured")
+    try:
+        matrix = fetch_matrix(origins, destinations, mode, avoid, units, departure_time, traffic_model)
+        return matrix.to_result(origins, destinations)
+    except Exception as e:
+        logger.error(f"Error getting distance matrix: {str(e)}")
+        return {
+            "status": "ERROR",
+            "error_message": str(e)
+        }
+
+async def get_distance_matrix_async(
+    origins: List[str],
+    destinations: List[str],
+    mode: str = "driving",
+    avoid: Optional[List[str]] = None,
+    units: str = "metric",
+    departure_time = "now",
+    traffic_model: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Non-blocking variant of get_distance_matrix sharing the same cache
+    """
+    try:
+        matrix = await fetch_matrix_async(origins, destinations, mode, avoid, units, departure_time, traffic_model)
+        return matrix.to_result(origins, destinations)
+    except Exception as e:
+        logger.error(f"Error getting distance matrix: {str(e)}")
         return {
             "status": "ERROR",
-            "error_message": "Google Maps API key not configured"
+            "error_message": str(e)
         }
+
+def fetch_matrix(
+    origins: List[str],
+    destinations: List[str],
+    mode: str = "driving",
+    avoid: Optional[List[str]] = None,
+    units: str = "metric",
+    departure_time = "now",
+    traffic_model: Optional[str] = None
+) -> CompactMatrix:
+    """
+    Get a distance matrix in compact form, from the cache when possible
+    
+    Takes the same arguments as get_distance_matrix.
     
-    # Generate cache key
+    Raises:
+        Exception: If the API call fails
+    """
     cache_key = _generate_cache_key(
         origins, 
         destinations, 
@@ -84,45 +153,115 @@ def get_distance_matrix(
         traffic_model=traffic_model
     )
     
+    params = _build_request_params(origins, destinations, mode, avoid, units, departure_time, traffic_model)
+    
     # Check cache
-    if cache_key in distance_matrix_cache:
-        logger.info("Distance matrix cache hit")
-        return distance_matrix_cache[cache_key]
+    matrix = _cached_matrix(cache_key, params)
+    if matrix is not None:
+        return matrix
     
-    try:
-        logger.info(f"Getting distance matrix for {len(origins)} origins and {len(destinations)} destinations")
-        
-        # Build request parameters
-        params = {
-            "origins": origins,
-            "destinations": destinations,
-            "mode": mode,
-            "units": units,
-        }
-        
-        if avoid:
-            params["avoid"] = "|".join(avoid)
-            
-        if departure_time:
-            params["departure_time"] = departure_time
-            
-        if traffic_model and departure_time:
-            params["traffic_model"] = traffic_model
-        
-        # Make API request
-        result = gmaps.distance_matrix(**params)
+    matrix = _request_matrix(params)
+    distance_matrix_cache[cache_key] = matrix
+    return matrix
+
+def _request_matrix(params: Dict[str, Any]) -> CompactMatrix:
+    """
+    Fetch a distance matrix from Google, bypassing the cache
+    """
+    if not gmaps:
+        raise MapsApiError("REQUEST_DENIED", "Google Maps API key not configured")
+    
+    origins, destinations = params["origins"], params["destinations"]
+    logger.info(f"Getting distance matrix for {len(origins)} origins and {len(destinations)} destinations")
+    result = call_with_quota(gmaps.distance_matrix, elements=len(origins) * len(destinations), **params)
+    return CompactMatrix.from_result(_location_ids(origins), _location_ids(destinations), result)
+
+async def fetch_matrix_async(
+    origins: List[str],
+    destinations: List[str],
+    mode: str = "driving",
+    avoid: Optional[List[str]] = None,
+    units: str = "metric",
+    departure_time = "now",
+    traffic_model: Optional[str] = None
+) -> CompactMatrix:
+    """
+    Non-blocking variant of fetch_matrix sharing the same cache
+    """
+    cache_key = _generate_cache_key(
+        origins, 
+        destinations, 
+        mode=mode, 
+        avoid=avoid, 
+        units=units,
+        departure_time=departure_time,
+        traffic_model=traffic_model
+    )
+    
+    params = _build_request_params(origins, destinations, mode, avoid, units, departure_time, traffic_model)
+    
+    matrix = await _cached_matrix_async(cache_key, params)
+    if matrix is not None:
+        return matrix
+    
+    client = get_async_client()
+    if not client:
+        raise MapsApiError("REQUEST_DENIED", "Google Maps API key not configured")
+    
+    logger.info(f"Getting distance matrix for {len(origins)} origins and {len(destinations)} destinations")
+    result = await call_with_quota_async(
+        client.distance_matrix, elements=len(origins) * len(destinations), **params
+    )
+    
+    matrix = CompactMatrix.from_result(_location_ids(origins), _location_ids(destinations), result)
+    await distance_matrix_cache.set_async(cache_key, matrix)
+    return matrix
+
+def _cached_matrix(cache_key: str, params: Dict[str, Any]) -> Optional[CompactMatrix]:
+    """
+    Look up a cached matrix and order it like the request
+    
+    Cache keys ignore the order of origins and destinations, so the cached
+    entry may have been stored for a different ordering of the same locations.
+    Expired entries are returned and refreshed in the background.
+    """
+    matrix = refresher.get(distance_matrix_cache, cache_key, partial(_request_matrix, params))
+    return _ordered_hit(matrix, params)
+
+async def _cached_matrix_async(cache_key: str, params: Dict[str, Any]) -> Optional[CompactMatrix]:
+    """
+    Non-blocking variant of _cached_matrix
+    """
+    matrix = await refresher.get_async(distance_matrix_cache, cache_key, partial(_request_matrix, params))
+    return _ordered_hit(matrix, params)
+
+def _ordered_hit(matrix: Optional[CompactMatrix], params: Dict[str, Any]) -> Optional[CompactMatrix]:
+    if matrix is None:
+        return None
+    logger.info("Distance matrix cache hit")
+    return matrix.take(_location_ids(params["origins"]), _location_ids(params["destinations"]))
+
+def _build_request_params(origins, destinations, mode, avoid, units, departure_time, traffic_model) -> Dict[str, Any]:
+    """
+    Build distance matrix request parameters shared by both clients
+    """
+    params = {
+        "origins": origins,
+        "destinations": destinations,
+        "mode": mode,
+        "units": units,
+    }
+    
+    if avoid:
+        params["avoid"] = "|".join(avoid)
         
-        # Cache result
-        if result.get("status") == "OK":
-            distance_matrix_cache[cache_key] = result
+    if departure_time:
+        params["departure_time"] = departure_time
         
-        return result
-    except Exception as e:
-        logger.error(f"Error getting distance matrix: {str(e)}")
-        return {
-            "status": "ERROR",
-            "error_message": str(e)
-        }
+    if traffic_model and departure_time:
+        params["traffic_model"] = traffic_model
+    
+    return params
 
 def extract_distance_duration(matrix_result: Dict[str, Any], origin_idx: int, dest_idx: int) -> Dict[str, Any]:
     """
@@ -165,10 +304,78 @@ def extract_distance_duration(matrix_result: Dict[str, Any], origin_idx: int, de
             "error_message": f"Error extracting data: {str(e)}"
         }
 
-def batch_distance_matrix(
+def _plan_tiles(locations: List[str], max_elements: int) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+    """
+    Split the full matrix into tiles of at most max_elements elements
+    
+    Returns:
+        tuple: Diagonal tiles (handled locally) and off-diagonal tiles to request,
+        each given by its origin and destination start offsets
+    """
+    # Each batch will have origins × destinations elements
+    locations_per_batch = int(max_elements ** 0.5)
+    diagonal = []
+    requested = []
+    for i in range(0, len(locations), locations_per_batch):
+        for j in range(0, len(locations), locations_per_batch):
+            (diagonal if i == j else requested).append((i, j))
+    return diagonal, requested
+
+def missing_tiles(locations: List[str], max_elements: int = 100) -> List[Tuple[List[str], List[str]]]:
+    """
+    Find the tiles batch_distance_matrix_compact would request that are not
+    cached or have gone stale
+    
+    Args:
+        locations: List of location addresses or coordinates
+        max_elements: Maximum number of elements per request (Google Maps limit)
+        
+    Returns:
+        list: (origins, destinations) of each missing tile
+    """
+    locations_per_batch = int(max_elements ** 0.5)
+    _, requested = _plan_tiles(locations, max_elements)
+    missing = []
+    for i, j in requested:
+        origins = locations[i:i + locations_per_batch]
+        destinations = locations[j:j + locations_per_batch]
+        entry = distance_matrix_cache.lookup(_generate_cache_key(origins, destinations, **_TILE_OPTIONS))
+        if entry is None or entry.stale:
+            missing.append((origins, destinations))
+    return missing
+
+def refresh_tile(origins: List[str], destinations: List[str]) -> CompactMatrix:
+    """
+    Fetch a tile from Google and store it in the cache, even if a stale entry exists
+    """
+    matrix = _request_matrix(_build_request_params(origins, destinations, **_TILE_OPTIONS))
+    distance_matrix_cache[_generate_cache_key(origins, destinations, **_TILE_OPTIONS)] = matrix
+    return matrix
+
+def _fetch_tile(locations: List[str], i: int, j: int, size: int) -> Optional[Tuple[int, int, CompactMatrix]]:
+    """
+    Fetch one off-diagonal tile, logging and skipping it on failure
+    """
+    try:
+        return i, j, fetch_matrix(locations[i:i + size], locations[j:j + size])
+    except Exception as e:
+        logger.error(f"Error in batch distance matrix: {str(e)}")
+        return None
+
+async def _fetch_tile_async(locations: List[str], i: int, j: int, size: int) -> Optional[Tuple[int, int, CompactMatrix]]:
+    """
+    Non-blocking variant of _fetch_tile
+    """
+    try:
+        return i, j, await fetch_matrix_async(locations[i:i + size], locations[j:j + size])
+    except Exception as e:
+        logger.error(f"Error in batch distance matrix: {str(e)}")
+        return None
+
+def batch_distance_matrix_compact(
     locations: List[str],
     max_elements: int = 100
-) -> Dict[str, Any]:
+) -> CompactMatrix:
     """
     Calculate distances between all locations in a batch-efficient way
     
@@ -177,58 +384,75 @@ def batch_distance_matrix(
         max_elements: Maximum number of elements per request (Google Maps limit)
         
     Returns:
-        dict: Full distance matrix between all locations
+        CompactMatrix: Full distance matrix between all locations; tiles
+        that could not be fetched are left NOT_CALCULATED
     """
-    n = len(locations)
+    locations_per_batch = int(max_elements ** 0.5)
+    # Diagonal tiles are skipped, self-distances are known to be 0
+    _, requested = _plan_tiles(locations, max_elements)
+    tiles = [_fetch_tile(locations, i, j, locations_per_batch) for i, j in requested]
+    return CompactMatrix.assemble(locations, [tile for tile in tiles if tile is not None])
+
+async def batch_distance_matrix_compact_async(
+    locations: List[str],
+    max_elements: int = 100
+) -> CompactMatrix:
+    """
+    Non-blocking variant of batch_distance_matrix_compact that fetches tiles concurrently
+    """
+    locations_per_batch = int(max_elements ** 0.5)
+    _, requested = _plan_tiles(locations, max_elements)
+    semaphore = asyncio.Semaphore(settings.MAPS_HTTP_MAX_CONNECTIONS)
     
-    # Initialize result matrix
-    result_matrix = {
-        "status": "OK",
-        "origin_addresses": locations.copy(),
-        "destination_addresses": locations.copy(),
-        "rows": [{
-            "elements": [{"status": "NOT_CALCULATED"} for _ in range(n)]
-        } for _ in range(n)]
-    }
+    async def fetch_tile(i: int, j: int):
+        async with semaphore:
+            return await _fetch_tile_async(locations, i, j, locations_per_batch)
     
-    # Calculate how many locations we can process per batch
-    # Each batch will have origins × destinations elements
-    locations_per_batch = int(max_elements ** 0.5)
+    tiles = await asyncio.gather(*(fetch_tile(i, j) for i, j in requested))
+    return CompactMatrix.assemble(locations, [tile for tile in tiles if tile is not None])
+
+def batch_distance_matrix(
+    locations: List[str],
+    max_elements: int = 100
+) -> Dict[str, Any]:
+    """
+    Calculate distances between all locations in a batch-efficient way
     
+    Args:
+        locations: List of location addresses or coordinates
+        max_elements: Maximum number of elements per request (Google Maps limit)
+        
+    Returns:
+        dict: Full distance matrix between all locations
+    """
     try:
-        # Process in batches
-        for i in range(0, n, locations_per_batch):
-            origins_batch = locations[i:i + locations_per_batch]
-            
-            for j in range(0, n, locations_per_batch):
-                destinations_batch = locations[j:j + locations_per_batch]
-                
-                # Skip if origins and destinations are the same (we already know distance is 0)
-                if i == j:
-                    for k in range(len(origins_batch)):
-                        result_matrix["rows"][i + k]["elements"][j + k] = {
-                            "status": "OK",
-                            "distance": {"value": 0, "text": "0 m"},
-                            "duration": {"value": 0, "text": "0 mins"}
-                        }
-                    continue
-                
-                # Get distance matrix for this batch
-                batch_result = get_distance_matrix(origins_batch, destinations_batch)
-                
-                if batch_result.get("status") != "OK":
-                    logger.error(f"Error in batch distance matrix: {batch_result.get('error_message')}")
-                    continue
-                
-                # Merge batch result into full matrix
-                for k, row in enumerate(batch_result.get("rows", [])):
-                    for l, element in enumerate(row.get("elements", [])):
-                        result_matrix["rows"][i + k]["elements"][j + l] = element
+        return batch_distance_matrix_compact(locations, max_elements).to_result()
+    except Exception as e:
+        logger.error(f"Error in batch distance matrix: {str(e)}")
+        return {
+            "status": "ERROR",
+            "error_message": str(e)
+        }
+
+async def batch_distance_matrix_async(
+    locations: List[str],
+    max_elements: int = 100
+) -> Dict[str, Any]:
+    """
+    Non-blocking variant of batch_distance_matrix that fetches tiles concurrently
+    
+    Args:
+        locations: List of location addresses or coordinates
+        max_elements: Maximum number of elements per request (Google Maps limit)
         
-        return result_matrix
+    Returns:
+        dict: Full distance matrix between all locations
+    """
+    try:
+        return (await batch_distance_matrix_compact_async(locations, max_elements)).to_result()
     except Exception as e:
         logger.error(f"Error in batch distance matrix: {str(e)}")
         return {
             "status": "ERROR",
             "error_message": str(e)
-        } 
\ No newline at end of file
+        }
@@ -1,23 +1,113 @@
 import googlemaps
-from cachetools import TTLCache, cached
-from functools import lru_cache
+from functools import lru_cache, partial
+from typing import List, Dict, Any, AsyncIterator, Optional
+import asyncio
 from ..config import settings
+from ..database import SessionLocal
+from ..models import GeocodeCacheEntry
+from .location_keys import normalize_address, canonical_address
+from .address_index import search_known_addresses, index_address
+from .maps_client import MapsApiError, get_async_client
+from .cache_backend import create_cache
+from .cache_refresh import refresher
+from .quota_governor import call_with_quota, call_with_quota_async, call_priority, BATCH
 import logging
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
-# Initialize Google Maps client
-gmaps = googlemaps.Client(key=settings.GOOGLE_MAPS_API_KEY) if settings.GOOGLE_MAPS_API_KEY else None
+# Initialize Google Maps client; quota retries are handled by the quota governor
+gmaps = googlemaps.Client(key=settings.GOOGLE_MAPS_API_KEY, retry_over_query_limit=False) if settings.GOOGLE_MAPS_API_KEY else None
 
-# Create cache for geocoding results
-geocoding_cache = TTLCache(maxsize=settings.GEOCODING_CACHE_SIZE, ttl=settings.GEOCODING_CACHE_TTL)
+# Create cache for geocoding results; expired entries are served while they are refreshed
+geocoding_cache = create_cache(
+    "geocode",
+    settings.GEOCODING_CACHE_MAX_BYTES,
+    settings.GEOCODING_CACHE_TTL,
+    stale_ttl=settings.CACHE_STALE_TTL
+)
+
+# Create cache for place details results
+place_details_cache = create_cache("place_details", settings.GEOCODING_CACHE_MAX_BYTES, settings.GEOCODING_CACHE_TTL)
+
+# Create short-lived cache for Google autocomplete responses keyed by prefix
+autocomplete_cache = create_cache("autocomplete", settings.AUTOCOMPLETE_CACHE_MAX_BYTES, settings.AUTOCOMPLETE_CACHE_TTL)
+
+# Distinguishes a cached "not found" (None) from a cache miss
+_MISSING = object()
+
+# Place IDs handed out for known addresses that have no Google place ID yet
+LOCAL_PLACE_PREFIX = "local:"
+
+def _entry_to_result(entry: GeocodeCacheEntry) -> Dict[str, Any]:
+    """
+    Convert a persisted geocode row into the result format of geocode_address
+    """
+    return {
+        'lat': entry.lat,
+        'lng': entry.lng,
+        'formatted_address': entry.formatted_address,
+        'place_id': entry.place_id,
+        **(entry.payload or {})
+    }
+
+def get_persisted_geocodes(cache_keys: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Load persisted geocodes for many cache keys with a single query
+    
+    Args:
+        cache_keys: Canonical addresses or place:<place_id> keys
+        
+    Returns:
+        dict: Results keyed by cache key; missing keys are omitted
+    """
+    if not cache_keys:
+        return {}
+    
+    db = SessionLocal()
+    try:
+        entries = db.query(GeocodeCacheEntry).filter(GeocodeCacheEntry.cache_key.in_(cache_keys)).all()
+        return {entry.cache_key: _entry_to_result(entry) for entry in entries}
+    except Exception as e:
+        logger.error(f"Error loading persisted geocodes: {str(e)}")
+        return {}
+    finally:
+        db.close()
+
+def persist_geocode(cache_key: str, result: Dict[str, Any], payload: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Store a geocoding result so it survives restarts and is shared by all workers
+    
+    Args:
+        cache_key: Normalized address or place:<place_id> key
+        result: Result with lat, lng, formatted_address and optionally place_id
+        payload: Extra fields to keep, such as address_components
+    """
+    db = SessionLocal()
+    try:
+        entry = db.query(GeocodeCacheEntry).filter(GeocodeCacheEntry.cache_key == cache_key).first()
+        if entry is None:
+            entry = GeocodeCacheEntry(cache_key=cache_key)
+            db.add(entry)
+        entry.lat = result.get('lat')
+        entry.lng = result.get('lng')
+        entry.formatted_address = result.get('formatted_address')
+        entry.place_id = result.get('place_id')
+        entry.payload = payload
+        db.commit()
+    except Exception as e:
+        # Another worker may have inserted the same key concurrently
+        db.rollback()
+        logger.error(f"Error persisting geocode: {str(e)}")
+    finally:
+        db.close()
 
-@cached(cache=geocoding_cache)
 def geocode_address(address: str):
     """
     Convert an address string to latitude and longitude coordinates using Google Maps API.
-    Results are cached to reduce API calls.
+    Results are kept in the shared cache backend and persisted in the geocode_cache table,
+    so repeat addresses never reach the API again. Expired cache entries are
+    returned immediately and refreshed in the background.
     
     Args:
         address: String address to geocode
@@ -25,34 +115,121 @@ def geocode_address(address: str):
     Returns:
         dict: Dictionary with lat, lng keys or None if geocoding failed
     """
+    memory_key = canonical_address(address)
+    cached_result = refresher.get(geocoding_cache, memory_key, partial(_lookup_geocode, address), _MISSING)
+    if cached_result is not _MISSING:
+        return cached_result
+    
+    try:
+        result = _lookup_geocode(address)
+    except Exception as e:
+        # Not cached, the address may well resolve on the next attempt
+        logger.error(f"Error geocoding address: {str(e)}")
+        return None
+    geocoding_cache[memory_key] = result
+    return result
+
+def _lookup_geocode(address: str):
+    """
+    Geocode an address from the persisted table or Google, bypassing the cache
+    
+    Returns:
+        dict: Dictionary with lat, lng keys, or None if Google found no match
+        
+    Raises:
+        Exception: If the address could not be looked up, e.g. quota or network errors
+    """
     if not address:
         return None
     
+    cache_key = canonical_address(address)
+    persisted = get_persisted_geocodes([cache_key])
+    if cache_key in persisted:
+        return persisted[cache_key]
+    
     if not gmaps:
-        logger.error("Google Maps API key not configured")
-        return None
+        raise MapsApiError("REQUEST_DENIED", "Google Maps API key not configured")
     
-    try:
-        logger.info(f"Geocoding address: {address}")
-        geocode_result = gmaps.geocode(address)
+    logger.info(f"Geocoding address: {address}")
+    geocode_result = call_with_quota(gmaps.geocode, address)
+    
+    result = _parse_geocode_results(address, geocode_result)
+    if result:
+        persist_geocode(cache_key, result)
+    return result
+
+async def geocode_address_async(address: str):
+    """
+    Non-blocking variant of geocode_address sharing the same caches
+    
+    Args:
+        address: String address to geocode
         
-        if geocode_result and len(geocode_result) > 0:
-            location = geocode_result[0]['geometry']['location']
-            formatted_address = geocode_result[0]['formatted_address']
-            
-            return {
-                'lat': location['lat'],
-                'lng': location['lng'],
-                'formatted_address': formatted_address
-            }
-        else:
-            logger.warning(f"No geocoding results for address: {address}")
-            return None
-            
+    Returns:
+        dict: Dictionary with lat, lng keys or None if geocoding failed
+    """
+    try:
+        return await _lookup_geocode_async(address)
     except Exception as e:
         logger.error(f"Error geocoding address: {str(e)}")
         return None
 
+async def _lookup_geocode_async(address: str):
+    """
+    Geocode an address from the caches or Google without blocking the event loop
+    
+    Returns:
+        dict: Dictionary with lat, lng keys, or None if Google found no match
+        
+    Raises:
+        Exception: If the address could not be looked up, e.g. quota or network errors
+    """
+    if not address:
+        return None
+    
+    memory_key = canonical_address(address)
+    cached_result = await refresher.get_async(geocoding_cache, memory_key, partial(_lookup_geocode, address), _MISSING)
+    if cached_result is not _MISSING:
+        return cached_result
+    
+    cache_key = canonical_address(address)
+    persisted = await asyncio.to_thread(get_persisted_geocodes, [cache_key])
+    if cache_key in persisted:
+        await geocoding_cache.set_async(memory_key, persisted[cache_key])
+        return persisted[cache_key]
+    
+    client = get_async_client()
+    if not client:
+        raise MapsApiError("REQUEST_DENIED", "Google Maps API key not configured")
+    
+    logger.info(f"Geocoding address: {address}")
+    geocode_result = await call_with_quota_async(client.geocode, address)
+    
+    # Only reached when Google answered, so None is a definite ZERO_RESULTS
+    result = _parse_geocode_results(address, geocode_result)
+    if result:
+        await asyncio.to_thread(persist_geocode, cache_key, result)
+    await geocoding_cache.set_async(memory_key, result)
+    return result
+
+def _parse_geocode_results(address: str, geocode_result: List[Dict[str, Any]]):
+    """
+    Convert a geocoding API response into the geocode_address result format
+    """
+    if geocode_result and len(geocode_result) > 0:
+        location = geocode_result[0]['geometry']['location']
+        formatted_address = geocode_result[0]['formatted_address']
+        
+        return {
+            'lat': location['lat'],
+            'lng': location['lng'],
+            'formatted_address': formatted_address,
+            'place_id': geocode_result[0].get('place_id')
+        }
+    
+    logger.warning(f"No geocoding results for address: {address}")
+    return None
+
 def get_place_autocomplete(input_text: str, session_token: str = None):
     """
     Get place autocomplete suggestions from Google Maps API
@@ -64,30 +241,134 @@ def get_place_autocomplete(input_text: str, session_token: str = None):
     Returns:
         list: List of autocomplete suggestions
     """
+    cache_key = normalize_address(input_text)
+    cached_suggestions = autocomplete_cache.get(cache_key)
+    if cached_suggestions is not None:
+        return cached_suggestions
+    
     if not gmaps:
         logger.error("Google Maps API key not configured")
         return []
     
     try:
-        results = gmaps.places_autocomplete(
+        results = call_with_quota(
+            gmaps.places_autocomplete,
             input_text=input_text,
             session_token=session_token,
             types="address"
         )
         
-        suggestions = []
-        for result in results:
-            suggestions.append({
-                'place_id': result.get('place_id'),
-                'description': result.get('description'),
-                'structured_formatting': result.get('structured_formatting')
-            })
-            
+        suggestions = _parse_autocomplete_results(results)
+        autocomplete_cache[cache_key] = suggestions
         return suggestions
     except Exception as e:
         logger.error(f"Error getting place autocomplete: {str(e)}")
         return []
 
+async def get_place_autocomplete_async(input_text: str, session_token: str = None):
+    """
+    Non-blocking variant of get_place_autocomplete sharing the same cache
+    """
+    cache_key = normalize_address(input_text)
+    cached_suggestions = await autocomplete_cache.get_async(cache_key)
+    if cached_suggestions is not None:
+        return cached_suggestions
+    
+    client = get_async_client()
+    if not client:
+        logger.error("Google Maps API key not configured")
+        return []
+    
+    try:
+        results = await call_with_quota_async(
+            client.places_autocomplete,
+            input_text=input_text,
+            session_token=session_token,
+            types="address"
+        )
+    except Exception as e:
+        logger.error(f"Error getting place autocomplete: {str(e)}")
+        return []
+    
+    suggestions = _parse_autocomplete_results(results)
+    await autocomplete_cache.set_async(cache_key, suggestions)
+    return suggestions
+
+def _parse_autocomplete_results(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Convert autocomplete predictions into the suggestion format
+    """
+    suggestions = []
+    for result in results:
+        suggestions.append({
+            'place_id': result.get('place_id'),
+            'description': result.get('description'),
+            'structured_formatting': result.get('structured_formatting')
+        })
+    return suggestions
+
+def autocomplete_address(input_text: str, session_token: str = None, limit: int = 5):
+    """
+    Get address suggestions, answering from known addresses when possible
+    
+    The local prefix index over order, depot and place-detail addresses is
+    searched first; Google Places is only queried when it yields fewer than
+    AUTOCOMPLETE_MIN_LOCAL_RESULTS suggestions.
+    
+    Args:
+        input_text: Text input to get suggestions for
+        session_token: Session token for grouping autocomplete requests
+        limit: Maximum number of suggestions
+        
+    Returns:
+        list: List of autocomplete suggestions
+    """
+    suggestions = _local_suggestions(search_known_addresses(input_text, limit))
+    
+    if len(suggestions) >= settings.AUTOCOMPLETE_MIN_LOCAL_RESULTS:
+        return suggestions
+    
+    return _merge_suggestions(suggestions, get_place_autocomplete(input_text, session_token), limit)
+
+async def autocomplete_address_async(input_text: str, session_token: str = None, limit: int = 5):
+    """
+    Non-blocking variant of autocomplete_address
+    """
+    # The first search builds the index from the database, so keep it off the event loop
+    local = await asyncio.to_thread(search_known_addresses, input_text, limit)
+    suggestions = _local_suggestions(local)
+    
+    if len(suggestions) >= settings.AUTOCOMPLETE_MIN_LOCAL_RESULTS:
+        return suggestions
+    
+    return _merge_suggestions(suggestions, await get_place_autocomplete_async(input_text, session_token), limit)
+
+def _local_suggestions(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Convert address index entries into the suggestion format
+    """
+    return [
+        {
+            'place_id': entry['place_id'] or f"{LOCAL_PLACE_PREFIX}{entry['description']}",
+            'description': entry['description'],
+            'structured_formatting': None,
+            'source': 'local'
+        }
+        for entry in entries
+    ]
+
+def _merge_suggestions(suggestions: List[Dict[str, Any]], google: List[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+    """
+    Append Google suggestions that are not already known locally
+    """
+    seen = {normalize_address(suggestion['description']) for suggestion in suggestions}
+    for suggestion in google:
+        if len(suggestions) >= limit:
+            break
+        if normalize_address(suggestion['description']) not in seen:
+            suggestions.append(suggestion)
+    return suggestions
+
 def get_place_details(place_id: str, session_token: str = None):
     """
     Get detailed information about a place using its place_id
@@ -99,26 +380,237 @@ def get_place_details(place_id: str, session_token: str = None):
     Returns:
         dict: Place details including address components and geometry
     """
+    cached_details = place_details_cache.get(place_id)
+    if cached_details is not None:
+        return cached_details
+    
+    # Suggestions from the local index without a Google place ID; geocoding
+    # has no address components, so they come from the geocoded place
+    if place_id.startswith(LOCAL_PLACE_PREFIX):
+        geocoded = geocode_address(place_id[len(LOCAL_PLACE_PREFIX):])
+        if not geocoded:
+            return None
+        details = get_place_details(geocoded['place_id'], session_token) if geocoded.get('place_id') else None
+        return details or {**geocoded, 'address_components': []}
+    
+    cache_key = f"place:{place_id}"
+    persisted = get_persisted_geocodes([cache_key])
+    if cache_key in persisted:
+        place_details_cache[place_id] = persisted[cache_key]
+        return persisted[cache_key]
+    
     if not gmaps:
         logger.error("Google Maps API key not configured")
         return None
     
     try:
-        result = gmaps.place(
+        result = call_with_quota(
+            gmaps.place,
             place_id=place_id,
             session_token=session_token,
             fields=['address_component', 'geometry', 'formatted_address']
         )
         
-        if result and 'result' in result:
-            place_data = result['result']
-            return {
-                'formatted_address': place_data.get('formatted_address'),
-                'lat': place_data.get('geometry', {}).get('location', {}).get('lat'),
-                'lng': place_data.get('geometry', {}).get('location', {}).get('lng'),
-                'address_components': place_data.get('address_components', [])
-            }
+        details = _parse_place_details(result)
+        if details:
+            _store_place_details(place_id, details)
+        return details
+    except Exception as e:
+        logger.error(f"Error getting place details: {str(e)}")
+        return None
+
+async def get_place_details_async(place_id: str, session_token: str = None):
+    """
+    Non-blocking variant of get_place_details sharing the same caches
+    """
+    cached_details = await place_details_cache.get_async(place_id)
+    if cached_details is not None:
+        return cached_details
+    
+    if place_id.startswith(LOCAL_PLACE_PREFIX):
+        geocoded = await geocode_address_async(place_id[len(LOCAL_PLACE_PREFIX):])
+        if not geocoded:
+            return None
+        details = await get_place_details_async(geocoded['place_id'], session_token) if geocoded.get('place_id') else None
+        return details or {**geocoded, 'address_components': []}
+    
+    cache_key = f"place:{place_id}"
+    persisted = await asyncio.to_thread(get_persisted_geocodes, [cache_key])
+    if cache_key in persisted:
+        await place_details_cache.set_async(place_id, persisted[cache_key])
+        return persisted[cache_key]
+    
+    client = get_async_client()
+    if not client:
+        logger.error("Google Maps API key not configured")
         return None
+    
+    try:
+        result = await call_with_quota_async(
+            client.place,
+            place_id=place_id,
+            session_token=session_token,
+            fields=['address_component', 'geometry', 'formatted_address']
+        )
     except Exception as e:
         logger.error(f"Error getting place details: {str(e)}")
-        return None 
\ No newline at end of file
+        return None
+    
+    details = _parse_place_details(result)
+    if details:
+        await asyncio.to_thread(_store_place_details, place_id, details)
+    return details
+
+def _parse_place_details(result: Dict[str, Any]):
+    """
+    Convert a place details API response into the place details format
+    """
+    if result and 'result' in result:
+        place_data = result['result']
+        return {
+            'formatted_address': place_data.get('formatted_address'),
+            'lat': place_data.get('geometry', {}).get('location', {}).get('lat'),
+            'lng': place_data.get('geometry', {}).get('location', {}).get('lng'),
+            'address_components': place_data.get('address_components', [])
+        }
+    return None
+
+def _store_place_details(place_id: str, details: Dict[str, Any]) -> None:
+    """
+    Persist and cache place details and make the address searchable locally
+    """
+    persist_geocode(
+        f"place:{place_id}",
+        {**details, 'place_id': place_id},
+        payload={'address_components': details['address_components']}
+    )
+    place_details_cache[place_id] = details
+    index_address(details['formatted_address'], place_id)
+
+class AsyncRateLimiter:
+    """
+    Spaces out calls so that at most `rate` of them start per second
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+# Shared by all batch lookups in this worker; created lazily inside the event loop
+_geocode_semaphore = None
+_geocode_rate_limiter = None
+_inflight_geocodes: Dict[str, asyncio.Task] = {}
+
+async def _fetch_geocode(address: str):
+    """
+    Call the geocoder under the concurrency pool and rate limit
+    """
+    global _geocode_semaphore, _geocode_rate_limiter
+    if _geocode_semaphore is None:
+        _geocode_semaphore = asyncio.Semaphore(settings.GEOCODING_BATCH_CONCURRENCY)
+        _geocode_rate_limiter = AsyncRateLimiter(settings.GEOCODING_RATE_LIMIT)
+
+    async with _geocode_semaphore:
+        await _geocode_rate_limiter.wait()
+        return await _lookup_geocode_async(address)
+
+async def geocode_address_coalesced(address: str):
+    """
+    Geocode an address without blocking the event loop
+
+    Cache hits return immediately. Concurrent lookups of the same uncached
+    address share a single API call, and API calls run under the shared
+    concurrency pool and rate limit.
+
+    Args:
+        address: String address to geocode
+
+    Returns:
+        dict: Dictionary with lat, lng keys, or None if Google found no match
+
+    Raises:
+        Exception: If the address could not be looked up, e.g. quota or network errors
+    """
+    key = canonical_address(address)
+    cached_result = await geocoding_cache.get_async(key)
+    if cached_result is not None:
+        return cached_result
+
+    task = _inflight_geocodes.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_fetch_geocode(address))
+        _inflight_geocodes[key] = task
+        task.add_done_callback(lambda _: _inflight_geocodes.pop(key, None))
+
+    # Shield the shared lookup so one cancelled caller does not cancel it for the others
+    return await asyncio.shield(task)
+
+async def geocode_batch(addresses: List[str]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Geocode many addresses concurrently, yielding results as they finish
+
+    Addresses are normalized and deduplicated first so each distinct address
+    is looked up once; every input index still receives its own result.
+
+    Args:
+        addresses: List of address strings
+
+    Yields:
+        dict: Result with the input index, address, lat, lng,
+        formatted_address and status: OK, NOT_FOUND if Google found no
+        match, or ERROR with an error message if the lookup failed
+    """
+    indices_by_key: Dict[str, List[int]] = {}
+    for idx, address in enumerate(addresses):
+        indices_by_key.setdefault(canonical_address(address), []).append(idx)
+
+    async def lookup(key: str, address: str):
+        if not key:
+            return key, None, None
+        try:
+            return key, await geocode_address_coalesced(address), None
+        except asyncio.CancelledError:
+            # Only a cancelled shared lookup is reported, not this stream ending
+            if asyncio.current_task().cancelling():
+                raise
+            return key, None, "Lookup cancelled"
+        except Exception as e:
+            return key, None, str(e)
+
+    # Bulk lookups yield to interactive traffic under quota pressure
+    with call_priority(BATCH):
+        tasks = [
+            asyncio.ensure_future(lookup(key, addresses[indices[0]]))
+            for key, indices in indices_by_key.items()
+        ]
+    logger.info(f"Batch geocoding {len(tasks)} distinct addresses out of {len(addresses)}")
+
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            key, result, error = await next_done
+            for idx in indices_by_key[key]:
+                item = {
+                    "index": idx,
+                    "address": addresses[idx],
+                    "lat": result.get("lat") if result else None,
+                    "lng": result.get("lng") if result else None,
+                    "formatted_address": result.get("formatted_address") if result else None,
+                    "status": "ERROR" if error else "OK" if result else "NOT_FOUND"
+                }
+                if error:
+                    item["error"] = error
+                yield item
+    finally:
+        # Stop outstanding lookups if the client goes away mid-stream
+        for task in tasks:
+            task.cancel()
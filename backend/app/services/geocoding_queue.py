@@ -0,0 +1,124 @@
+from typing import List, Dict, Any, Tuple
+import queue
+import threading
+import logging
+from ..database import SessionLocal
+from ..models import Order, Depot
+from .geocoding import geocode_address, get_persisted_geocodes
+from .location_keys import canonical_address
+from .quota_governor import call_priority, BATCH
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Maximum number of rows geocoded and written back per transaction
+BATCH_SIZE = 100
+
+# Seconds to wait for more work before flushing a partial batch
+BATCH_WAIT = 0.5
+
+_MODELS = {
+    "order": Order,
+    "depot": Depot
+}
+
+_queue: "queue.Queue[Tuple[str, int, str]]" = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+
+def enqueue_geocode(entity: str, entity_id: int, address: str) -> None:
+    """
+    Queue a stored order or depot for background geocoding
+
+    Args:
+        entity: "order" or "depot"
+        entity_id: Primary key of the row
+        address: Address to geocode
+    """
+    if not address:
+        return
+    _ensure_worker()
+    _queue.put((entity, entity_id, address))
+
+def _ensure_worker() -> None:
+    """
+    Start the background worker thread on first use
+    """
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name="geocoding-queue", daemon=True)
+            _worker.start()
+
+def _run() -> None:
+    """
+    Drain the queue in batches forever
+    """
+    while True:
+        batch = [_queue.get()]
+        while len(batch) < BATCH_SIZE:
+            try:
+                batch.append(_queue.get(timeout=BATCH_WAIT))
+            except queue.Empty:
+                break
+        try:
+            with call_priority(BATCH):
+                process_batch(batch)
+        except Exception as e:
+            logger.error(f"Error processing geocoding batch: {str(e)}")
+
+def process_batch(batch: List[Tuple[str, int, str]]) -> int:
+    """
+    Geocode a batch of rows and write the results back in one transaction
+
+    Persisted geocodes are loaded with a single query up front, so only
+    addresses never seen before reach the API.
+
+    Args:
+        batch: (entity, entity_id, address) tuples
+
+    Returns:
+        int: Number of rows updated
+    """
+    results: Dict[str, Any] = get_persisted_geocodes(list({canonical_address(address) for _, _, address in batch}))
+    for _, _, address in batch:
+        key = canonical_address(address)
+        if key not in results:
+            results[key] = geocode_address(address)
+
+    db = SessionLocal()
+    updated = 0
+    try:
+        for entity, ids in _group_ids(batch).items():
+            model = _MODELS[entity]
+            rows = db.query(model).filter(model.id.in_(list(ids))).all()
+            for row in rows:
+                # Skip rows whose address changed after they were queued
+                if row.address != ids[row.id]:
+                    continue
+                result = results.get(canonical_address(row.address))
+                if not result:
+                    continue
+                row.lat = result.get("lat")
+                row.lng = result.get("lng")
+                row.formatted_address = result.get("formatted_address")
+                row.place_id = result.get("place_id")
+                updated += 1
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    logger.info(f"Geocoded {updated} of {len(batch)} queued rows")
+    return updated
+
+def _group_ids(batch: List[Tuple[str, int, str]]) -> Dict[str, Dict[int, str]]:
+    """
+    Group queued rows by entity, keeping the latest queued address per row
+    """
+    grouped: Dict[str, Dict[int, str]] = {}
+    for entity, entity_id, address in batch:
+        grouped.setdefault(entity, {})[entity_id] = address
+    return grouped
@@ -0,0 +1,130 @@
+from typing import List, Tuple, Optional
+import re
+
+# Decimal places of the grid coordinates are snapped to (~1.1 m)
+GRID_PRECISION = 5
+
+# Spelled-out street designators and their standard abbreviations
+ABBREVIATIONS = {
+    "street": "st",
+    "avenue": "ave",
+    "road": "rd",
+    "boulevard": "blvd",
+    "drive": "dr",
+    "lane": "ln",
+    "court": "ct",
+    "place": "pl",
+    "square": "sq",
+    "terrace": "ter",
+    "circle": "cir",
+    "highway": "hwy",
+    "parkway": "pkwy",
+    "suite": "ste",
+    "apartment": "apt",
+    "building": "bldg",
+    "floor": "fl",
+    "north": "n",
+    "south": "s",
+    "east": "e",
+    "west": "w"
+}
+
+_COORDINATE_PATTERN = re.compile(r"^\s*(-?\d{1,3}(?:\.\d+)?)\s*,\s*(-?\d{1,3}(?:\.\d+)?)\s*$")
+
+def normalize_address(address: str) -> str:
+    """
+    Normalize an address string so that trivially different spellings of the
+    same address compare equal
+
+    Args:
+        address: Raw address string
+
+    Returns:
+        str: Lowercased address with punctuation and repeated whitespace collapsed
+    """
+    if not address:
+        return ""
+    normalized = address.lower()
+    normalized = re.sub(r"[^\w\s]", " ", normalized)
+    return re.sub(r"\s+", " ", normalized).strip()
+
+def canonical_address(address: str) -> str:
+    """
+    Normalize an address and abbreviate street designators, so that
+    "12 Main Street" and "12 main st." share one key
+
+    Args:
+        address: Raw address string
+
+    Returns:
+        str: Canonical address
+    """
+    return " ".join(ABBREVIATIONS.get(word, word) for word in normalize_address(address).split(" "))
+
+def snap_coordinate(lat: float, lng: float) -> Tuple[float, float]:
+    """
+    Snap a coordinate to the fixed precision grid
+    """
+    return round(lat, GRID_PRECISION), round(lng, GRID_PRECISION)
+
+def parse_coordinate(text: str) -> Optional[Tuple[float, float]]:
+    """
+    Parse a "lat,lng" location string, or None if it is not one
+    """
+    match = _COORDINATE_PATTERN.match(text or "")
+    if not match:
+        return None
+    lat, lng = float(match.group(1)), float(match.group(2))
+    if abs(lat) > 90 or abs(lng) > 180:
+        return None
+    return lat, lng
+
+def format_coordinate(lat: float, lng: float) -> str:
+    """
+    Format a snapped coordinate as a "lat,lng" location string
+    """
+    lat, lng = snap_coordinate(lat, lng)
+    return f"{lat:.{GRID_PRECISION}f},{lng:.{GRID_PRECISION}f}"
+
+def location_id(location: str, coordinate: Optional[Tuple[float, float]] = None) -> str:
+    """
+    Stable ID of a location
+
+    Locations with known coordinates, or given as a "lat,lng" string, are
+    identified by their grid cell; others by their canonical address.
+
+    Args:
+        location: Address or "lat,lng" string
+        coordinate: Optional (lat, lng) of the location
+
+    Returns:
+        str: "geo:<lat>,<lng>" or "addr:<canonical address>"
+    """
+    coordinate = coordinate or parse_coordinate(location)
+    if coordinate is not None:
+        return f"geo:{format_coordinate(*coordinate)}"
+    return f"addr:{canonical_address(location)}"
+
+def matrix_locations(
+    locations: List[str],
+    coordinates: Optional[List[Optional[Tuple[float, float]]]] = None
+) -> List[str]:
+    """
+    Location strings to request a distance matrix for
+
+    Snapped "lat,lng" strings are used where coordinates are known, so the
+    same place gets the same cache key however its address was written.
+
+    Args:
+        locations: Addresses
+        coordinates: Optional (lat, lng) for each location
+
+    Returns:
+        list: One request string per location
+    """
+    if not coordinates:
+        return list(locations)
+    return [
+        format_coordinate(*coordinate) if coordinate is not None else location
+        for location, coordinate in zip(locations, coordinates)
+    ]
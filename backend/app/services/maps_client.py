@@ -0,0 +1,139 @@
+from typing import List, Dict, Any, Optional
+import asyncio
+import httpx
+import logging
+from ..config import settings
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+BASE_URL = "https://maps.googleapis.com/maps/api"
+
+class MapsApiError(Exception):
+    """
+    Raised when the Maps API returns an error status
+    """
+
+    def __init__(self, status: str, message: Optional[str] = None):
+        super().__init__(f"{status}: {message}" if message else status)
+        self.status = status
+        self.message = message
+
+class AsyncMapsClient:
+    """
+    Non-blocking Google Maps client on a pooled keep-alive HTTP connection pool
+
+    Return values mirror googlemaps.Client so the same parsing code can be
+    used for both clients.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self._http = httpx.AsyncClient(
+            base_url=BASE_URL,
+            timeout=httpx.Timeout(settings.MAPS_HTTP_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=settings.MAPS_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.MAPS_HTTP_MAX_KEEPALIVE
+            )
+        )
+
+    async def _get(self, path: str, params: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        params = {key: value for key, value in params.items() if value is not None}
+        params["key"] = self.key
+        response = await self._http.get(
+            path,
+            params=params,
+            timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT
+        )
+        response.raise_for_status()
+        body = response.json()
+        if body.get("status") not in ("OK", "ZERO_RESULTS"):
+            raise MapsApiError(body.get("status"), body.get("error_message"))
+        return body
+
+    async def geocode(self, address: str, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        body = await self._get("/geocode/json", {"address": address}, timeout)
+        return body.get("results", [])
+
+    async def places_autocomplete(
+        self,
+        input_text: str,
+        session_token: Optional[str] = None,
+        types: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        body = await self._get(
+            "/place/autocomplete/json",
+            {"input": input_text, "sessiontoken": session_token, "types": types},
+            timeout
+        )
+        return body.get("predictions", [])
+
+    async def place(
+        self,
+        place_id: str,
+        session_token: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        return await self._get(
+            "/place/details/json",
+            {"place_id": place_id, "sessiontoken": session_token, "fields": ",".join(fields) if fields else None},
+            timeout
+        )
+
+    async def distance_matrix(
+        self,
+        origins: List[str],
+        destinations: List[str],
+        mode: Optional[str] = None,
+        avoid: Optional[str] = None,
+        units: Optional[str] = None,
+        departure_time=None,
+        traffic_model: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        return await self._get(
+            "/distancematrix/json",
+            {
+                "origins": "|".join(origins),
+                "destinations": "|".join(destinations),
+                "mode": mode,
+                "avoid": avoid,
+                "units": units,
+                "departure_time": departure_time,
+                "traffic_model": traffic_model
+            },
+            timeout
+        )
+
+    async def aclose(self) -> None:
+        await self._http.aclose()
+
+# One client per event loop, created on first use
+_clients: Dict[int, AsyncMapsClient] = {}
+
+def get_async_client() -> Optional[AsyncMapsClient]:
+    """
+    Get the async maps client for the running event loop
+
+    Returns:
+        AsyncMapsClient: Shared client or None if no API key is configured
+    """
+    if not settings.GOOGLE_MAPS_API_KEY:
+        return None
+    loop_id = id(asyncio.get_running_loop())
+    client = _clients.get(loop_id)
+    if client is None:
+        client = AsyncMapsClient(settings.GOOGLE_MAPS_API_KEY)
+        _clients[loop_id] = client
+    return client
+
+async def close_async_clients() -> None:
+    """
+    Close the pooled connections of all clients
+    """
+    for client in list(_clients.values()):
+        await client.aclose()
+    _clients.clear()
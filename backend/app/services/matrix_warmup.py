@@ -0,0 +1,168 @@
+from typing import List, Dict, Any, Tuple
+from datetime import date, datetime, time as day_time, timedelta
+from sqlalchemy import func
+import threading
+import time
+import logging
+from ..config import settings
+from ..database import SessionLocal
+from ..models import Order, Depot, Vehicle
+from .order_snapshot import load_order_snapshot
+from .solve_inputs import build_solve_inputs
+from .stop_aggregation import prepare_problem
+from .location_keys import matrix_locations
+from .distance_matrix import missing_tiles, refresh_tile
+from .quota_governor import governor, call_priority, BATCH
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# (depot id, order date) -> state of depot and orders when last fully warmed
+_warmed: Dict[Tuple[int, date], tuple] = {}
+
+_worker = None
+_worker_lock = threading.Lock()
+
+def start_matrix_warmup() -> None:
+    """
+    Start the background warm-up thread if enabled in settings
+    """
+    global _worker
+    if not settings.MATRIX_WARMUP_ENABLED:
+        return
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name="matrix-warmup", daemon=True)
+            _worker.start()
+
+def _run() -> None:
+    """
+    Warm up matrices on every interval that falls into off-peak hours
+    """
+    while True:
+        try:
+            if is_off_peak(datetime.now()):
+                with call_priority(BATCH):
+                    warm_up()
+        except Exception as e:
+            logger.error(f"Error warming up distance matrices: {str(e)}")
+        time.sleep(settings.MATRIX_WARMUP_INTERVAL)
+
+def is_off_peak(now: datetime) -> bool:
+    """
+    Whether the given time falls into the configured off-peak hours
+    """
+    start, end = settings.MATRIX_WARMUP_OFFPEAK_START, settings.MATRIX_WARMUP_OFFPEAK_END
+    if start <= end:
+        return start <= now.hour < end
+    # Window wraps around midnight
+    return now.hour >= start or now.hour < end
+
+def warm_up() -> int:
+    """
+    Fetch missing distance matrix tiles for the upcoming planning runs
+
+    A planning run is an active depot with the orders created on one of the
+    last MATRIX_WARMUP_ORDER_DAYS days, laid out exactly as /vrp/solve-from-db
+    lays them out, so the solver finds every tile in the cache. Runs whose
+    depot and orders have not changed since they were fully warmed are
+    skipped; partially warmed runs resume where they stopped.
+
+    Returns:
+        int: Number of matrix elements fetched
+    """
+    runs = _pending_runs()
+    fetched = 0
+    for run_key, state, locations in runs:
+        complete = True
+        for origins, destinations in missing_tiles(locations):
+            elements = len(origins) * len(destinations)
+            if not _take_budget(elements):
+                logger.info(f"Matrix warm-up budget exhausted after {fetched} elements")
+                return fetched
+            try:
+                refresh_tile(origins, destinations)
+                fetched += elements
+            except Exception as e:
+                logger.error(f"Error warming up matrix tile: {str(e)}")
+                complete = False
+        if complete:
+            _warmed[run_key] = state
+
+    if fetched:
+        logger.info(f"Warmed up {fetched} matrix elements for {len(runs)} planning runs")
+    return fetched
+
+def _pending_runs() -> List[Tuple[Tuple[int, date], tuple, List[str]]]:
+    """
+    Load the planning runs whose depot, orders or vehicles changed since they were last warmed
+    """
+    db = SessionLocal()
+    try:
+        depots = db.query(Depot).filter(func.lower(Depot.status) == "active").all()
+        vehicles = db.query(Vehicle).order_by(Vehicle.id).all()
+        fleet_state = tuple((vehicle.id, vehicle.capacity_value, vehicle.capacity) for vehicle in vehicles)
+        runs = []
+        today = date.today()
+        for offset in range(settings.MATRIX_WARMUP_ORDER_DAYS):
+            order_date = today - timedelta(days=offset)
+            orders_state = _orders_state(db, order_date)
+            if orders_state[0] == 0:
+                continue
+            snapshot = None
+            for depot in depots:
+                run_key = (depot.id, order_date)
+                state = orders_state + (depot.address, depot.lat, depot.lng, fleet_state)
+                if _warmed.get(run_key) == state:
+                    continue
+                if snapshot is None:
+                    snapshot = load_order_snapshot(db, order_date=order_date)
+                runs.append((run_key, state, planning_locations(depot, snapshot, vehicles)))
+        return runs
+    finally:
+        db.close()
+
+def _orders_state(db, order_date: date) -> tuple:
+    """
+    Count, highest ID and latest update of the orders created on a day
+
+    Any added, removed or edited order changes at least one of them.
+    """
+    day_start = datetime.combine(order_date, day_time.min)
+    count, max_id, last_update = db.query(
+        func.count(Order.id), func.max(Order.id), func.max(Order.updated_at)
+    ).filter(
+        Order.created_at >= day_start,
+        Order.created_at < day_start + timedelta(days=1)
+    ).one()
+    return count, max_id, last_update
+
+def planning_locations(depot, snapshot: Dict[str, Any], vehicles: List[Any]) -> List[str]:
+    """
+    Locations /vrp/solve-from-db requests a matrix for with these orders and vehicles
+
+    Built on the same path as the solve: the same solver inputs, including
+    time windows, and the same merging of co-located stops.
+    """
+    inputs = build_solve_inputs(depot, snapshot, vehicles)
+    problem = prepare_problem(
+        inputs["locations"],
+        depot_index=inputs["depot_index"],
+        demands=inputs["demands"],
+        time_windows=inputs["time_windows"],
+        service_times=inputs["service_times"],
+        coordinates=inputs["coordinates"],
+        vehicle_capacities=inputs["vehicle_capacities"]
+    )
+    return matrix_locations(problem["locations"], problem["coordinates"])
+
+def _take_budget(elements: int) -> bool:
+    """
+    Spend warm-up elements from a budget shared by all workers
+
+    The budget is a token bucket refilling MATRIX_WARMUP_ELEMENTS_PER_HOUR
+    over an hour, kept in the quota governor's store.
+    """
+    hourly = float(settings.MATRIX_WARMUP_ELEMENTS_PER_HOUR)
+    limits = {"warmup_elements": (hourly / 3600, hourly)}
+    return governor.store.try_acquire({"warmup_elements": float(elements)}, limits, 0.0) == 0
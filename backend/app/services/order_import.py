@@ -0,0 +1,258 @@
+from typing import Any, BinaryIO, Dict, Iterator, List, NamedTuple, Optional, Tuple
+import csv
+import io
+import json
+import logging
+from pydantic import ValidationError
+from sqlalchemy import String, insert
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..models import Order
+from ..schemas import OrderCreate
+from ..utils.parsing import parse_quantity, parse_time_of_day, parse_duration
+from .geocoding_queue import enqueue_geocode
+from .address_index import index_address
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Characters read from the upload at a time when parsing a JSON array
+READ_SIZE = 64 * 1024
+
+# Row errors listed in the response; further errors are only counted
+MAX_REPORTED_ERRORS = 1000
+
+# Supported formats by file extension and content type
+_FORMATS = {
+    ".csv": "csv",
+    ".json": "json",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    "text/csv": "csv",
+    "application/json": "json",
+    "application/x-ndjson": "ndjson",
+}
+
+# Maximum length of each string column, checked before insert so one long
+# value fails its own row instead of the whole chunk
+_MAX_LENGTHS = {
+    column.key: column.type.length
+    for column in Order.__table__.columns
+    if isinstance(column.type, String) and column.type.length
+}
+
+class MalformedRecord(NamedTuple):
+    """
+    Record that could not be parsed, failed as its own row
+    """
+    error: str
+
+def import_format(filename: Optional[str], content_type: Optional[str]) -> Optional[str]:
+    """
+    Format of an uploaded file: "csv", "json", "ndjson" or None if unsupported
+    """
+    name = (filename or "").lower()
+    for extension in (".csv", ".ndjson", ".jsonl", ".json"):
+        if name.endswith(extension):
+            return _FORMATS[extension]
+    return _FORMATS.get((content_type or "").split(";")[0].strip().lower())
+
+def read_records(stream: BinaryIO, file_format: str) -> Iterator[Any]:
+    """
+    Read the records of an uploaded file one at a time
+
+    CSV files need a header row. JSON files hold an array of order objects
+    and NDJSON files one order object per line; a line that is not valid
+    JSON is yielded as a MalformedRecord.
+
+    Raises:
+        ValueError: If the file is malformed
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if file_format == "csv":
+        yield from csv.DictReader(text)
+    elif file_format == "ndjson":
+        for line in text:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield MalformedRecord(f"Invalid JSON: {str(e)}")
+    else:
+        yield from _read_json_array(text)
+
+def _read_json_array(text: io.TextIOBase) -> Iterator[Any]:
+    """
+    Yield the items of a top-level JSON array without loading the whole file
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    opened = False
+    eof = False
+    while True:
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+        if position < len(buffer):
+            if not opened:
+                if buffer[position] != "[":
+                    raise ValueError("Expected a JSON array of orders")
+                opened = True
+                position += 1
+                continue
+            if buffer[position] == "]":
+                return
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+                yield item
+                continue
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+        elif eof:
+            raise ValueError("Unexpected end of JSON array")
+        # Need more input to finish the current item
+        chunk = text.read(READ_SIZE)
+        eof = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+def _validate(record: Any) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Validate one record into the column values of an order
+
+    Returns:
+        tuple: (column values, None) or (None, error message)
+    """
+    if isinstance(record, MalformedRecord):
+        return None, record.error
+    if not isinstance(record, dict):
+        return None, "Expected an object"
+    cleaned = {}
+    for key, value in record.items():
+        if key is None:
+            continue  # extra CSV cells without a header
+        if isinstance(value, str):
+            value = value.strip() or None
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = str(value)
+        cleaned[str(key).strip().lower()] = value
+    if not cleaned.get("address"):
+        return None, "address: field required"
+    try:
+        order = OrderCreate(**cleaned)
+    except ValidationError as e:
+        return None, "; ".join(
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+        )
+    values = order.dict()
+    for key, length in _MAX_LENGTHS.items():
+        if values.get(key) is not None and len(values[key]) > length:
+            return None, f"{key}: longer than {length} characters"
+    # Typed copies normally kept in sync by the model's validators, which
+    # bulk inserts bypass
+    values["start_seconds"] = parse_time_of_day(values["start_time"])
+    values["end_seconds"] = parse_time_of_day(values["end_time"])
+    values["duration_seconds"] = parse_duration(values["duration"])
+    values["load_value"] = parse_quantity(values["load"])
+    return values, None
+
+def _fail(result: Dict[str, Any], row: int, error: str) -> None:
+    result["failed"] += 1
+    if len(result["errors"]) < MAX_REPORTED_ERRORS:
+        result["errors"].append({"row": row, "error": error})
+
+def _write_chunk(db: Session, chunk: List[Tuple[int, Dict[str, Any]]], result: Dict[str, Any]) -> None:
+    """
+    Insert a chunk of validated orders in one multi-row insert and transaction,
+    then queue them for geocoding
+
+    If the database rejects the chunk, its rows are retried one at a time so
+    only the rejected rows fail.
+    """
+    try:
+        inserted = db.execute(
+            insert(Order).returning(Order.id, Order.address),
+            [values for _, values in chunk]
+        ).all()
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Error importing orders in rows {chunk[0][0]}-{chunk[-1][0]}, retrying row by row: {str(e)}")
+        inserted = _write_rows(db, chunk, result)
+    result["imported"] += len(inserted)
+    for order_id, address in inserted:
+        enqueue_geocode("order", order_id, address)
+        index_address(address)
+
+def _write_rows(db: Session, chunk: List[Tuple[int, Dict[str, Any]]], result: Dict[str, Any]) -> List[Tuple[int, str]]:
+    """
+    Insert a chunk row by row, each under a savepoint, in one transaction
+
+    Returns:
+        list: (id, address) of the inserted orders
+    """
+    inserted = []
+    for row, values in chunk:
+        try:
+            with db.begin_nested():
+                order_id, address = db.execute(
+                    insert(Order).values(**values).returning(Order.id, Order.address)
+                ).one()
+            inserted.append((row, order_id, address))
+        except Exception as e:
+            _fail(result, row, f"Database error: {str(e).splitlines()[0]}")
+    try:
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error importing orders in rows {chunk[0][0]}-{chunk[-1][0]}: {str(e)}")
+        for row, _, _ in inserted:
+            _fail(result, row, f"Database error: {str(e).splitlines()[0]}")
+        return []
+    return [(order_id, address) for _, order_id, address in inserted]
+
+def import_orders(
+    db: Session,
+    stream: BinaryIO,
+    file_format: str,
+    chunk_size: int = settings.ORDER_IMPORT_CHUNK_SIZE
+) -> Dict[str, Any]:
+    """
+    Import orders from an uploaded file
+
+    Records are validated as they are read and written in chunks, each in
+    its own transaction, so invalid rows and rows the database rejects are
+    reported without aborting the rest of the import. A malformed CSV or
+    JSON file stops the import at the point where it can no longer be read;
+    a malformed NDJSON line only fails its own row.
+
+    Args:
+        db: Database session
+        stream: Binary file object of the upload
+        file_format: "csv", "json" or "ndjson"
+        chunk_size: Orders inserted per transaction
+
+    Returns:
+        dict: imported and failed counts and row errors, rows numbered from 1
+    """
+    result = {"imported": 0, "failed": 0, "errors": []}
+    chunk = []
+    row = 0
+    try:
+        for record in read_records(stream, file_format):
+            row += 1
+            values, error = _validate(record)
+            if error:
+                _fail(result, row, error)
+                continue
+            chunk.append((row, values))
+            if len(chunk) >= chunk_size:
+                _write_chunk(db, chunk, result)
+                chunk = []
+    except (ValueError, csv.Error, UnicodeDecodeError) as e:
+        _fail(result, row + 1, f"Could not read file: {str(e)}")
+    if chunk:
+        _write_chunk(db, chunk, result)
+    logger.info(f"Imported {result['imported']} orders, {result['failed']} rows failed")
+    return result
@@ -0,0 +1,76 @@
+from typing import List, Dict, Any, Optional
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+import numpy as np
+import logging
+from ..models import Order
+from .solve_inputs import DEFAULT_TIME_WINDOW
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+def load_order_snapshot(
+    db: Session,
+    order_ids: Optional[List[int]] = None,
+    order_date: Optional[date] = None
+) -> Dict[str, Any]:
+    """
+    Load the orders for a planning run into columnar NumPy arrays
+
+    All orders are read with a single SQL statement over the typed columns,
+    so no per-row string parsing happens at solve time. Missing demands and
+    service times become 0, missing time window bounds fall back to the whole
+    day and missing coordinates become NaN.
+
+    Args:
+        db: Database session
+        order_ids: Restrict the snapshot to these order IDs
+        order_date: Restrict the snapshot to orders created on this day
+
+    Returns:
+        dict: Arrays keyed by id, demand, window_start, window_end,
+        service_time, lat and lng, plus the list of addresses
+    """
+    statement = select(
+        Order.id,
+        Order.address,
+        Order.load_value,
+        Order.start_seconds,
+        Order.end_seconds,
+        Order.duration_seconds,
+        Order.lat,
+        Order.lng
+    ).order_by(Order.id)
+
+    if order_ids is not None:
+        statement = statement.where(Order.id.in_(order_ids))
+    if order_date is not None:
+        day_start = datetime.combine(order_date, time.min)
+        statement = statement.where(
+            Order.created_at >= day_start,
+            Order.created_at < day_start + timedelta(days=1)
+        )
+
+    rows = db.execute(statement).all()
+    columns = list(zip(*rows)) if rows else [()] * 8
+
+    # None becomes NaN in float arrays, which lets defaults be filled vectorized
+    load = np.array(columns[2], dtype=np.float64)
+    start = np.array(columns[3], dtype=np.float64)
+    end = np.array(columns[4], dtype=np.float64)
+    duration = np.array(columns[5], dtype=np.float64)
+
+    snapshot = {
+        "id": np.array(columns[0], dtype=np.int64),
+        "address": list(columns[1]),
+        "demand": np.nan_to_num(load, nan=0.0).astype(np.int64),
+        "window_start": np.nan_to_num(start, nan=DEFAULT_TIME_WINDOW[0]).astype(np.int64),
+        "window_end": np.nan_to_num(end, nan=DEFAULT_TIME_WINDOW[1]).astype(np.int64),
+        "service_time": np.nan_to_num(duration, nan=0.0).astype(np.int64),
+        "lat": np.array(columns[6], dtype=np.float64),
+        "lng": np.array(columns[7], dtype=np.float64)
+    }
+
+    logger.info(f"Loaded order snapshot with {len(rows)} orders")
+    return snapshot
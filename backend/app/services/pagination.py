@@ -0,0 +1,182 @@
+from typing import Any, AsyncIterator, Callable, List, Optional, Tuple
+from datetime import datetime
+import base64
+import json
+from fastapi import HTTPException, Query as QueryParam, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+from ..database import AsyncSessionLocal
+
+# Largest page a client can request
+MAX_PAGE_SIZE = 1000
+
+# Rows fetched per round trip from the server-side cursor of an export
+EXPORT_BATCH_SIZE = 1000
+
+class PageParams:
+    """
+    Query parameters of a keyset-paginated list
+
+    Pages are ordered by id or by (created_at, id), with rows lacking
+    created_at after all others. The X-Next-Cursor response header holds
+    the cursor of the next page and is missing on the last page. skip still
+    selects offset paging for older clients.
+    """
+
+    def __init__(
+        self,
+        limit: int = QueryParam(100, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = QueryParam(None, description="X-Next-Cursor header of the previous page"),
+        order_by: str = QueryParam("id", pattern="^(id|created_at)$"),
+        created_after: Optional[datetime] = QueryParam(None),
+        created_before: Optional[datetime] = QueryParam(None),
+        skip: int = QueryParam(0, ge=0, description="Offset paging, slow on deep pages; use cursor instead")
+    ):
+        self.limit = limit
+        self.cursor = cursor
+        self.order_by = order_by
+        self.created_after = created_after
+        self.created_before = created_before
+        self.skip = skip
+
+def encode_cursor(values: List[Any]) -> str:
+    """
+    Opaque cursor for the sort key of the last row of a page
+    """
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, order_by: str) -> List[Any]:
+    """
+    Sort key values stored in a cursor
+
+    Raises:
+        ValueError: If the cursor is malformed or was made for another ordering
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if order_by == "created_at":
+        if not isinstance(values, list) or len(values) != 2 or not isinstance(values[1], int):
+            raise ValueError("Invalid cursor")
+        if values[0] is None:
+            return values
+        try:
+            return [datetime.fromisoformat(values[0]), values[1]]
+        except (TypeError, ValueError):
+            raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != 1 or not isinstance(values[0], int):
+        raise ValueError("Invalid cursor")
+    return values
+
+def _sort_keys(model, order_by: str) -> tuple:
+    return (model.created_at, model.id) if order_by == "created_at" else (model.id,)
+
+def _ordering(model, order_by: str) -> tuple:
+    # Rows without created_at come last, after every dated row
+    if order_by == "created_at":
+        return model.created_at.asc().nullslast(), model.id
+    return (model.id,)
+
+def _after(keys: tuple, values: List[Any]):
+    """
+    Filter for the rows after a cursor in _ordering() order
+    """
+    if len(keys) == 1:
+        return keys[0] > values[0]
+    created_at, row_id = keys
+    if values[0] is None:
+        return and_(created_at.is_(None), row_id > values[1])
+    # A tuple comparison never matches NULL, so undated rows are added explicitly
+    return or_(tuple_(*keys) > tuple_(*values), created_at.is_(None))
+
+def filter_created(statement: Select, model, page: PageParams) -> Select:
+    """
+    Apply the created_after and created_before filters
+    """
+    if page.created_after is not None:
+        statement = statement.filter(model.created_at >= page.created_after)
+    if page.created_before is not None:
+        statement = statement.filter(model.created_at < page.created_before)
+    return statement
+
+async def keyset_page(db: AsyncSession, statement: Select, model, page: PageParams) -> Tuple[List[Any], Optional[str]]:
+    """
+    Fetch one page after the cursor, using the sort key index instead of an offset
+
+    Args:
+        db: Async database session
+        statement: Filtered select of the model
+        model: Queried model
+        page: Page parameters
+
+    Returns:
+        tuple: (rows, cursor of the next page or None)
+
+    Raises:
+        ValueError: If the cursor is invalid
+    """
+    keys = _sort_keys(model, page.order_by)
+    if page.cursor:
+        statement = statement.filter(_after(keys, decode_cursor(page.cursor, page.order_by)))
+    rows = (await db.scalars(statement.order_by(*_ordering(model, page.order_by)).limit(page.limit + 1))).all()
+    if len(rows) <= page.limit:
+        return rows, None
+    rows = rows[:page.limit]
+    return rows, encode_cursor([getattr(rows[-1], key.key) for key in keys])
+
+async def paginate(db: AsyncSession, statement: Select, model, page: PageParams, response: Response) -> List[Any]:
+    """
+    Fetch the requested page of a filtered select and set X-Next-Cursor
+    """
+    statement = filter_created(statement, model, page)
+    if page.skip:
+        return (await db.scalars(statement.order_by(model.id).offset(page.skip).limit(page.limit))).all()
+    try:
+        rows, next_cursor = await keyset_page(db, statement, model, page)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
+
+def export_ndjson(
+    model,
+    schema,
+    page: PageParams,
+    filters: Callable[[Select], Select],
+    filename: str
+) -> StreamingResponse:
+    """
+    Stream every matching row as newline-delimited JSON
+
+    Rows are read through a server-side cursor in batches of
+    EXPORT_BATCH_SIZE, so the table is never held in memory. The export
+    uses its own session because the request session is closed before the
+    body is streamed.
+
+    Args:
+        model: Queried model
+        schema: Response schema each row is serialized with
+        page: Page parameters; only ordering and created filters apply
+        filters: Applies the entity specific filters to a select
+        filename: Download file name
+    """
+    fields = list(schema.__fields__)
+
+    async def rows() -> AsyncIterator[str]:
+        async with AsyncSessionLocal() as db:
+            statement = filter_created(filters(select(model)), model, page)
+            statement = statement.order_by(*_ordering(model, page.order_by))
+            result = await db.stream_scalars(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+            async for row in result:
+                yield schema(**{field: getattr(row, field) for field in fields}).json() + "\n"
+
+    return StreamingResponse(
+        rows(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -0,0 +1,97 @@
+from typing import Any, Dict
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+class PoolStats:
+    """
+    Checkout counters of one connection pool
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.invalidations = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.held_seconds = 0.0
+        self.max_held_seconds = 0.0
+
+    def on_connect(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            self.connects += 1
+
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        connection_record.record_info["checked_out_at"] = time.monotonic()
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def on_checkin(self, dbapi_connection, connection_record) -> None:
+        checked_out_at = connection_record.record_info.pop("checked_out_at", None)
+        if checked_out_at is None:
+            return
+        held = time.monotonic() - checked_out_at
+        with self._lock:
+            self.in_use -= 1
+            self.held_seconds += held
+            self.max_held_seconds = max(self.max_held_seconds, held)
+
+    def on_invalidate(self, dbapi_connection, connection_record, exception) -> None:
+        with self._lock:
+            self.invalidations += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "invalidations": self.invalidations,
+                "in_use": self.in_use,
+                "peak_in_use": self.peak_in_use,
+                "avg_held_ms": round(self.held_seconds / self.checkouts * 1000, 2) if self.checkouts else 0.0,
+                "max_held_ms": round(self.max_held_seconds * 1000, 2),
+            }
+
+_pools: Dict[str, tuple] = {}
+
+def track_pool(name: str, engine: Engine) -> None:
+    """
+    Count checkouts of an engine's pool; pass async_engine.sync_engine for async engines
+    """
+    if name in _pools:
+        return
+    stats = PoolStats()
+    event.listen(engine, "connect", stats.on_connect)
+    event.listen(engine, "checkout", stats.on_checkout)
+    event.listen(engine, "checkin", stats.on_checkin)
+    event.listen(engine, "invalidate", stats.on_invalidate)
+    _pools[name] = (engine, stats)
+
+def pool_metrics() -> Dict[str, Dict[str, Any]]:
+    """
+    Current state and checkout counters of every tracked pool
+
+    Returns:
+        dict: Pool name -> size, checked out and overflow connections when
+        the pool is a queue pool, and the checkout counters
+    """
+    metrics = {}
+    for name, (engine, stats) in _pools.items():
+        pool = engine.pool
+        state = {"pool": type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            state.update({
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": max(pool.overflow(), 0),
+                "max_overflow": pool._max_overflow,
+            })
+        state.update(stats.snapshot())
+        metrics[name] = state
+    return metrics
@@ -0,0 +1,278 @@
+from typing import Dict, Tuple, Optional, Callable, Any
+from contextlib import contextmanager
+import contextvars
+import asyncio
+import random
+import sqlite3
+import threading
+import time
+import logging
+from ..config import settings
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+
+# Priority of Google API calls made in the current context
+_current_priority = contextvars.ContextVar("maps_call_priority", default=INTERACTIVE)
+
+@contextmanager
+def call_priority(priority: str):
+    """
+    Run the enclosed Google API calls at the given priority
+
+    Background work such as queue geocoding or matrix warm-up should wrap its
+    calls in `call_priority(BATCH)` so interactive traffic keeps headroom.
+    """
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+class QuotaExceeded(Exception):
+    """
+    Raised when quota could not be acquired within the allowed wait
+    """
+
+class LocalQuotaStore:
+    """
+    In-process token buckets
+
+    Only coordinates callers within one worker; stands in for a network
+    store in tests and single-worker deployments.
+    """
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float]] = {}  # name -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def try_acquire(self, costs: Dict[str, float], limits: Dict[str, Tuple[float, float]], reserve: float) -> float:
+        with self._lock:
+            now = time.time()
+            levels = {name: _refill(self._buckets.get(name), limits[name], now) for name in costs}
+            wait = _wait_time(costs, levels, limits, reserve)
+            if wait == 0:
+                for name, cost in costs.items():
+                    self._buckets[name] = (levels[name] - cost, now)
+            return wait
+
+class SQLiteQuotaStore:
+    """
+    Token buckets in a SQLite file shared by every worker on the node
+
+    `BEGIN IMMEDIATE` serializes concurrent acquisitions across processes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS quota_buckets (name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def try_acquire(self, costs: Dict[str, float], limits: Dict[str, Tuple[float, float]], reserve: float) -> float:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            placeholders = ",".join("?" for _ in costs)
+            rows = conn.execute(
+                f"SELECT name, tokens, updated_at FROM quota_buckets WHERE name IN ({placeholders})",
+                list(costs)
+            ).fetchall()
+            stored = {name: (tokens, updated_at) for name, tokens, updated_at in rows}
+            levels = {name: _refill(stored.get(name), limits[name], now) for name in costs}
+            wait = _wait_time(costs, levels, limits, reserve)
+            if wait == 0:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO quota_buckets (name, tokens, updated_at) VALUES (?, ?, ?)",
+                    [(name, levels[name] - cost, now) for name, cost in costs.items()]
+                )
+            conn.execute("COMMIT")
+            return wait
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+def _refill(bucket: Optional[Tuple[float, float]], limit: Tuple[float, float], now: float) -> float:
+    """
+    Current token level of a bucket after refilling since its last update
+    """
+    rate, capacity = limit
+    if bucket is None:
+        return capacity
+    tokens, updated_at = bucket
+    return min(capacity, tokens + (now - updated_at) * rate)
+
+def _wait_time(
+    costs: Dict[str, float],
+    levels: Dict[str, float],
+    limits: Dict[str, Tuple[float, float]],
+    reserve: float
+) -> float:
+    """
+    Seconds until every bucket can pay its cost while keeping the reserve
+    """
+    wait = 0.0
+    for name, cost in costs.items():
+        rate, capacity = limits[name]
+        # A single call larger than the bucket can only ever wait for a full bucket
+        needed = min(cost + reserve * capacity, capacity)
+        if levels[name] < needed:
+            wait = max(wait, (needed - levels[name]) / rate)
+    return wait
+
+class QuotaGovernor:
+    """
+    Enforces shared requests-per-second and elements-per-second budgets for
+    Google API calls
+
+    Batch calls may only spend tokens while a reserve fraction of each bucket
+    remains, so interactive calls are served first under contention.
+    """
+
+    def __init__(self, store, requests_per_second: float, elements_per_second: float, batch_reserve: float):
+        self.store = store
+        self.limits = {
+            "requests": (requests_per_second, requests_per_second),
+            "elements": (elements_per_second, elements_per_second)
+        }
+        self.batch_reserve = batch_reserve
+
+    def _costs(self, elements: int) -> Dict[str, float]:
+        costs = {"requests": 1.0}
+        if elements:
+            costs["elements"] = float(elements)
+        return costs
+
+    def _reserve(self) -> float:
+        return self.batch_reserve if _current_priority.get() == BATCH else 0.0
+
+    def acquire(self, elements: int = 0, max_wait: Optional[float] = None) -> None:
+        """
+        Block until quota for one call is available
+
+        Args:
+            elements: Distance matrix elements the call will consume
+            max_wait: Give up after this many seconds
+
+        Raises:
+            QuotaExceeded: If quota was not available within max_wait
+        """
+        max_wait = settings.QUOTA_MAX_WAIT if max_wait is None else max_wait
+        deadline = time.time() + max_wait
+        costs = self._costs(elements)
+        while True:
+            wait = self.store.try_acquire(costs, self.limits, self._reserve())
+            if wait == 0:
+                return
+            if time.time() + wait > deadline:
+                raise QuotaExceeded(f"Google API quota unavailable for {max_wait}s")
+            time.sleep(wait)
+
+    async def acquire_async(self, elements: int = 0, max_wait: Optional[float] = None) -> None:
+        """
+        Non-blocking variant of acquire
+        """
+        max_wait = settings.QUOTA_MAX_WAIT if max_wait is None else max_wait
+        deadline = time.time() + max_wait
+        costs = self._costs(elements)
+        while True:
+            wait = await asyncio.to_thread(self.store.try_acquire, costs, self.limits, self._reserve())
+            if wait == 0:
+                return
+            if time.time() + wait > deadline:
+                raise QuotaExceeded(f"Google API quota unavailable for {max_wait}s")
+            await asyncio.sleep(wait)
+
+def _create_store():
+    if settings.QUOTA_BACKEND == "sqlite":
+        return SQLiteQuotaStore(settings.QUOTA_STORE_PATH)
+    return LocalQuotaStore()
+
+# Shared governor for this worker; the store decides how far sharing reaches
+governor = QuotaGovernor(
+    _create_store(),
+    requests_per_second=settings.GOOGLE_MAPS_REQUESTS_PER_SECOND,
+    elements_per_second=settings.GOOGLE_MAPS_ELEMENTS_PER_SECOND,
+    batch_reserve=settings.QUOTA_BATCH_RESERVE
+)
+
+def is_over_query_limit(error: Exception) -> bool:
+    """
+    Whether Google rejected a call for quota reasons
+
+    QuotaExceeded from the governor does not count; the governor has
+    already waited as long as allowed.
+    """
+    if getattr(error, "status", None) in ("OVER_QUERY_LIMIT", "RESOURCE_EXHAUSTED"):
+        return True
+    if getattr(error, "status_code", None) == 429:
+        return True
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None) == 429
+
+def backoff_delay(attempt: int) -> float:
+    """
+    Exponential backoff with full jitter
+    """
+    return random.uniform(0, settings.MAPS_RETRY_BASE_DELAY * (2 ** attempt))
+
+def _remaining(deadline: float) -> float:
+    return max(0.0, deadline - time.time())
+
+def call_with_quota(fn: Callable[..., Any], *args, elements: int = 0, **kwargs) -> Any:
+    """
+    Call a Google API function under the quota governor, retrying calls
+    Google rejected for quota reasons with jittered backoff
+
+    Quota waits and retries share one deadline of MAPS_CALL_DEADLINE seconds.
+
+    Args:
+        fn: Client method to call
+        elements: Distance matrix elements the call will consume
+
+    Returns:
+        The function's return value
+
+    Raises:
+        QuotaExceeded: If the governor had no quota before the deadline
+    """
+    deadline = time.time() + settings.MAPS_CALL_DEADLINE
+    for attempt in range(settings.MAPS_MAX_RETRIES + 1):
+        governor.acquire(elements, max_wait=_remaining(deadline))
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            delay = backoff_delay(attempt)
+            if not is_over_query_limit(e) or attempt == settings.MAPS_MAX_RETRIES or delay >= _remaining(deadline):
+                raise
+            logger.warning(f"Google API over quota, retrying in {delay:.2f}s")
+            time.sleep(delay)
+
+async def call_with_quota_async(fn: Callable[..., Any], *args, elements: int = 0, **kwargs) -> Any:
+    """
+    Non-blocking variant of call_with_quota for coroutine functions
+    """
+    deadline = time.time() + settings.MAPS_CALL_DEADLINE
+    for attempt in range(settings.MAPS_MAX_RETRIES + 1):
+        await governor.acquire_async(elements, max_wait=_remaining(deadline))
+        try:
+            return await fn(*args, **kwargs)
+        except Exception as e:
+            delay = backoff_delay(attempt)
+            if not is_over_query_limit(e) or attempt == settings.MAPS_MAX_RETRIES or delay >= _remaining(deadline):
+                raise
+            logger.warning(f"Google API over quota, retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
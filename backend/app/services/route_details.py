@@ -0,0 +1,127 @@
+from typing import Dict, Any, List, Optional, Tuple
+import json
+import zlib
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from ..models import RouteHistory, RouteDetail
+from .location_keys import GRID_PRECISION
+
+def encode_polyline(points: List[Tuple[float, float]], precision: int = GRID_PRECISION) -> str:
+    """
+    Encode coordinates with the Google encoded polyline algorithm
+
+    Args:
+        points: (lat, lng) pairs
+        precision: Decimal places kept
+
+    Returns:
+        str: Encoded polyline
+    """
+    factor = 10 ** precision
+    chunks = []
+    previous = (0, 0)
+    for lat, lng in points:
+        current = (round(lat * factor), round(lng * factor))
+        for value, last in zip(current, previous):
+            delta = value - last
+            delta = ~(delta << 1) if delta < 0 else delta << 1
+            while delta >= 0x20:
+                chunks.append(chr((0x20 | (delta & 0x1f)) + 63))
+                delta >>= 5
+            chunks.append(chr(delta + 63))
+        previous = current
+    return "".join(chunks)
+
+def decode_polyline(polyline: str, precision: int = GRID_PRECISION) -> List[Tuple[float, float]]:
+    """
+    Decode an encoded polyline into (lat, lng) pairs
+    """
+    factor = 10 ** precision
+    points = []
+    values = [0, 0]
+    index = 0
+    while index < len(polyline):
+        for k in range(2):
+            shift = 0
+            result = 0
+            while True:
+                byte = ord(polyline[index]) - 63
+                index += 1
+                result |= (byte & 0x1f) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            values[k] += ~(result >> 1) if result & 1 else result >> 1
+        points.append((values[0] / factor, values[1] / factor))
+    return points
+
+def _has_coordinate(waypoint: Any) -> bool:
+    return isinstance(waypoint, dict) and all(
+        isinstance(waypoint.get(key), (int, float)) and not isinstance(waypoint.get(key), bool)
+        for key in ("lat", "lng")
+    )
+
+def pack_route_data(route_data: Dict[str, Any]) -> Tuple[Optional[str], bytes]:
+    """
+    Split route data into an encoded polyline of the waypoint coordinates
+    and the compressed JSON of everything else
+
+    Coordinates are kept to GRID_PRECISION decimals. Route data whose
+    waypoints do not all have coordinates is stored as JSON only.
+
+    Returns:
+        tuple: (polyline or None, compressed JSON)
+    """
+    waypoints = route_data.get("waypoints")
+    polyline = None
+    if isinstance(waypoints, list) and waypoints and all(_has_coordinate(waypoint) for waypoint in waypoints):
+        polyline = encode_polyline([(waypoint["lat"], waypoint["lng"]) for waypoint in waypoints])
+        route_data = dict(route_data, waypoints=[
+            {key: value for key, value in waypoint.items() if key not in ("lat", "lng")}
+            for waypoint in waypoints
+        ])
+    data = zlib.compress(json.dumps(route_data, separators=(",", ":")).encode("utf-8"), 9)
+    return polyline, data
+
+def unpack_route_data(polyline: Optional[str], data: Optional[bytes]) -> Optional[Dict[str, Any]]:
+    """
+    Rebuild route data stored by pack_route_data()
+    """
+    if data is None:
+        return None
+    route_data = json.loads(zlib.decompress(data).decode("utf-8"))
+    if polyline is not None:
+        for waypoint, (lat, lng) in zip(route_data["waypoints"], decode_polyline(polyline)):
+            waypoint["lat"] = lat
+            waypoint["lng"] = lng
+    return route_data
+
+async def load_route_data(db: AsyncSession, route_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    Route data of several routes in one query
+
+    Returns:
+        dict: Route ID -> route data, for routes that have any
+    """
+    if not route_ids:
+        return {}
+    rows = (await db.execute(select(RouteDetail.route_history_id, RouteDetail.polyline, RouteDetail.data).where(
+        RouteDetail.route_history_id.in_(route_ids)
+    ))).all()
+    return {route_id: unpack_route_data(polyline, data) for route_id, polyline, data in rows}
+
+def save_route_data(db: Session, route: RouteHistory, route_data: Optional[Dict[str, Any]]) -> None:
+    """
+    Store or replace the route data of a flushed route, in the current transaction
+    """
+    detail = db.query(RouteDetail).filter(RouteDetail.route_history_id == route.id).first()
+    if route_data is None:
+        if detail is not None:
+            db.delete(detail)
+        return
+    if detail is None:
+        detail = RouteDetail(route_history_id=route.id)
+        db.add(detail)
+    detail.date_created = route.date_created
+    detail.polyline, detail.data = pack_route_data(route_data)
@@ -0,0 +1,62 @@
+from typing import List, Dict, Any
+import math
+import logging
+from ..utils.parsing import parse_quantity
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Default time window (whole day in seconds from midnight)
+DEFAULT_TIME_WINDOW = (0, 86400)
+
+def build_solve_inputs(depot, snapshot: Dict[str, Any], vehicles: List[Any]) -> Dict[str, Any]:
+    """
+    Build solver arrays from a stored depot, an order snapshot and vehicle rows
+
+    The depot is placed at index 0 followed by the snapshot orders. Capacity,
+    time window and service time arrays are only produced when the underlying
+    rows carry that information.
+
+    Args:
+        depot: Depot row
+        snapshot: Columnar order snapshot from load_order_snapshot
+        vehicles: Vehicle rows
+
+    Returns:
+        dict: Keyword arguments for solve_vrp plus the order IDs per location
+    """
+    locations = [depot.address] + snapshot["address"]
+
+    demands = [0] + snapshot["demand"].tolist()
+    capacities = [
+        int(vehicle.capacity_value if vehicle.capacity_value is not None else parse_quantity(vehicle.capacity) or 0)
+        for vehicle in vehicles
+    ]
+    use_capacities = any(demands) and all(capacity > 0 for capacity in capacities)
+
+    window_start = snapshot["window_start"]
+    window_end = snapshot["window_end"]
+    use_time_windows = bool(
+        (window_start != DEFAULT_TIME_WINDOW[0]).any() or (window_end != DEFAULT_TIME_WINDOW[1]).any()
+    )
+    time_windows = [DEFAULT_TIME_WINDOW] + list(zip(window_start.tolist(), window_end.tolist()))
+
+    service_times = [0] + snapshot["service_time"].tolist()
+
+    # Stored geocodes; NaN marks orders the background queue has not geocoded yet
+    coordinates = [(depot.lat, depot.lng) if depot.lat is not None and depot.lng is not None else None]
+    for lat, lng in zip(snapshot["lat"].tolist(), snapshot["lng"].tolist()):
+        coordinates.append(None if math.isnan(lat) or math.isnan(lng) else (lat, lng))
+
+    return {
+        "locations": locations,
+        "order_ids": [None] + snapshot["id"].tolist(),
+        "num_vehicles": len(vehicles),
+        "vehicle_types": [vehicle.type for vehicle in vehicles],
+        "depot_index": 0,
+        "vehicle_capacities": capacities if use_capacities else None,
+        "demands": demands if use_capacities else None,
+        "time_windows": time_windows if use_time_windows else None,
+        "service_times": service_times if any(service_times) else None,
+        "coordinates": coordinates
+    }
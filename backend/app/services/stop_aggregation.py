@@ -0,0 +1,176 @@
+from typing import List, Dict, Any, Tuple, Optional
+import logging
+from .location_keys import canonical_address
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Decimal places used when comparing coordinates (~0.1 m)
+COORDINATE_PRECISION = 6
+
+def _location_key(address: str, coordinate: Optional[Tuple[float, float]]) -> Tuple:
+    """
+    Build the grouping key for a stop, preferring coordinates when known
+    """
+    if coordinate is not None:
+        return (
+            "coord",
+            round(coordinate[0], COORDINATE_PRECISION),
+            round(coordinate[1], COORDINATE_PRECISION)
+        )
+    return ("address", canonical_address(address))
+
+def aggregate_stops(
+    locations: List[str],
+    depot_index: int = 0,
+    demands: Optional[List[int]] = None,
+    time_windows: Optional[List[Tuple[int, int]]] = None,
+    service_times: Optional[List[int]] = None,
+    coordinates: Optional[List[Optional[Tuple[float, float]]]] = None,
+    vehicle_capacities: Optional[List[int]] = None
+) -> Dict[str, Any]:
+    """
+    Merge co-located stops into super-nodes
+
+    Stops sharing a canonical address or coordinate are merged as long as
+    their time windows still overlap and their summed demand fits the
+    largest vehicle; demands and service times of merged stops are summed
+    and their time windows intersected. The depot is never merged with
+    other stops.
+
+    Args:
+        locations: List of location addresses or coordinates
+        depot_index: Index of the depot location
+        demands: List of demands for each location
+        time_windows: List of time windows for each location (start, end)
+        service_times: List of service times for each location (seconds)
+        coordinates: Optional (lat, lng) for each location
+        vehicle_capacities: Capacity of each vehicle
+
+    Returns:
+        dict: Aggregated locations, demands, time windows, service times,
+        coordinates, the new depot index and the original indices in each group
+    """
+    groups: List[List[int]] = []
+    group_windows: List[Optional[Tuple[int, int]]] = []
+    group_demands: List[int] = []
+    open_groups: Dict[Tuple, List[int]] = {}
+    # A merged stop is served by a single vehicle, so it must fit the largest one
+    max_demand = max(vehicle_capacities) if demands and vehicle_capacities else None
+
+    for idx, address in enumerate(locations):
+        demand = demands[idx] if demands else 0
+        if idx == depot_index:
+            groups.append([idx])
+            group_windows.append(time_windows[idx] if time_windows else None)
+            group_demands.append(demand)
+            continue
+
+        coordinate = coordinates[idx] if coordinates else None
+        key = _location_key(address, coordinate)
+        window = time_windows[idx] if time_windows else None
+
+        # Join the first group at this location with room for the demand
+        # and a compatible window
+        target = None
+        for group_idx in open_groups.get(key, []):
+            if max_demand is not None and group_demands[group_idx] + demand > max_demand:
+                continue
+            current = group_windows[group_idx]
+            if current is None or window is None:
+                target = group_idx
+                break
+            start = max(current[0], window[0])
+            end = min(current[1], window[1])
+            if start <= end:
+                group_windows[group_idx] = (start, end)
+                target = group_idx
+                break
+
+        if target is None:
+            open_groups.setdefault(key, []).append(len(groups))
+            groups.append([idx])
+            group_windows.append(window)
+            group_demands.append(demand)
+        else:
+            groups[target].append(idx)
+            group_demands[target] += demand
+
+    new_depot_index = next(i for i, group in enumerate(groups) if group[0] == depot_index)
+
+    aggregated = {
+        "locations": [locations[group[0]] for group in groups],
+        "depot_index": new_depot_index,
+        "demands": [sum(demands[i] for i in group) for group in groups] if demands else None,
+        "time_windows": group_windows if time_windows else None,
+        "service_times": [sum(service_times[i] for i in group) for group in groups] if service_times else None,
+        "coordinates": [coordinates[group[0]] for group in groups] if coordinates else None,
+        "groups": groups
+    }
+
+    logger.info(f"Aggregated {len(locations)} stops into {len(groups)} nodes")
+    return aggregated
+
+def prepare_problem(
+    locations: List[str],
+    depot_index: int = 0,
+    demands: Optional[List[int]] = None,
+    time_windows: Optional[List[Tuple[int, int]]] = None,
+    service_times: Optional[List[int]] = None,
+    coordinates: Optional[List[Optional[Tuple[float, float]]]] = None,
+    vehicle_capacities: Optional[List[int]] = None,
+    aggregate_colocated: bool = True
+) -> Dict[str, Any]:
+    """
+    Collect the per-location inputs of a solve, merging co-located stops if requested
+
+    Shared by the solver and the matrix warm-up, so both request matrices
+    for the same locations.
+    """
+    problem = {
+        "locations": locations,
+        "depot_index": depot_index,
+        "demands": demands,
+        "time_windows": time_windows,
+        "service_times": service_times,
+        "coordinates": coordinates,
+        "groups": None
+    }
+    
+    if aggregate_colocated:
+        aggregated = aggregate_stops(
+            locations,
+            depot_index=depot_index,
+            demands=demands,
+            time_windows=time_windows,
+            service_times=service_times,
+            coordinates=coordinates,
+            vehicle_capacities=vehicle_capacities
+        )
+        if len(aggregated["groups"]) < len(locations):
+            problem.update(aggregated)
+    
+    return problem
+
+def expand_solution(result: Dict[str, Any], groups: List[List[int]]) -> Dict[str, Any]:
+    """
+    Expand a solution computed on super-nodes back to per-order stops
+
+    Args:
+        result: Solution returned by the VRP solver on aggregated nodes
+        groups: Original location indices belonging to each aggregated node
+
+    Returns:
+        dict: Solution whose routes reference the original location indices
+    """
+    if result.get("status") != "OK":
+        return result
+
+    expanded_routes = []
+    for route in result.get("routes", []):
+        expanded = []
+        for node in route["route"]:
+            expanded.extend(groups[node])
+        expanded_routes.append({**route, "route": expanded})
+
+    return {**result, "routes": expanded_routes}
@@ -0,0 +1,220 @@
+from typing import List, Dict, Any, Tuple, Optional
+from datetime import datetime, timezone
+from collections import defaultdict
+from sqlalchemy.orm import Session
+import numpy as np
+import json
+import math
+import os
+import logging
+from ..config import settings
+from ..models import RouteHistory, RouteDetail, Vehicle
+from .vehicle_profiles import resolve_profile
+from .route_details import unpack_route_data
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Hours per time bucket (8 buckets per day)
+TIME_BUCKET_HOURS = 3
+
+# Size of an area cell in degrees (~5 km)
+AREA_CELL_DEGREES = 0.05
+
+# Pseudo-count pulling sparse keys towards their parent level
+PRIOR_WEIGHT = 5.0
+
+# Ratios outside this range are treated as bad data
+MIN_RATIO = 0.5
+MAX_RATIO = 3.0
+
+ANY = "*"
+
+_model_cache: Dict[str, Any] = {"mtime": None, "model": None}
+
+def time_bucket(moment: Optional[datetime]) -> str:
+    """
+    Map a datetime onto its time-of-day bucket in UTC
+
+    Naive datetimes are taken to be UTC, like the stored route timestamps.
+    """
+    if moment is None:
+        return ANY
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc)
+    return str(moment.hour // TIME_BUCKET_HOURS)
+
+def area_cell(lat: Optional[float], lng: Optional[float]) -> str:
+    """
+    Map a coordinate onto its area cell
+    """
+    if lat is None or lng is None or math.isnan(lat) or math.isnan(lng):
+        return ANY
+    return f"{math.floor(lat / AREA_CELL_DEGREES)}:{math.floor(lng / AREA_CELL_DEGREES)}"
+
+def _route_origin(route_data: Optional[Dict[str, Any]]) -> Tuple[Optional[float], Optional[float]]:
+    """
+    Get the coordinate of the first waypoint stored with a route, if any
+    """
+    waypoints = (route_data or {}).get("waypoints") or []
+    if waypoints and isinstance(waypoints[0], dict):
+        return waypoints[0].get("lat"), waypoints[0].get("lng")
+    return None, None
+
+def _keys(bucket: str, cell: str, profile: str) -> List[str]:
+    """
+    Lookup keys from most to least specific
+    """
+    return [
+        f"{bucket}|{cell}|{profile}",
+        f"{bucket}|{ANY}|{profile}",
+        f"{ANY}|{ANY}|{profile}",
+        f"{ANY}|{ANY}|{ANY}"
+    ]
+
+def fit_correction_model(db: Session, min_samples: int = 3) -> Dict[str, Any]:
+    """
+    Fit travel time correction factors from planned vs actual route durations
+
+    Each route contributes the log ratio of actual to planned duration to
+    every level of the (time bucket, area cell, vehicle profile) hierarchy.
+    Route history stores no departure time, so a route is bucketed by the
+    time its record was created (date_created), not by when it departed.
+    Factors at each level are shrunk towards the next coarser level, so
+    sparse keys fall back smoothly instead of overfitting.
+
+    Args:
+        db: Database session
+        min_samples: Minimum number of routes for a key to be kept
+
+    Returns:
+        dict: Correction model with factors keyed by "bucket|cell|profile"
+    """
+    rows = db.query(
+        RouteHistory.date_created,
+        RouteHistory.total_duration,
+        RouteHistory.actual_completion_time,
+        RouteDetail.polyline,
+        RouteDetail.data,
+        Vehicle.type
+    ).outerjoin(Vehicle, Vehicle.id == RouteHistory.vehicle_id).outerjoin(
+        RouteDetail, RouteDetail.route_history_id == RouteHistory.id
+    ).filter(
+        RouteHistory.total_duration > 0,
+        RouteHistory.actual_completion_time > 0
+    ).all()
+
+    sums: Dict[str, float] = defaultdict(float)
+    counts: Dict[str, int] = defaultdict(int)
+
+    for date_created, planned, actual, polyline, data, vehicle_type in rows:
+        ratio = actual / planned
+        if not MIN_RATIO <= ratio <= MAX_RATIO:
+            continue
+        lat, lng = _route_origin(unpack_route_data(polyline, data))
+        profile = resolve_profile(vehicle_type) if vehicle_type else ANY
+        log_ratio = math.log(ratio)
+        for key in set(_keys(time_bucket(date_created), area_cell(lat, lng), profile)):
+            sums[key] += log_ratio
+            counts[key] += 1
+
+    # Resolve levels from coarsest to finest so every parent is known first
+    factors: Dict[str, float] = {}
+    for key in sorted(sums, key=lambda k: -k.count(ANY)):
+        bucket, cell, profile = key.split("|")
+        parents = [parent for parent in _keys(bucket, cell, profile) if parent != key and parent in factors]
+        parent_log = math.log(factors[parents[0]]) if parents else 0.0
+        if counts[key] < min_samples and parents:
+            continue
+        log_factor = (sums[key] + PRIOR_WEIGHT * parent_log) / (counts[key] + PRIOR_WEIGHT)
+        factors[key] = round(math.exp(log_factor), 4)
+
+    logger.info(f"Fitted travel time correction with {len(factors)} keys from {len(rows)} routes")
+    return {
+        "fitted_at": datetime.now(timezone.utc).isoformat(),
+        "time_bucket_hours": TIME_BUCKET_HOURS,
+        "area_cell_degrees": AREA_CELL_DEGREES,
+        "routes": len(rows),
+        "factors": factors
+    }
+
+def save_correction_model(model: Dict[str, Any], path: Optional[str] = None) -> None:
+    """
+    Write a correction model to disk
+    """
+    path = path or settings.TRAVEL_TIME_CORRECTION_PATH
+    with open(path, "w") as f:
+        json.dump(model, f)
+
+def load_correction_model(path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Load the correction model, reloading it only when the file changed
+
+    Returns:
+        dict: Correction model or None if no model has been fitted
+    """
+    path = path or settings.TRAVEL_TIME_CORRECTION_PATH
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+
+    if _model_cache["mtime"] != mtime:
+        try:
+            with open(path) as f:
+                _model_cache["model"] = json.load(f)
+            _model_cache["mtime"] = mtime
+        except (OSError, ValueError) as e:
+            logger.error(f"Error loading travel time correction model: {str(e)}")
+            return None
+    return _model_cache["model"]
+
+def lookup_factor(model: Dict[str, Any], bucket: str, cell: str, profile: str) -> float:
+    """
+    Get the most specific correction factor available for a key
+    """
+    factors = model.get("factors", {})
+    for key in _keys(bucket, cell, profile):
+        if key in factors:
+            return factors[key]
+    return 1.0
+
+def correct_time_matrix(
+    time_matrix: np.ndarray,
+    profile: Optional[str] = None,
+    departure_time: Optional[datetime] = None,
+    coordinates: Optional[List[Optional[Tuple[float, float]]]] = None,
+    model: Optional[Dict[str, Any]] = None
+) -> np.ndarray:
+    """
+    Apply learned correction factors to a travel time matrix
+
+    Rows are scaled by the factor of the origin's area cell, so free-flow
+    durations from the cache or a non-traffic-aware source yield realistic
+    ETAs. Do not apply it to current durations in traffic.
+
+    Args:
+        time_matrix: Travel time matrix (seconds)
+        profile: Vehicle profile the matrix belongs to
+        departure_time: Planned departure, used for the time bucket; defaults to now
+        coordinates: Optional (lat, lng) for each location
+        model: Correction model; the fitted model on disk is used if omitted
+
+    Returns:
+        numpy.ndarray: Corrected travel time matrix (seconds)
+    """
+    model = model or load_correction_model()
+    if not model:
+        return time_matrix
+
+    bucket = time_bucket(departure_time or datetime.now(timezone.utc))
+    profile = profile or ANY
+    cells = [area_cell(*coordinate) if coordinate else ANY for coordinate in (coordinates or [None] * len(time_matrix))]
+
+    # Cells repeat heavily, so look each one up only once
+    cell_factors = {cell: lookup_factor(model, bucket, cell, profile) for cell in set(cells)}
+    row_factors = np.array([cell_factors[cell] for cell in cells], dtype=np.float64)
+
+    corrected = np.rint(time_matrix * row_factors[:, np.newaxis]).astype(time_matrix.dtype)
+    # Keep unreachable markers from the input matrix unchanged
+    return np.where(time_matrix >= 999999, time_matrix, corrected)
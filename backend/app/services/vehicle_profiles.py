@@ -0,0 +1,123 @@
+from typing import List, Dict, Any, Tuple, Optional, Callable
+import re
+import numpy as np
+import logging
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Travel time multipliers per vehicle class, relative to the car/van times
+# returned by the distance matrix API. Distance bands adjust the factor by
+# trip length: bikes keep up in short urban hops but fall behind on longer
+# trips, trucks lose most on short trips (manoeuvring, access) and converge
+# to van times on arterial roads.
+VEHICLE_PROFILES: Dict[str, Dict[str, Any]] = {
+    "van": {
+        "speed_factor": 1.0,
+        "distance_bands": []
+    },
+    "cargo_bike": {
+        "speed_factor": 1.1,
+        "distance_bands": [
+            (2000, 0.85),   # up to 2 km: faster than vans in city traffic
+            (8000, 1.2),
+            (None, 1.6)
+        ]
+    },
+    "truck": {
+        "speed_factor": 1.15,
+        "distance_bands": [
+            (3000, 1.15),
+            (20000, 1.05),
+            (None, 1.0)
+        ]
+    }
+}
+
+DEFAULT_PROFILE = "van"
+
+# Words used to map free-text Vehicle.type values onto profiles; matched as
+# whole words, so "Motorcycle" does not count as a cycle
+_PROFILE_KEYWORDS = [
+    ("cargo_bike", ("bike", "cargobike", "ebike", "bicycle", "cycle")),
+    ("truck", ("truck", "lorry", "hgv", "7.5t"))
+]
+
+def resolve_profile(vehicle_type: Optional[str]) -> str:
+    """
+    Map a stored vehicle type onto a profile name
+
+    Args:
+        vehicle_type: Value of Vehicle.type, e.g. "Cargo Bike" or "Truck 7.5t"
+
+    Returns:
+        str: Profile name from VEHICLE_PROFILES
+    """
+    if not vehicle_type:
+        return DEFAULT_PROFILE
+    normalized = vehicle_type.lower().strip().replace(" ", "_")
+    if normalized in VEHICLE_PROFILES:
+        return normalized
+    words = set(re.findall(r"[a-z0-9.]+", normalized))
+    for profile, keywords in _PROFILE_KEYWORDS:
+        if words.intersection(keywords):
+            return profile
+    return DEFAULT_PROFILE
+
+def derive_time_matrix(time_matrix: np.ndarray, distance_matrix: np.ndarray, profile: str) -> np.ndarray:
+    """
+    Derive a class-specific travel time matrix from the base matrix
+
+    Args:
+        time_matrix: Base travel time matrix (seconds)
+        distance_matrix: Distance matrix (meters) used for the distance bands
+        profile: Profile name from VEHICLE_PROFILES
+
+    Returns:
+        numpy.ndarray: Travel time matrix for the vehicle class (seconds)
+    """
+    settings = VEHICLE_PROFILES[profile]
+    factors = np.full(time_matrix.shape, settings["speed_factor"], dtype=np.float64)
+
+    bands = settings["distance_bands"]
+    if bands:
+        limits = [limit for limit, _ in bands if limit is not None]
+        band_factors = np.array([factor for _, factor in bands], dtype=np.float64)
+        band_idx = np.searchsorted(np.array(limits), distance_matrix, side="left")
+        factors *= band_factors[np.minimum(band_idx, len(band_factors) - 1)]
+
+    derived = np.rint(time_matrix * factors).astype(np.int64)
+    # Keep unreachable markers from the base matrix unchanged
+    return np.where(time_matrix >= 999999, time_matrix, derived)
+
+def build_profile_time_matrices(
+    time_matrix: np.ndarray,
+    distance_matrix: np.ndarray,
+    vehicle_types: List[Optional[str]],
+    correction: Optional[Callable[[np.ndarray, Optional[str]], np.ndarray]] = None
+) -> Tuple[List[np.ndarray], List[int]]:
+    """
+    Build one time matrix per vehicle class present in the fleet
+
+    Args:
+        time_matrix: Base travel time matrix (seconds)
+        distance_matrix: Distance matrix (meters)
+        vehicle_types: Vehicle.type value for each vehicle
+        correction: Optional post-processor applied to each derived matrix
+
+    Returns:
+        tuple: List of time matrices and, for each vehicle, the index of its matrix
+    """
+    profiles: List[str] = []
+    vehicle_matrix_idx: List[int] = []
+    for vehicle_type in vehicle_types:
+        profile = resolve_profile(vehicle_type)
+        if profile not in profiles:
+            profiles.append(profile)
+        vehicle_matrix_idx.append(profiles.index(profile))
+
+    matrices = [derive_time_matrix(time_matrix, distance_matrix, profile) for profile in profiles]
+    if correction is not None:
+        matrices = [correction(matrix, profile) for matrix, profile in zip(matrices, profiles)]
+    logger.info(f"Derived time matrices for vehicle profiles: {', '.join(profiles)}")
+    return matrices, vehicle_matrix_idx
@@ -1,9 +1,22 @@
 from ortools.constraint_solver import routing_enums_pb2
 from ortools.constraint_solver import pywrapcp
-from typing import List, Dict, Any, Tuple, Optional
+from typing import List, Dict, Any, Tuple, Optional, Callable
+from datetime import datetime
+import asyncio
 import numpy as np
 import logging
-from .distance_matrix import batch_distance_matrix, extract_distance_duration
+from ..config import settings
+from .distance_matrix import (
+    batch_distance_matrix,
+    batch_distance_matrix_compact,
+    batch_distance_matrix_compact_async,
+    extract_distance_duration
+)
+from .compact_matrix import CompactMatrix
+from .stop_aggregation import prepare_problem, expand_solution
+from .location_keys import matrix_locations
+from .vehicle_profiles import build_profile_time_matrices
+from .travel_time_correction import correct_time_matrix, load_correction_model
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -92,6 +105,20 @@ class VRPSolver:
         
         return time_matrix
     
+    def matrices_from_compact(self, matrix: CompactMatrix, traffic: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Extract distance and time matrices from a full compact distance matrix
+        
+        Args:
+            matrix: Distance matrix between all locations
+            traffic: Use durations in traffic for the time matrix
+            
+        Returns:
+            tuple: Distance matrix (meters) and time matrix (seconds), with
+            a large value for invalid routes
+        """
+        return matrix.arrays(traffic=traffic)
+    
     def solve(
         self,
         distance_matrix: np.ndarray,
@@ -101,7 +128,10 @@ class VRPSolver:
         demands: Optional[List[int]] = None,
         time_matrix: Optional[np.ndarray] = None,
         time_windows: Optional[List[Tuple[int, int]]] = None,
-        max_time_per_vehicle: Optional[List[int]] = None
+        max_time_per_vehicle: Optional[List[int]] = None,
+        service_times: Optional[List[int]] = None,
+        vehicle_types: Optional[List[str]] = None,
+        time_correction: Optional[Callable[[np.ndarray, Optional[str]], np.ndarray]] = None
     ) -> Dict[str, Any]:
         """
         Solve the Vehicle Routing Problem
@@ -115,6 +145,11 @@ class VRPSolver:
             time_matrix: Matrix of travel times between locations
             time_windows: List of time windows for each location (start, end)
             max_time_per_vehicle: Maximum time per vehicle
+            service_times: Service time spent at each location (seconds)
+            vehicle_types: Vehicle.type of each vehicle, used to derive
+                per-class travel times from the base time matrix
+            time_correction: Optional post-processor applied to each time
+                matrix, called with the matrix and its vehicle profile
             
         Returns:
             dict: Solution with routes and metrics
@@ -136,11 +171,28 @@ class VRPSolver:
         if time_matrix is not None:
             self.data['time_matrix'] = time_matrix.tolist()
             
+            # One time matrix per vehicle class, all derived from the base matrix
+            if vehicle_types:
+                matrices, vehicle_matrix_idx = build_profile_time_matrices(
+                    time_matrix, distance_matrix, vehicle_types, correction=time_correction
+                )
+                self.data['time_matrices'] = [matrix.tolist() for matrix in matrices]
+                self.data['vehicle_time_matrix'] = vehicle_matrix_idx
+            elif time_correction is not None:
+                self.data['time_matrices'] = [time_correction(time_matrix, None).tolist()]
+                self.data['vehicle_time_matrix'] = [0] * num_vehicles
+            else:
+                self.data['time_matrices'] = [self.data['time_matrix']]
+                self.data['vehicle_time_matrix'] = [0] * num_vehicles
+            
         if time_windows:
             self.data['time_windows'] = time_windows
             
         if max_time_per_vehicle:
             self.data['max_time_per_vehicle'] = max_time_per_vehicle
+            
+        if service_times:
+            self.data['service_times'] = service_times
         
         # Create the routing index manager
         self.manager = pywrapcp.RoutingIndexManager(
@@ -181,15 +233,22 @@ class VRPSolver:
         
         # Add time window constraints if provided
         if 'time_matrix' in self.data and 'time_windows' in self.data:
-            def time_callback(from_index, to_index):
-                from_node = self.manager.IndexToNode(from_index)
-                to_node = self.manager.IndexToNode(to_index)
-                return self.data['time_matrix'][from_node][to_node]
+            def make_time_callback(matrix):
+                def time_callback(from_index, to_index):
+                    from_node = self.manager.IndexToNode(from_index)
+                    to_node = self.manager.IndexToNode(to_index)
+                    service_time = self.data['service_times'][from_node] if 'service_times' in self.data else 0
+                    return matrix[from_node][to_node] + service_time
+                return time_callback
             
-            time_callback_index = self.routing.RegisterTransitCallback(time_callback)
+            # Register one transit evaluator per vehicle class
+            time_callback_indices = [
+                self.routing.RegisterTransitCallback(make_time_callback(matrix))
+                for matrix in self.data['time_matrices']
+            ]
             
-            self.routing.AddDimension(
-                time_callback_index,
+            self.routing.AddDimensionWithVehicleTransits(
+                [time_callback_indices[idx] for idx in self.data['vehicle_time_matrix']],
                 30,  # allow waiting time
                 86400,  # maximum time per vehicle (24 hours in seconds)
                 False,  # don't force start cumul to zero
@@ -273,6 +332,8 @@ class VRPSolver:
             route_distance = 0
             route_load = 0
             route_time = 0
+            if 'time_matrix' in self.data:
+                vehicle_time_matrix = self.data['time_matrices'][self.data['vehicle_time_matrix'][vehicle_id]]
             
             while not self.routing.IsEnd(index):
                 node_index = self.manager.IndexToNode(index)
@@ -300,7 +361,7 @@ class VRPSolver:
                 
                 # Add time
                 if 'time_matrix' in self.data:
-                    route_time += self.data['time_matrix'][node_index][self.manager.IndexToNode(index)]
+                    route_time += vehicle_time_matrix[node_index][self.manager.IndexToNode(index)]
             
             # Add depot at the end
             node_index = self.manager.IndexToNode(index)
@@ -333,7 +394,12 @@ def solve_vrp(
     vehicle_capacities: Optional[List[int]] = None,
     demands: Optional[List[int]] = None,
     time_windows: Optional[List[Tuple[int, int]]] = None,
-    max_time_per_vehicle: Optional[List[int]] = None
+    max_time_per_vehicle: Optional[List[int]] = None,
+    service_times: Optional[List[int]] = None,
+    coordinates: Optional[List[Optional[Tuple[float, float]]]] = None,
+    aggregate_colocated: bool = True,
+    vehicle_types: Optional[List[str]] = None,
+    departure_time: Optional[datetime] = None
 ) -> Dict[str, Any]:
     """
     Solve a Vehicle Routing Problem
@@ -346,25 +412,133 @@ def solve_vrp(
         demands: List of demands for each location
         time_windows: List of time windows for each location (start, end)
         max_time_per_vehicle: Maximum time per vehicle
+        service_times: Service time spent at each location (seconds)
+        coordinates: Optional (lat, lng) for each location
+        aggregate_colocated: Merge stops at the same address or coordinate
+            into a single node before solving
+        vehicle_types: Vehicle.type of each vehicle for per-class travel times
+        departure_time: Planned departure, used to apply the learned travel
+            time correction when a fitted model is available
         
     Returns:
         dict: Solution with routes and metrics
     """
+    problem = prepare_problem(
+        locations,
+        depot_index=depot_index,
+        demands=demands,
+        time_windows=time_windows,
+        service_times=service_times,
+        coordinates=coordinates,
+        vehicle_capacities=vehicle_capacities,
+        aggregate_colocated=aggregate_colocated
+    )
+    
+    # Create distance and time matrices from a single batched fetch, using
+    # coordinates instead of addresses where they are known
+    matrix = batch_distance_matrix_compact(matrix_locations(problem["locations"], problem["coordinates"]))
+    
+    return _solve_prepared(
+        problem,
+        matrix,
+        num_vehicles=num_vehicles,
+        vehicle_capacities=vehicle_capacities,
+        max_time_per_vehicle=max_time_per_vehicle,
+        vehicle_types=vehicle_types,
+        departure_time=departure_time
+    )
+
+async def solve_vrp_async(
+    locations: List[str],
+    num_vehicles: int = 1,
+    depot_index: int = 0,
+    vehicle_capacities: Optional[List[int]] = None,
+    demands: Optional[List[int]] = None,
+    time_windows: Optional[List[Tuple[int, int]]] = None,
+    max_time_per_vehicle: Optional[List[int]] = None,
+    service_times: Optional[List[int]] = None,
+    coordinates: Optional[List[Optional[Tuple[float, float]]]] = None,
+    aggregate_colocated: bool = True,
+    vehicle_types: Optional[List[str]] = None,
+    departure_time: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """
+    Non-blocking variant of solve_vrp
+    
+    Matrix tiles are fetched concurrently through the async maps client and
+    the CPU-bound search runs in a worker thread, so the event loop stays free.
+    Takes the same arguments as solve_vrp.
+    """
+    problem = prepare_problem(
+        locations,
+        depot_index=depot_index,
+        demands=demands,
+        time_windows=time_windows,
+        service_times=service_times,
+        coordinates=coordinates,
+        vehicle_capacities=vehicle_capacities,
+        aggregate_colocated=aggregate_colocated
+    )
+    
+    matrix = await batch_distance_matrix_compact_async(matrix_locations(problem["locations"], problem["coordinates"]))
+    
+    return await asyncio.to_thread(
+        _solve_prepared,
+        problem,
+        matrix,
+        num_vehicles=num_vehicles,
+        vehicle_capacities=vehicle_capacities,
+        max_time_per_vehicle=max_time_per_vehicle,
+        vehicle_types=vehicle_types,
+        departure_time=departure_time
+    )
+
+def _solve_prepared(
+    problem: Dict[str, Any],
+    matrix: CompactMatrix,
+    num_vehicles: int = 1,
+    vehicle_capacities: Optional[List[int]] = None,
+    max_time_per_vehicle: Optional[List[int]] = None,
+    vehicle_types: Optional[List[str]] = None,
+    departure_time: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """
+    Build the matrices from a fetched compact matrix, solve and expand the solution
+    """
     solver = VRPSolver()
+    # Recently fetched traffic durations already reflect current conditions;
+    # otherwise scale the free-flow durations with the learned correction
+    live_traffic = matrix.has_live_traffic(settings.TRAVEL_TIME_TRAFFIC_MAX_AGE)
+    distance_matrix, time_matrix = solver.matrices_from_compact(matrix, traffic=live_traffic)
     
-    # Create distance and time matrices
-    distance_matrix = solver.create_distance_matrix(locations)
-    time_matrix = solver.create_time_matrix(locations)
+    correction_model = None if live_traffic else load_correction_model()
+
+    def corrected_times(matrix, profile):
+        return correct_time_matrix(
+            matrix,
+            profile=profile,
+            departure_time=departure_time,
+            coordinates=problem["coordinates"],
+            model=correction_model
+        )
     
     # Solve the VRP
-    return solver.solve(
+    result = solver.solve(
         distance_matrix=distance_matrix,
         num_vehicles=num_vehicles,
-        depot=depot_index,
+        depot=problem["depot_index"],
         vehicle_capacities=vehicle_capacities,
-        demands=demands,
+        demands=problem["demands"],
         time_matrix=time_matrix,
-        time_windows=time_windows,
-        max_time_per_vehicle=max_time_per_vehicle
+        time_windows=problem["time_windows"],
+        max_time_per_vehicle=max_time_per_vehicle,
+        service_times=problem["service_times"],
+        vehicle_types=vehicle_types,
+        time_correction=corrected_times if correction_model else None
     )
- 
\ No newline at end of file
+    
+    # Map super-nodes back to the original stops
+    if problem["groups"] is not None:
+        result = expand_solution(result, problem["groups"])
+    
+    return result
@@ -0,0 +1,61 @@
+from typing import Optional
+import re
+
+_NUMBER_PATTERN = re.compile(r"[-+]?\d+(?:[.,]\d+)?")
+
+def parse_quantity(value: Optional[str]) -> Optional[float]:
+    """
+    Parse the leading number out of a free-text quantity such as "500 kg"
+
+    Args:
+        value: Stored string value
+
+    Returns:
+        float: Parsed number or None if the value holds no number
+    """
+    if value is None:
+        return None
+    match = _NUMBER_PATTERN.search(str(value))
+    if not match:
+        return None
+    return float(match.group(0).replace(",", "."))
+
+def parse_time_of_day(value: Optional[str]) -> Optional[int]:
+    """
+    Parse a time of day such as "09:30" or "9:30:15" into seconds from midnight
+
+    Args:
+        value: Stored string value
+
+    Returns:
+        int: Seconds from midnight or None if the value cannot be parsed
+    """
+    if not value:
+        return None
+    parts = str(value).strip().split(":")
+    try:
+        hours = int(parts[0])
+        minutes = int(parts[1]) if len(parts) > 1 else 0
+        seconds = int(parts[2]) if len(parts) > 2 else 0
+    except ValueError:
+        return None
+    return hours * 3600 + minutes * 60 + seconds
+
+def parse_duration(value: Optional[str]) -> Optional[int]:
+    """
+    Parse a service duration into seconds
+
+    Plain numbers are interpreted as minutes; "HH:MM" values are accepted too.
+
+    Args:
+        value: Stored string value
+
+    Returns:
+        int: Duration in seconds or None if the value cannot be parsed
+    """
+    if not value:
+        return None
+    if ":" in str(value):
+        return parse_time_of_day(value)
+    minutes = parse_quantity(value)
+    return int(minutes * 60) if minutes is not None else None
@@ -0,0 +1,31 @@
+"""
+Script to fit the travel time correction model from route history
+
+Run periodically (e.g. nightly) so planning picks up the latest
+planned vs actual durations.
+"""
+
+import logging
+from app.database import SessionLocal
+from app.config import settings
+from app.services.travel_time_correction import fit_correction_model, save_correction_model
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def main():
+    """Main function"""
+    logger.info("Fitting travel time correction model...")
+
+    db = SessionLocal()
+    try:
+        model = fit_correction_model(db)
+    finally:
+        db.close()
+
+    save_correction_model(model)
+    logger.info(f"✓ Saved {len(model['factors'])} correction factors to {settings.TRAVEL_TIME_CORRECTION_PATH}")
+
+if __name__ == "__main__":
+    main()
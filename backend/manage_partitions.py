@@ -0,0 +1,200 @@
+"""
+Script to manage monthly range partitions of route_history and the
+analytics tables and their date indexes
+
+    python manage_partitions.py convert          # one-time: partition the existing tables
+    python manage_partitions.py ensure           # create indexes and upcoming monthly partitions
+    python manage_partitions.py detach 2022-01   # detach partitions of months before January 2022
+    python manage_partitions.py                  # ensure, e.g. from a monthly cron job
+"""
+
+import sys
+import logging
+from datetime import date, datetime, timedelta
+from sqlalchemy import text
+from app.config import settings
+from app.database import engine, Base
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Partitioned tables and their partition column
+PARTITIONED_TABLES = {
+    "route_history": "date_created",
+    "route_analytics": "date",
+    "driver_performance": "date",
+    "vehicle_usage": "date",
+}
+
+# Indexes created on the partitioned tables, propagated to every partition
+INDEXES = {
+    "route_history": [
+        ("ix_route_history_id", "id"),
+        ("ix_route_history_date_created", "date_created"),
+        ("ix_route_history_driver_date", "driver_id, date_created"),
+        ("ix_route_history_vehicle_date", "vehicle_id, date_created"),
+        ("ix_route_history_depot_date", "depot_id, date_created"),
+    ],
+    "route_analytics": [
+        ("ix_route_analytics_id", "id"),
+        ("ix_route_analytics_date", "date"),
+        ("ix_route_analytics_route_history_id", "route_history_id"),
+    ],
+    "driver_performance": [
+        ("ix_driver_performance_id", "id"),
+        ("ix_driver_performance_date", "date"),
+        ("ix_driver_performance_driver_date", "driver_id, date"),
+    ],
+    "vehicle_usage": [
+        ("ix_vehicle_usage_id", "id"),
+        ("ix_vehicle_usage_date", "date"),
+        ("ix_vehicle_usage_vehicle_date", "vehicle_id, date"),
+    ],
+}
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+def next_month(day: date) -> date:
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_{month:%Y_%m}"
+
+def is_partitioned(conn, table: str) -> bool:
+    return conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = :table"
+    ), {"table": table}).first() is not None
+
+def create_partition(conn, table: str, column: str, month: date) -> bool:
+    """Create the partition of one month, moving its rows out of the default partition"""
+    name = partition_name(table, month)
+    exists = conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar()
+    if exists is not None:
+        return False
+    start, end = month.isoformat(), next_month(month).isoformat()
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    # Rows of this month may have landed in the default partition
+    conn.execute(text(
+        f"WITH moved AS (DELETE FROM {table}_default WHERE {column} >= :start AND {column} < :end RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ), {"start": start, "end": end})
+    conn.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}')"))
+    return True
+
+def create_indexes(conn, table: str):
+    """Create the date indexes of a table if they do not exist yet"""
+    for name, columns in INDEXES[table]:
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+
+def convert_table(conn, table: str, column: str):
+    """Replace a plain table by a partitioned copy with monthly partitions"""
+    if is_partitioned(conn, table):
+        logger.info(f"✓ {table} is already partitioned")
+        return
+
+    old = f"{table}_unpartitioned"
+    # Unique constraints on a partitioned table must include the partition
+    # column, so nothing can reference route_history.id any more
+    if table == "route_history":
+        for (constraint, referencing) in conn.execute(text(
+            "SELECT conname, conrelid::regclass::text FROM pg_constraint "
+            "WHERE contype = 'f' AND confrelid = 'route_history'::regclass"
+        )).all():
+            conn.execute(text(f'ALTER TABLE {referencing} DROP CONSTRAINT "{constraint}"'))
+
+    conn.execute(text(f"ALTER TABLE {table} RENAME TO {old}"))
+    conn.execute(text(
+        f"CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) PARTITION BY RANGE ({column})"
+    ))
+    conn.execute(text(f"ALTER TABLE {table} ADD PRIMARY KEY (id, {column})"))
+    conn.execute(text(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT"))
+
+    first, last = conn.execute(text(f"SELECT min({column}), max({column}) FROM {old}")).one()
+    month = month_start(first.date() if first else date.today())
+    last_month = month_start(date.today())
+    if last is not None and last.date() > last_month:
+        last_month = month_start(last.date())
+    for _ in range(settings.PARTITION_MONTHS_AHEAD):
+        last_month = next_month(last_month)
+    while month <= last_month:
+        create_partition(conn, table, column, month)
+        month = next_month(month)
+
+    # The partition column is part of the primary key, so it cannot be null
+    conn.execute(text(f"UPDATE {old} SET {column} = now() WHERE {column} IS NULL"))
+    copied = conn.execute(text(f"INSERT INTO {table} SELECT * FROM {old}")).rowcount
+    # Keep the ID sequence when the old table is dropped
+    sequence = conn.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": old}).scalar()
+    if sequence:
+        conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id"))
+    conn.execute(text(f"DROP TABLE {old}"))
+    create_indexes(conn, table)
+    logger.info(f"✓ Partitioned {table} by month, copied {copied} rows")
+
+def convert():
+    """Partition every table, creating missing tables first"""
+    Base.metadata.create_all(bind=engine)
+    for table, column in PARTITIONED_TABLES.items():
+        with engine.begin() as conn:
+            convert_table(conn, table, column)
+
+def ensure():
+    """Create the indexes and the partitions of the current and upcoming months"""
+    for table, column in PARTITIONED_TABLES.items():
+        with engine.begin() as conn:
+            create_indexes(conn, table)
+            if not is_partitioned(conn, table):
+                logger.info(f"{table} is not partitioned, run 'convert' first")
+                continue
+            month = month_start(date.today())
+            created = 0
+            for _ in range(settings.PARTITION_MONTHS_AHEAD + 1):
+                created += create_partition(conn, table, column, month)
+                month = next_month(month)
+        logger.info(f"✓ {table}: indexes present, {created} partitions created")
+
+def detach(before: date):
+    """Detach the partitions of months before a date, keeping them as plain tables"""
+    for table in PARTITIONED_TABLES:
+        with engine.begin() as conn:
+            partitions = conn.execute(text(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = CAST(:table AS regclass)"
+            ), {"table": table}).scalars().all()
+            for name in sorted(partitions):
+                suffix = name[len(table) + 1:]
+                try:
+                    month = datetime.strptime(suffix, "%Y_%m").date()
+                except ValueError:
+                    continue  # default partition
+                if month < month_start(before):
+                    conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+                    logger.info(f"✓ Detached {name}")
+
+def main():
+    """Main function"""
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    logger.info(f"Starting partition maintenance{f' ({command})' if command else ''}...")
+
+    try:
+        if command == "convert":
+            convert()
+        elif command == "ensure":
+            ensure()
+        elif command == "detach" and len(sys.argv) > 2:
+            detach(datetime.strptime(sys.argv[2], "%Y-%m").date())
+        elif command is None:
+            ensure()
+        else:
+            logger.error(__doc__)
+            sys.exit(1)
+    except Exception as e:
+        logger.error(f"✗ Partition maintenance failed: {str(e)}")
+        raise
+
+    logger.info("Partition maintenance completed.")
+
+if __name__ == "__main__":
+    main()
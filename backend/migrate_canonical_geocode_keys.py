@@ -0,0 +1,54 @@
+"""
+Script to re-key stored geocodes from normalized to canonical addresses,
+so existing rows keep serving lookups after the switch to canonical keys
+"""
+
+import logging
+from app.database import SessionLocal
+from app.models import GeocodeCacheEntry
+from app.services.location_keys import canonical_address
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def rekey():
+    """Rename address keys to their canonical form, dropping duplicates"""
+    db = SessionLocal()
+    try:
+        entries = db.query(GeocodeCacheEntry).filter(~GeocodeCacheEntry.cache_key.like("place:%")).all()
+        existing = {entry.cache_key for entry in entries}
+        renamed = 0
+        removed = 0
+        for entry in entries:
+            key = canonical_address(entry.cache_key)
+            if key == entry.cache_key:
+                continue
+            existing.discard(entry.cache_key)
+            if key in existing:
+                # Another spelling already holds the canonical key
+                db.delete(entry)
+                removed += 1
+                continue
+            entry.cache_key = key
+            existing.add(key)
+            renamed += 1
+        db.commit()
+        logger.info(f"✓ Re-keyed {renamed} geocodes, removed {removed} duplicates")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"✗ Re-keying failed: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+def main():
+    """Main function"""
+    logger.info("Starting canonical geocode key migration...")
+
+    rekey()
+
+    logger.info("Migration process completed.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Script to add the stored geocode columns to orders and depots and geocode
+existing rows that have none yet
+"""
+
+import logging
+from sqlalchemy import text
+from app.database import engine, Base, SessionLocal
+from app.models import Order, Depot
+from app.services.geocoding_queue import process_batch, BATCH_SIZE
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+NEW_COLUMNS = [
+    "ALTER TABLE orders ADD COLUMN IF NOT EXISTS lat DOUBLE PRECISION",
+    "ALTER TABLE orders ADD COLUMN IF NOT EXISTS lng DOUBLE PRECISION",
+    "ALTER TABLE orders ADD COLUMN IF NOT EXISTS formatted_address VARCHAR(255)",
+    "ALTER TABLE orders ADD COLUMN IF NOT EXISTS place_id VARCHAR(255)",
+    "ALTER TABLE depots ADD COLUMN IF NOT EXISTS lat DOUBLE PRECISION",
+    "ALTER TABLE depots ADD COLUMN IF NOT EXISTS lng DOUBLE PRECISION",
+    "ALTER TABLE depots ADD COLUMN IF NOT EXISTS formatted_address VARCHAR(255)",
+    "ALTER TABLE depots ADD COLUMN IF NOT EXISTS place_id VARCHAR(255)",
+]
+
+def add_columns():
+    """Add the geocode columns and the geocode_cache table if missing"""
+    with engine.begin() as conn:
+        for statement in NEW_COLUMNS:
+            conn.execute(text(statement))
+    Base.metadata.create_all(bind=engine)
+    logger.info("✓ Geocode columns present")
+
+def backfill(entity, model):
+    """Geocode every row of a table that has no stored coordinates"""
+    db = SessionLocal()
+    try:
+        rows = db.query(model.id, model.address).filter(model.lat.is_(None)).order_by(model.id).all()
+    finally:
+        db.close()
+
+    total = 0
+    for i in range(0, len(rows), BATCH_SIZE):
+        total += process_batch([(entity, row.id, row.address) for row in rows[i:i + BATCH_SIZE]])
+    logger.info(f"✓ Geocoded {total} of {len(rows)} {entity} rows")
+
+def main():
+    """Main function"""
+    logger.info("Starting geocode column migration...")
+
+    add_columns()
+    backfill("depot", Depot)
+    backfill("order", Order)
+
+    logger.info("Migration process completed.")
+
+if __name__ == "__main__":
+    main()
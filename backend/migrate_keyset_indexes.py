@@ -0,0 +1,33 @@
+"""
+Script to add the (created_at, id) indexes used by keyset pagination of
+the order, vehicle, driver and depot lists to existing tables
+"""
+
+import logging
+from sqlalchemy import text
+from app.database import engine
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+TABLES = ["orders", "vehicles", "drivers", "depots"]
+
+def main():
+    """Main function"""
+    logger.info("Starting keyset index migration...")
+
+    for table in TABLES:
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS ix_{table}_created_at_id ON {table} (created_at, id)"
+                ))
+            logger.info(f"✓ Index ix_{table}_created_at_id present")
+        except Exception as e:
+            logger.error(f"✗ Error indexing {table}: {str(e)}")
+
+    logger.info("Migration process completed.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Script to move route_data out of route_history into the compact
+route_details table, including data archived in route_data_archive, and
+drop the inline column
+"""
+
+import json
+import zlib
+import logging
+from sqlalchemy import text
+from app.database import engine, Base
+from app.services.route_details import pack_route_data
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+UPSERT = text(
+    "INSERT INTO route_details (route_history_id, date_created, polyline, data) "
+    "VALUES (:route_history_id, :date_created, :polyline, :data) "
+    "ON CONFLICT (route_history_id) DO UPDATE SET "
+    "date_created = EXCLUDED.date_created, polyline = EXCLUDED.polyline, data = EXCLUDED.data"
+)
+
+def has_column(conn, table, column):
+    return conn.execute(text(
+        "SELECT 1 FROM information_schema.columns WHERE table_name = :table AND column_name = :column"
+    ), {"table": table, "column": column}).first() is not None
+
+def move_inline(conn):
+    """Pack the route_data column of every route into route_details"""
+    if not has_column(conn, "route_history", "route_data"):
+        logger.info("✓ route_history has no route_data column")
+        return
+    last_id = 0
+    total = 0
+    while True:
+        rows = conn.execute(text(
+            "SELECT id, date_created, route_data FROM route_history "
+            "WHERE route_data IS NOT NULL AND id > :last_id ORDER BY id LIMIT :limit"
+        ), {"last_id": last_id, "limit": BATCH_SIZE}).all()
+        if not rows:
+            break
+        conn.execute(UPSERT, [_detail(row.id, row.date_created, row.route_data) for row in rows])
+        last_id = rows[-1].id
+        total += len(rows)
+    conn.execute(text("ALTER TABLE route_history DROP COLUMN route_data"))
+    logger.info(f"✓ Moved route data of {total} routes")
+
+def move_archived(conn):
+    """Repack the zlib-compressed JSON of route_data_archive into route_details"""
+    if conn.execute(text("SELECT to_regclass('route_data_archive')")).scalar() is None:
+        return
+    rows = conn.execute(text("SELECT route_history_id, date_created, data FROM route_data_archive")).all()
+    if rows:
+        conn.execute(UPSERT, [
+            _detail(row.route_history_id, row.date_created, json.loads(zlib.decompress(row.data).decode("utf-8")))
+            for row in rows
+        ])
+    conn.execute(text("DROP TABLE route_data_archive"))
+    logger.info(f"✓ Moved archived route data of {len(rows)} routes")
+
+def _detail(route_id, date_created, route_data):
+    if isinstance(route_data, str):
+        route_data = json.loads(route_data)
+    polyline, data = pack_route_data(route_data)
+    return {"route_history_id": route_id, "date_created": date_created, "polyline": polyline, "data": data}
+
+def main():
+    """Main function"""
+    logger.info("Starting route details migration...")
+
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        move_archived(conn)
+        move_inline(conn)
+
+    logger.info("Migration process completed.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Script to add the typed order and vehicle columns and backfill them from
+the existing string columns
+"""
+
+import logging
+from sqlalchemy import text
+from app.database import engine
+from app.utils.parsing import parse_quantity, parse_time_of_day, parse_duration
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 5000
+
+NEW_COLUMNS = [
+    "ALTER TABLE orders ADD COLUMN IF NOT EXISTS start_seconds INTEGER",
+    "ALTER TABLE orders ADD COLUMN IF NOT EXISTS end_seconds INTEGER",
+    "ALTER TABLE orders ADD COLUMN IF NOT EXISTS duration_seconds INTEGER",
+    "ALTER TABLE orders ADD COLUMN IF NOT EXISTS load_value DOUBLE PRECISION",
+    "ALTER TABLE orders ADD COLUMN IF NOT EXISTS lat DOUBLE PRECISION",
+    "ALTER TABLE orders ADD COLUMN IF NOT EXISTS lng DOUBLE PRECISION",
+    "ALTER TABLE vehicles ADD COLUMN IF NOT EXISTS capacity_value DOUBLE PRECISION",
+]
+
+def add_columns(conn):
+    """Add the typed columns if they do not exist yet"""
+    for statement in NEW_COLUMNS:
+        conn.execute(text(statement))
+    logger.info("✓ Typed columns present")
+
+def backfill_orders(conn):
+    """Parse the string columns of every order into the typed columns"""
+    update = text(
+        "UPDATE orders SET start_seconds = :start_seconds, end_seconds = :end_seconds, "
+        "duration_seconds = :duration_seconds, load_value = :load_value WHERE id = :id"
+    )
+    last_id = 0
+    total = 0
+    while True:
+        rows = conn.execute(
+            text("SELECT id, start_time, end_time, duration, load FROM orders WHERE id > :last_id ORDER BY id LIMIT :limit"),
+            {"last_id": last_id, "limit": BATCH_SIZE}
+        ).all()
+        if not rows:
+            break
+        conn.execute(update, [
+            {
+                "id": row.id,
+                "start_seconds": parse_time_of_day(row.start_time),
+                "end_seconds": parse_time_of_day(row.end_time),
+                "duration_seconds": parse_duration(row.duration),
+                "load_value": parse_quantity(row.load)
+            }
+            for row in rows
+        ])
+        last_id = rows[-1].id
+        total += len(rows)
+    logger.info(f"✓ Backfilled {total} orders")
+
+def backfill_vehicles(conn):
+    """Parse the capacity string of every vehicle into capacity_value"""
+    rows = conn.execute(text("SELECT id, capacity FROM vehicles")).all()
+    if rows:
+        conn.execute(
+            text("UPDATE vehicles SET capacity_value = :capacity_value WHERE id = :id"),
+            [{"id": row.id, "capacity_value": parse_quantity(row.capacity)} for row in rows]
+        )
+    logger.info(f"✓ Backfilled {len(rows)} vehicles")
+
+def main():
+    """Main function"""
+    logger.info("Starting typed column migration...")
+
+    with engine.begin() as conn:
+        add_columns(conn)
+        backfill_orders(conn)
+        backfill_vehicles(conn)
+
+    logger.info("Migration process completed.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Script to rebuild the daily analytics rollups from route history, route
+analytics, driver performance and vehicle usage, e.g. after the rollup
+tables were created or history was loaded outside the API
+
+Usage:
+    python rebuild_analytics_rollups.py [YYYY-MM-DD]   rebuild every day, or since a day
+    python rebuild_analytics_rollups.py --pending      rebuild the days changed since the
+                                                       last run, e.g. from cron
+"""
+
+import sys
+import logging
+from datetime import date
+from app.database import SessionLocal, engine, Base
+from app.services.analytics_rollup import rebuild_rollups, refresh_rollups
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def main():
+    """Main function"""
+    if sys.argv[1:] == ["--pending"]:
+        refresh_pending()
+        return
+
+    since = date.fromisoformat(sys.argv[1]) if len(sys.argv) > 1 else None
+    logger.info(f"Rebuilding analytics rollups{f' since {since}' if since else ''}...")
+
+    # Create the rollup tables if they do not exist yet
+    Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    try:
+        days = rebuild_rollups(db, since)
+        logger.info(f"✓ Rebuilt analytics rollups for {days} days")
+    except Exception as e:
+        logger.error(f"✗ Rebuilding analytics rollups failed: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+def refresh_pending():
+    """Rebuild the rollups of the days changed since the last rebuild"""
+    db = SessionLocal()
+    try:
+        days = refresh_rollups(db)
+        logger.info(f"✓ Rebuilt analytics rollups for {days} changed days")
+    except Exception as e:
+        logger.error(f"✗ Refreshing analytics rollups failed: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
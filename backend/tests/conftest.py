@@ -0,0 +1,36 @@
+"""
+Shared test setup: the app runs against a throwaway SQLite database
+
+The environment is set before any app module is imported, since the
+settings, engines and caches are created at import time.
+"""
+import os
+import tempfile
+
+_db_dir = tempfile.mkdtemp(prefix="logistics-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ["ASYNC_DATABASE_URL"] = ""
+os.environ["POSTGRES_HOST"] = "localhost"
+os.environ["CACHE_BACKEND"] = "memory"
+os.environ["GOOGLE_MAPS_API_KEY"] = ""
+
+import pytest
+from sqlalchemy import event
+
+from app.database import Base, SessionLocal, engine
+from app import models  # noqa: F401  registers every table
+
+@event.listens_for(engine, "connect")
+def _enforce_foreign_keys(dbapi_connection, connection_record):
+    dbapi_connection.execute("PRAGMA foreign_keys=ON")
+
+@pytest.fixture
+def db():
+    """Session on freshly created, empty tables"""
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
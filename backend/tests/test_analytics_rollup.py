@@ -0,0 +1,56 @@
+import asyncio
+from datetime import date, datetime, time, timedelta, timezone
+from app.database import AsyncSessionLocal
+from app.models import DriverPerformance, Driver, RollupPendingDay, RouteHistory
+from app.services import analytics
+from app.services.analytics_rollup import _day_of, refresh_rollups, track_analytics_changes
+
+def _run(query, *args):
+    async def run():
+        async with AsyncSessionLocal() as session:
+            return await query(session, *args)
+    return asyncio.run(run())
+
+def test_rollup_days_only_accepts_whole_inclusive_days():
+    end = datetime.combine(date(2026, 1, 6), time.max)
+    assert analytics.rollup_days(datetime(2026, 1, 1), end) == (date(2026, 1, 1), date(2026, 1, 6))
+    # Midnight is inclusive in the source queries, so it is not a day boundary
+    assert analytics.rollup_days(datetime(2026, 1, 1), datetime(2026, 1, 6)) is None
+    assert analytics.rollup_days(datetime(2026, 1, 1, 8), end) is None
+    assert analytics.rollup_days(datetime(2026, 1, 7), end) is None
+
+def test_rollup_days_are_utc_days():
+    plus_two = timezone(timedelta(hours=2))
+    start = datetime(2026, 1, 2, 2, 0, tzinfo=plus_two)
+    end = datetime(2026, 1, 7, 1, 59, 59, 999999, tzinfo=plus_two)
+    assert analytics.rollup_days(start, end) == (date(2026, 1, 2), date(2026, 1, 6))
+
+def test_day_of_converts_to_utc():
+    assert _day_of(datetime(2026, 1, 5, 23, 30, tzinfo=timezone(timedelta(hours=-5)))) == date(2026, 1, 6)
+    assert _day_of(datetime(2026, 1, 5, 23, 30)) == date(2026, 1, 5)
+    assert _day_of("2026-01-05") == date(2026, 1, 5)
+
+def test_rollups_match_the_source_tables(db):
+    track_analytics_changes()
+    driver = Driver(name="Ann", email="ann@example.com")
+    db.add(driver)
+    db.flush()
+    for day, distance in [(3, 10.0), (3, 5.0), (5, 7.5)]:
+        db.add(RouteHistory(name="r", date_created=datetime(2026, 1, day, 12), total_distance=distance, total_orders=2, driver_id=driver.id))
+        db.add(DriverPerformance(driver_id=driver.id, date=datetime(2026, 1, day, 12), on_time_delivery_rate=80 + day, routes_completed=1, total_distance=distance))
+    db.commit()
+    assert sorted(day for (day,) in db.query(RollupPendingDay.day).distinct()) == [date(2026, 1, 3), date(2026, 1, 5)]
+
+    start, end = datetime(2026, 1, 1), datetime.combine(date(2026, 1, 9), time.max)
+    # Changed days are read from the source tables until they are rebuilt
+    assert _run(analytics._rollup_range, start, end) is None
+    source_totals = _run(analytics.route_totals, start, end)
+    source_drivers = _run(analytics.top_drivers, start, end)
+
+    assert refresh_rollups(db) == 2
+    assert db.query(RollupPendingDay).count() == 0
+    assert _run(analytics._rollup_range, start, end) == (date(2026, 1, 1), date(2026, 1, 9))
+    assert _run(analytics.route_totals, start, end) == source_totals
+    assert _run(analytics.top_drivers, start, end) == source_drivers
+    assert source_totals["total_routes"] == 3
+    assert source_totals["total_distance"] == 22.5
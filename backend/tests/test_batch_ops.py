@@ -0,0 +1,92 @@
+import pytest
+from app.models import Depot, RouteHistory, Vehicle
+from app.schemas import DepotBatch, VehicleBatch
+from app.services import batch_ops
+from app.services.batch_ops import apply_batch
+
+@pytest.fixture
+def queued(monkeypatch):
+    """Addresses queued for geocoding, instead of starting the worker"""
+    calls = []
+    monkeypatch.setattr(batch_ops, "enqueue_geocode", lambda entity, entity_id, address: calls.append((entity, entity_id, address)))
+    monkeypatch.setattr(batch_ops, "index_address", lambda address: None)
+    monkeypatch.setattr(batch_ops, "unindex_address", lambda address: None)
+    return calls
+
+def _vehicles(db, *plates):
+    vehicles = [Vehicle(plate_number=plate, type="van") for plate in plates]
+    db.add_all(vehicles)
+    db.commit()
+    return [vehicle.id for vehicle in vehicles]
+
+def _statuses(result):
+    return [(item["action"], item["index"], item["status"]) for item in result["results"]]
+
+def test_batch_applies_all_items(db):
+    first, second = _vehicles(db, "A-1", "B-2")
+    batch = VehicleBatch(
+        create=[{"plate_number": "C-3", "type": "truck"}],
+        update=[{"id": first, "capacity": "800"}],
+        delete=[second]
+    )
+    result = apply_batch(db, Vehicle, batch, unique_field="plate_number")
+
+    assert result["applied"] == 3 and result["failed"] == 0
+    assert _statuses(result) == [("create", 0, "created"), ("update", 0, "updated"), ("delete", 0, "deleted")]
+    assert sorted(vehicle.plate_number for vehicle in db.query(Vehicle)) == ["A-1", "C-3"]
+    assert db.get(Vehicle, first).capacity == "800"
+
+def test_unknown_duplicate_and_taken_items_are_skipped(db):
+    first, second = _vehicles(db, "A-1", "B-2")
+    batch = VehicleBatch(
+        create=[{"plate_number": "B-2", "type": "van"}, {"plate_number": "D-4", "type": "van"}, {"plate_number": "D-4", "type": "van"}],
+        update=[{"id": 999, "type": "truck"}, {"id": first, "plate_number": "B-2"}, {"id": second, "type": "truck"}],
+        delete=[second, 998]
+    )
+    result = apply_batch(db, Vehicle, batch, unique_field="plate_number")
+
+    assert _statuses(result) == [
+        ("create", 0, "conflict"), ("create", 1, "created"), ("create", 2, "conflict"),
+        ("update", 0, "not_found"), ("update", 1, "conflict"), ("update", 2, "updated"),
+        ("delete", 0, "conflict"), ("delete", 1, "not_found"),
+    ]
+    assert result["applied"] == 2 and result["failed"] == 6
+    assert sorted(vehicle.plate_number for vehicle in db.query(Vehicle)) == ["A-1", "B-2", "D-4"]
+
+def test_only_items_rejected_by_the_database_fail(db):
+    used, unused = _vehicles(db, "A-1", "B-2")
+    db.add(RouteHistory(name="r", vehicle_id=used))
+    db.commit()
+
+    batch = VehicleBatch(
+        create=[{"plate_number": "C-3", "type": "van"}],
+        update=[{"id": unused, "capacity": "500"}],
+        delete=[used]
+    )
+    result = apply_batch(db, Vehicle, batch, unique_field="plate_number")
+
+    # The vehicle still has a route, so its delete fails and the rest apply
+    assert _statuses(result) == [("create", 0, "created"), ("update", 0, "updated"), ("delete", 0, "conflict")]
+    assert result["results"][2]["error"].startswith("Rejected by the database")
+    db.expire_all()
+    assert sorted(vehicle.plate_number for vehicle in db.query(Vehicle)) == ["A-1", "B-2", "C-3"]
+    assert db.get(Vehicle, unused).capacity == "500"
+
+def test_changed_addresses_are_queued_for_geocoding(db, queued):
+    depot = Depot(name="North", address="1 Main St", lat=1.0, lng=2.0)
+    other = Depot(name="South", address="2 Main St", lat=3.0, lng=4.0)
+    db.add_all([depot, other])
+    db.commit()
+
+    batch = DepotBatch(
+        create=[{"name": "East", "address": "3 Main St"}],
+        update=[{"id": depot.id, "address": "5 Side St"}, {"id": other.id, "address": "2 Main St", "capacity": "10"}]
+    )
+    result = apply_batch(db, Depot, batch, geocode_entity="depot")
+
+    assert result["failed"] == 0
+    created = result["results"][0]["id"]
+    assert queued == [("depot", created, "3 Main St"), ("depot", depot.id, "5 Side St")]
+    db.expire_all()
+    assert db.get(Depot, depot.id).lat is None
+    assert db.get(Depot, other.id).lat == 3.0
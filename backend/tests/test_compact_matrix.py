@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+from app.services.cache_backend import deserialize, serialize
+from app.services.compact_matrix import NOT_CALCULATED, CompactMatrix
+from app.services.maps_client import MapsApiError
+
+def _result(rows):
+    return {
+        "status": "OK",
+        "rows": [
+            {"elements": [
+                {"status": "OK", "distance": {"value": d}, "duration": {"value": t}} if d is not None
+                else {"status": "ZERO_RESULTS"}
+                for d, t in row
+            ]}
+            for row in rows
+        ]
+    }
+
+def test_from_result_packs_values_and_keeps_failed_statuses():
+    matrix = CompactMatrix.from_result(["A", "B"], ["C", "D"], _result([[(100, 10), (None, None)], [(300, 30), (400, 40)]]))
+
+    distances, durations = matrix.arrays(unreachable=-1)
+    assert distances.tolist() == [[100, -1], [300, 400]]
+    assert durations.tolist() == [[10, -1], [30, 40]]
+    assert matrix.statuses == {1: "ZERO_RESULTS"}
+    assert matrix.distances.dtype == np.int32
+
+def test_to_result_rebuilds_the_api_response():
+    result = _result([[(100, 10), (None, None)], [(1500, 3720), (400, 40)]])
+    rebuilt = CompactMatrix.from_result(["A", "B"], ["C", "D"], result).to_result()
+
+    assert rebuilt["origin_addresses"] == ["A", "B"]
+    assert rebuilt["rows"][0]["elements"][1] == {"status": "ZERO_RESULTS"}
+    element = rebuilt["rows"][1]["elements"][0]
+    assert element["distance"] == {"value": 1500, "text": "1.5 km"}
+    assert element["duration"] == {"value": 3720, "text": "1 hour 2 mins"}
+
+def test_from_result_rejects_failed_responses():
+    with pytest.raises(MapsApiError):
+        CompactMatrix.from_result(["A"], ["B"], {"status": "OVER_QUERY_LIMIT"})
+
+def test_assemble_places_tiles_and_marks_uncovered_elements():
+    top_right = CompactMatrix.from_result(["A"], ["B", "C"], _result([[(10, 1), (None, None)]]))
+    bottom_left = CompactMatrix.from_result(["B", "C"], ["A"], _result([[(20, 2)], [(30, 3)]]))
+
+    matrix = CompactMatrix.assemble(["A", "B", "C"], [(0, 1, top_right), (1, 0, bottom_left)])
+
+    distances, _ = matrix.arrays(unreachable=-1)
+    assert distances.tolist() == [[0, 10, -1], [20, 0, -1], [30, -1, 0]]
+    rebuilt = matrix.to_result()
+    assert rebuilt["rows"][0]["elements"][2]["status"] == "ZERO_RESULTS"
+    assert rebuilt["rows"][1]["elements"][2]["status"] == NOT_CALCULATED
+
+def test_take_selects_and_reorders_with_statuses():
+    matrix = CompactMatrix.from_result(
+        ["A", "B", "C"], ["A", "B", "C"],
+        _result([[(0, 0), (12, 1), (13, 1)], [(21, 2), (0, 0), (None, None)], [(31, 3), (32, 3), (0, 0)]])
+    )
+
+    part = matrix.take(["C", "B"], ["C", "B"])
+
+    assert part.origins == ["C", "B"]
+    distances, _ = part.arrays(unreachable=-1)
+    assert distances.tolist() == [[0, 32], [-1, 0]]
+    assert part.statuses == {2: "ZERO_RESULTS"}
+    assert matrix.take(matrix.origins, matrix.destinations) is matrix
+
+def test_cache_serialization_round_trip():
+    matrix = CompactMatrix.from_result(["A", "B"], ["C", "D"], _result([[(100, 10), (None, None)], [(300, 30), (400, 40)]]))
+
+    restored = deserialize(serialize(matrix))
+
+    assert isinstance(restored, CompactMatrix)
+    assert restored.origins == matrix.origins
+    assert restored.statuses == matrix.statuses
+    assert restored.fetched_at == matrix.fetched_at
+    assert np.array_equal(restored.distances, matrix.distances)
+    assert np.array_equal(restored.ok, matrix.ok)
@@ -0,0 +1,72 @@
+import io
+import pytest
+from app.models import Order
+from app.services import order_import
+from app.services.order_import import MalformedRecord, import_format, import_orders, read_records
+
+@pytest.fixture
+def queued(monkeypatch):
+    """Addresses queued for geocoding, instead of starting the worker"""
+    calls = []
+    monkeypatch.setattr(order_import, "enqueue_geocode", lambda entity, entity_id, address: calls.append((entity, entity_id, address)))
+    monkeypatch.setattr(order_import, "index_address", lambda address: None)
+    return calls
+
+def _stream(text):
+    return io.BytesIO(text.encode("utf-8"))
+
+@pytest.mark.parametrize("filename, content_type, expected", [
+    ("orders.CSV", None, "csv"),
+    ("orders.jsonl", None, "ndjson"),
+    ("orders.json", "text/csv", "json"),
+    (None, "application/x-ndjson; charset=utf-8", "ndjson"),
+    ("orders.xlsx", "application/octet-stream", None),
+])
+def test_import_format(filename, content_type, expected):
+    assert import_format(filename, content_type) == expected
+
+def test_read_records():
+    assert list(read_records(_stream("\ufeffaddress,load\n1 Main St,5\n"), "csv")) == [{"address": "1 Main St", "load": "5"}]
+    assert list(read_records(_stream('[{"address": "a"}, {"address": "b"}]'), "json")) == [{"address": "a"}, {"address": "b"}]
+    records = list(read_records(_stream('{"address": "a"}\n\n{broken\n'), "ndjson"))
+    assert records[0] == {"address": "a"}
+    assert isinstance(records[1], MalformedRecord)
+
+def test_json_array_split_across_reads(monkeypatch):
+    monkeypatch.setattr(order_import, "READ_SIZE", 7)
+    text = "[" + ", ".join(f'{{"address": "{i} Main St"}}' for i in range(5)) + "]"
+    assert [record["address"] for record in read_records(_stream(text), "json")] == [f"{i} Main St" for i in range(5)]
+
+def test_json_must_be_an_array():
+    with pytest.raises(ValueError):
+        list(read_records(_stream('{"address": "a"}'), "json"))
+
+def test_import_reports_bad_rows(db, queued):
+    text = "\n".join([
+        '{"address": "1 Main St", "start_time": "09:00", "load": "5 kg"}',
+        '{"customer_name": "No address"}',
+        "not json",
+        '{"address": "2 Main St", "phone": "' + "9" * 30 + '"}',
+        '{"address": "3 Main St", "order_number": 17}',
+    ])
+    result = import_orders(db, _stream(text), "ndjson", chunk_size=2)
+
+    assert result["imported"] == 2
+    assert result["failed"] == 3
+    assert [error["row"] for error in result["errors"]] == [2, 3, 4]
+    assert result["errors"][0]["error"] == "address: field required"
+    assert result["errors"][2]["error"] == "phone: longer than 20 characters"
+
+    orders = db.query(Order).order_by(Order.id).all()
+    assert [order.address for order in orders] == ["1 Main St", "3 Main St"]
+    assert orders[0].start_seconds == 9 * 3600
+    assert orders[0].load_value == 5
+    assert orders[1].order_number == "17"
+    assert [address for _, _, address in queued] == ["1 Main St", "3 Main St"]
+
+def test_unreadable_file_keeps_earlier_rows(db, queued):
+    result = import_orders(db, _stream('[{"address": "1 Main St"}, {"address": '), "json")
+    assert result["imported"] == 1
+    assert result["failed"] == 1
+    assert result["errors"][0]["row"] == 2
+    assert result["errors"][0]["error"].startswith("Could not read file")
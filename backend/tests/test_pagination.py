@@ -0,0 +1,52 @@
+import asyncio
+from datetime import datetime
+import pytest
+from sqlalchemy import select, update
+from app.database import AsyncSessionLocal
+from app.models import Order
+from app.services.pagination import PageParams, decode_cursor, encode_cursor, keyset_page
+
+def _page(**params):
+    values = {"limit": 2, "cursor": None, "order_by": "id", "created_after": None, "created_before": None, "skip": 0}
+    values.update(params)
+    return PageParams(**values)
+
+def _all_pages(order_by):
+    async def run():
+        seen, cursor = [], None
+        async with AsyncSessionLocal() as session:
+            while True:
+                rows, cursor = await keyset_page(session, select(Order), Order, _page(order_by=order_by, cursor=cursor))
+                seen += [row.id for row in rows]
+                if not cursor:
+                    return seen
+    return asyncio.run(run())
+
+def test_cursor_round_trip():
+    moment = datetime(2026, 1, 5, 12, 30)
+    assert decode_cursor(encode_cursor([moment, 7]), "created_at") == [moment, 7]
+    assert decode_cursor(encode_cursor([None, 7]), "created_at") == [None, 7]
+    assert decode_cursor(encode_cursor([42]), "id") == [42]
+
+@pytest.mark.parametrize("cursor, order_by", [
+    ("not base64!", "id"),
+    (encode_cursor([42]), "created_at"),
+    (encode_cursor(["2026-01-05", 7]), "id"),
+    (encode_cursor(["yesterday", 7]), "created_at"),
+    (encode_cursor(["42"]), "id"),
+])
+def test_invalid_cursors_are_rejected(cursor, order_by):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, order_by)
+
+def test_pages_cover_every_row_including_undated_ones(db):
+    db.add_all([Order(address=f"{i} Main St") for i in range(7)])
+    db.commit()
+    db.execute(update(Order).where(Order.id.in_([2, 5, 6])).values(created_at=None))
+    for order_id, day in [(1, 2), (3, 1), (4, 3), (7, 3)]:
+        db.execute(update(Order).where(Order.id == order_id).values(created_at=datetime(2026, 1, day)))
+    db.commit()
+
+    assert _all_pages("id") == [1, 2, 3, 4, 5, 6, 7]
+    # Undated rows come last, ties on created_at are broken by id
+    assert _all_pages("created_at") == [3, 1, 4, 7, 2, 5, 6]
@@ -0,0 +1,69 @@
+import asyncio
+from datetime import datetime
+from app.database import AsyncSessionLocal
+from app.models import RouteDetail, RouteHistory
+from app.services.analytics import get_route, list_routes, parse_route_fields
+from app.services.route_details import (
+    decode_polyline,
+    encode_polyline,
+    load_route_data,
+    pack_route_data,
+    save_route_data,
+    unpack_route_data
+)
+
+def test_polyline_matches_the_google_reference():
+    # Example from the Google encoded polyline algorithm documentation
+    points = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+    assert encode_polyline(points) == "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+    assert decode_polyline("_p~iF~ps|U_ulLnnqC_mqNvxq`@") == points
+
+def test_polyline_keeps_grid_precision():
+    points = [(52.520008, 13.404954), (-33.868820, 151.209296)]
+    decoded = decode_polyline(encode_polyline(points, precision=6), precision=6)
+    assert decoded == points
+
+def test_pack_splits_coordinates_from_the_rest():
+    route_data = {
+        "waypoints": [{"lat": 52.52001, "lng": 13.40495, "order_id": 7}, {"lat": 52.5, "lng": 13.4, "order_id": 8}],
+        "vehicle": "Van"
+    }
+    polyline, data = pack_route_data(route_data)
+
+    assert polyline is not None
+    assert unpack_route_data(polyline, data) == route_data
+
+def test_pack_stores_waypoints_without_coordinates_as_json():
+    route_data = {"waypoints": [{"lat": 52.5, "lng": 13.4}, {"address": "Unknown"}]}
+    polyline, data = pack_route_data(route_data)
+
+    assert polyline is None
+    assert unpack_route_data(polyline, data) == route_data
+    assert unpack_route_data(None, None) is None
+
+def test_route_data_is_only_loaded_when_selected(db):
+    route = RouteHistory(name="r", date_created=datetime(2026, 1, 5, 12), total_distance=3.5)
+    db.add(route)
+    db.flush()
+    route_data = {"waypoints": [{"lat": 52.5, "lng": 13.4}]}
+    save_route_data(db, route, route_data)
+    db.commit()
+    route_id = route.id
+
+    async def run():
+        async with AsyncSessionLocal() as session:
+            start, end = datetime(2026, 1, 1), datetime(2026, 1, 9)
+            listed = await list_routes(session, start, end, 10, parse_route_fields(None))
+            selected = await list_routes(session, start, end, 10, parse_route_fields("total_distance,route_data"))
+            return listed, selected, await get_route(session, route_id), await load_route_data(session, [route_id, 999])
+
+    listed, selected, detail, loaded = asyncio.run(run())
+    assert "route_data" not in listed[0]
+    assert selected[0]["route_data"] == route_data
+    assert set(selected[0]) == {"id", "name", "date_created", "total_distance", "route_data"}
+    assert detail["route_data"] == route_data
+    assert loaded == {route_id: route_data}
+
+    save_route_data(db, db.get(RouteHistory, route_id), None)
+    db.commit()
+    assert db.query(RouteDetail).count() == 0
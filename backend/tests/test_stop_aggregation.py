@@ -0,0 +1,53 @@
+from app.services.location_keys import canonical_address
+from app.services.stop_aggregation import aggregate_stops, expand_solution
+
+def test_canonical_address_abbreviates_street_designators():
+    assert canonical_address("12 Main Street") == canonical_address("12 main st.")
+    assert canonical_address("  12,  MAIN   St ") == canonical_address("12 Main Street")
+    assert canonical_address("12 Main Street") != canonical_address("14 Main Street")
+
+def test_stops_at_the_same_address_are_merged():
+    result = aggregate_stops(
+        ["Depot", "12 Main Street", "12 main st.", "5 Side Road"],
+        demands=[0, 2, 3, 1],
+        service_times=[0, 60, 120, 30]
+    )
+    assert result["groups"] == [[0], [1, 2], [3]]
+    assert result["demands"] == [0, 5, 1]
+    assert result["service_times"] == [0, 180, 30]
+    assert result["depot_index"] == 0
+
+def test_coordinates_take_precedence_over_addresses():
+    result = aggregate_stops(
+        ["Depot", "Gate A", "Gate B"],
+        coordinates=[None, (52.5, 13.4), (52.5, 13.4)]
+    )
+    assert result["groups"] == [[0], [1, 2]]
+
+def test_depot_is_never_merged():
+    result = aggregate_stops(["12 Main St", "12 Main St", "12 Main St"], depot_index=1)
+    assert result["groups"] == [[0, 2], [1]]
+    assert result["depot_index"] == 1
+
+def test_time_windows_are_intersected_and_disjoint_windows_kept_apart():
+    result = aggregate_stops(
+        ["Depot", "A", "A", "A"],
+        time_windows=[(0, 86400), (3600, 7200), (5400, 9000), (10000, 12000)]
+    )
+    assert result["groups"] == [[0], [1, 2], [3]]
+    assert result["time_windows"] == [(0, 86400), (5400, 7200), (10000, 12000)]
+
+def test_merged_demand_is_capped_at_the_largest_vehicle():
+    result = aggregate_stops(
+        ["Depot", "A", "A", "A"],
+        demands=[0, 6, 5, 4],
+        vehicle_capacities=[8, 10]
+    )
+    assert result["groups"] == [[0], [1, 3], [2]]
+    assert all(demand <= 10 for demand in result["demands"])
+
+def test_expand_solution_maps_nodes_back_to_original_stops():
+    groups = [[0], [1, 2], [3]]
+    result = {"status": "OK", "routes": [{"vehicle_id": 0, "route": [0, 1, 2, 0]}]}
+    expanded = expand_solution(result, groups)
+    assert expanded["routes"][0]["route"] == [0, 1, 2, 3, 0]
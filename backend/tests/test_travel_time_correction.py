@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta, timezone
+import math
+import time
+import numpy as np
+import pytest
+from app.models import RouteHistory, Vehicle
+from app.services.compact_matrix import CompactMatrix
+from app.services.travel_time_correction import (
+    ANY,
+    area_cell,
+    correct_time_matrix,
+    fit_correction_model,
+    lookup_factor,
+    time_bucket
+)
+
+def _element(seconds, traffic=None):
+    element = {"status": "OK", "distance": {"value": 1000}, "duration": {"value": seconds}}
+    if traffic is not None:
+        element["duration_in_traffic"] = {"value": traffic}
+    return element
+
+def test_time_bucket_is_taken_in_utc():
+    assert time_bucket(None) == ANY
+    assert time_bucket(datetime(2026, 1, 5, 7, 30)) == "2"
+    # 07:30 at UTC+5 is 02:30 UTC
+    assert time_bucket(datetime(2026, 1, 5, 7, 30, tzinfo=timezone(timedelta(hours=5)))) == "0"
+
+def test_area_cell_handles_missing_coordinates():
+    assert area_cell(None, 13.4) == ANY
+    assert area_cell(math.nan, 13.4) == ANY
+    assert area_cell(52.51, 13.41) == area_cell(52.52, 13.42)
+
+def test_fit_shrinks_sparse_keys_towards_their_parent(db):
+    van = Vehicle(plate_number="V1", type="Van")
+    db.add(van)
+    db.flush()
+    created = datetime(2026, 1, 5, 7, 0)
+    for _ in range(10):
+        db.add(RouteHistory(name="slow", date_created=created, total_duration=100, actual_completion_time=120, vehicle_id=van.id))
+    # Outside the plausible ratio range, ignored
+    db.add(RouteHistory(name="broken", date_created=created, total_duration=100, actual_completion_time=1000, vehicle_id=van.id))
+    db.commit()
+
+    model = fit_correction_model(db, min_samples=3)
+    factors = model["factors"]
+    overall = factors[f"{ANY}|{ANY}|{ANY}"]
+    assert 1.0 < overall < 1.2
+    # Each finer level moves further from the prior of 1.0 towards the observed 1.2
+    van_factor = factors[f"{ANY}|{ANY}|van"]
+    bucket_factor = factors[f"2|{ANY}|van"]
+    assert overall < van_factor < bucket_factor < 1.2
+
+def test_lookup_falls_back_to_coarser_keys():
+    model = {"factors": {f"{ANY}|{ANY}|van": 1.3, f"{ANY}|{ANY}|{ANY}": 1.1}}
+    assert lookup_factor(model, "2", "10:20", "van") == 1.3
+    assert lookup_factor(model, "2", "10:20", "truck") == 1.1
+    assert lookup_factor({"factors": {}}, "2", "10:20", "van") == 1.0
+
+def test_correct_time_matrix_scales_rows_by_origin_and_keeps_unreachable():
+    cell = area_cell(52.5, 13.4)
+    model = {"factors": {f"2|{cell}|van": 1.5, f"{ANY}|{ANY}|{ANY}": 1.0}}
+    matrix = np.array([[0, 100], [200, 999999]], dtype=np.int32)
+    departure = datetime(2026, 1, 5, 7, 0, tzinfo=timezone.utc)
+
+    corrected = correct_time_matrix(matrix, "van", departure, [(52.5, 13.4), None], model)
+
+    assert corrected.tolist() == [[0, 150], [200, 999999]]
+    assert corrected.dtype == matrix.dtype
+
+def test_correct_time_matrix_without_model_is_unchanged(tmp_path, monkeypatch):
+    from app.config import settings
+    monkeypatch.setattr(settings, "TRAVEL_TIME_CORRECTION_PATH", str(tmp_path / "missing.json"))
+    matrix = np.array([[0, 100], [100, 0]], dtype=np.int32)
+    assert correct_time_matrix(matrix) is matrix
+
+def test_live_traffic_requires_recent_traffic_durations():
+    result = {"status": "OK", "rows": [{"elements": [_element(100, traffic=160)]}]}
+    matrix = CompactMatrix.from_result(["A"], ["B"], result)
+    assert matrix.has_live_traffic(900)
+    assert matrix.arrays(traffic=True)[1].tolist() == [[160]]
+    assert matrix.arrays()[1].tolist() == [[100]]
+
+    matrix.fetched_at = time.time() - 3600
+    assert not matrix.has_live_traffic(900)
+
+    free_flow = CompactMatrix.from_result(["A"], ["B"], {"status": "OK", "rows": [{"elements": [_element(100)]}]})
+    assert not free_flow.has_live_traffic(900)
+
+@pytest.mark.parametrize("second_has_traffic", [True, False])
+def test_assembled_matrix_keeps_traffic_only_if_every_tile_has_it(second_has_traffic):
+    first = CompactMatrix.from_result(["A"], ["B"], {"status": "OK", "rows": [{"elements": [_element(100, traffic=150)]}]})
+    second = CompactMatrix.from_result(
+        ["B"], ["A"],
+        {"status": "OK", "rows": [{"elements": [_element(90, traffic=120 if second_has_traffic else None)]}]}
+    )
+    first.fetched_at, second.fetched_at = 2000.0, 1000.0
+
+    matrix = CompactMatrix.assemble(["A", "B"], [(0, 1, first), (1, 0, second)])
+
+    assert matrix.fetched_at == 1000.0
+    assert (matrix.durations_in_traffic is not None) == second_has_traffic
@@ -10,15 +10,21 @@ export interface OrdersListRef {
   fetchOrders: () => Promise<void>
 }
 
+// Orders loaded per page
+const ORDERS_PAGE_SIZE = 100
+
 export const OrdersList = forwardRef<OrdersListRef>((props, ref) => {
   const [orders, setOrders] = useState<Order[]>([])
   const [loading, setLoading] = useState(true)
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [loadingMore, setLoadingMore] = useState(false)
 
   const fetchOrders = async () => {
     try {
       setLoading(true)
-      const data = await ordersAPI.getAll()
-      setOrders(data)
+      const page = await ordersAPI.getPage({ limit: ORDERS_PAGE_SIZE })
+      setOrders(page.items)
+      setNextCursor(page.nextCursor)
     } catch (error) {
       console.error("Failed to fetch orders:", error)
       toast.error("Failed to fetch orders")
@@ -27,6 +33,24 @@ export const OrdersList = forwardRef<OrdersListRef>((props, ref) => {
     }
   }
 
+  const fetchMoreOrders = async () => {
+    if (!nextCursor) {
+      return
+    }
+
+    try {
+      setLoadingMore(true)
+      const page = await ordersAPI.getPage({ limit: ORDERS_PAGE_SIZE, cursor: nextCursor })
+      setOrders(current => [...current, ...page.items])
+      setNextCursor(page.nextCursor)
+    } catch (error) {
+      console.error("Failed to fetch orders:", error)
+      toast.error("Failed to fetch orders")
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   // Expose fetchOrders method to parent components
   useImperativeHandle(ref, () => ({
     fetchOrders
@@ -135,6 +159,13 @@ export const OrdersList = forwardRef<OrdersListRef>((props, ref) => {
             ))}
           </div>
         )}
+        {!loading && nextCursor && (
+          <div className="text-center pt-4">
+            <Button variant="outline" onClick={fetchMoreOrders} disabled={loadingMore}>
+              {loadingMore ? "Loading..." : "Load more"}
+            </Button>
+          </div>
+        )}
       </CardContent>
     </Card>
   )
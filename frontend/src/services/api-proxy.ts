@@ -72,9 +72,18 @@ export interface VRPRequest {
   max_time_per_vehicle?: number[];
 }
 
+export interface SolveFromDbRequest {
+  depot_id: number;
+  vehicle_ids: number[];
+  order_ids?: number[];
+  order_date?: string; // YYYY-MM-DD
+  aggregate_colocated?: boolean;
+}
+
 export interface RouteStop {
   location_index: number;
   address: string;
+  order_id?: number;
 }
 
 export interface Route {
@@ -147,4 +156,10 @@ export const vrpAPI = {
       method: 'POST',
       body: JSON.stringify(data),
     }),
+    
+  solveFromDb: (data: SolveFromDbRequest) => 
+    fetchAPI<VRPResponse>('/vrp/solve-from-db', {
+      method: 'POST',
+      body: JSON.stringify(data),
+    }),
 }; 
\ No newline at end of file
@@ -47,6 +47,60 @@ async function fetchAPI<T>(
   }
 }
 
+// Largest page the list endpoints return
+const PAGE_SIZE = 1000;
+
+// Paging and created date filters shared by the list endpoints
+export interface PageQuery {
+  limit?: number;
+  cursor?: string | null;
+  order_by?: 'id' | 'created_at';
+  created_after?: string;
+  created_before?: string;
+}
+
+export interface Page<T> {
+  items: T[];
+  // Cursor of the next page, null on the last page
+  nextCursor: string | null;
+}
+
+// Fetch one page of a keyset-paginated list; pass nextCursor back in the
+// query to load the following page
+async function fetchPage<T>(endpoint: string, query: PageQuery = {}): Promise<Page<T>> {
+  const params = new URLSearchParams();
+  Object.entries(query).forEach(([key, value]) => {
+    if (value !== undefined && value !== null && value !== '') {
+      params.set(key, String(value));
+    }
+  });
+  const url = `${API_URL}${endpoint}?${params.toString()}`;
+
+  let response: Response;
+  try {
+    response = await fetch(url, { headers: { 'Content-Type': 'application/json' } });
+  } catch (error) {
+    console.error(`Network error when connecting to ${url}. Is the backend server running?`);
+    throw new Error(`Could not connect to server. Please ensure the backend is running at ${API_URL}`);
+  }
+
+  if (!response.ok) {
+    const errorData = await response.json().catch(() => ({ detail: "Unknown error occurred" }));
+    throw new Error(errorData.detail || 'An error occurred');
+  }
+
+  return {
+    items: await response.json() as T[],
+    nextCursor: response.headers.get('X-Next-Cursor'),
+  };
+}
+
+// First page of a list, up to PAGE_SIZE rows unless the query sets a limit
+async function fetchFirstPage<T>(endpoint: string, query: PageQuery = {}): Promise<T[]> {
+  const page = await fetchPage<T>(endpoint, { limit: PAGE_SIZE, ...query });
+  return page.items;
+}
+
 // Orders API
 export interface Order {
   id?: number;
@@ -67,8 +121,14 @@ export interface Order {
   place_id?: string;
 }
 
+export interface OrderQuery extends PageQuery {
+  geocoded?: boolean;
+  search?: string;
+}
+
 export const ordersAPI = {
-  getAll: () => fetchAPI<Order[]>('/orders'),
+  getPage: (query: OrderQuery = {}) => fetchPage<Order>('/orders/', query),
+  getAll: (query: OrderQuery = {}) => fetchFirstPage<Order>('/orders/', query),
   getById: (id: number) => fetchAPI<Order>(`/orders/${id}`),
   create: (data: Order) => fetchAPI<Order>('/orders', {
     method: 'POST',
@@ -93,8 +153,13 @@ export interface Vehicle {
   updated_at?: string;
 }
 
+export interface VehicleQuery extends PageQuery {
+  type?: string;
+}
+
 export const vehiclesAPI = {
-  getAll: () => fetchAPI<Vehicle[]>('/vehicles'),
+  getPage: (query: VehicleQuery = {}) => fetchPage<Vehicle>('/vehicles/', query),
+  getAll: (query: VehicleQuery = {}) => fetchFirstPage<Vehicle>('/vehicles/', query),
   getById: (id: number) => fetchAPI<Vehicle>(`/vehicles/${id}`),
   create: (data: Vehicle) => fetchAPI<Vehicle>('/vehicles', {
     method: 'POST',
@@ -121,8 +186,13 @@ export interface Driver {
   updated_at?: string;
 }
 
+export interface DriverQuery extends PageQuery {
+  search?: string;
+}
+
 export const driversAPI = {
-  getAll: () => fetchAPI<Driver[]>('/drivers'),
+  getPage: (query: DriverQuery = {}) => fetchPage<Driver>('/drivers/', query),
+  getAll: (query: DriverQuery = {}) => fetchFirstPage<Driver>('/drivers/', query),
   getById: (id: number) => fetchAPI<Driver>(`/drivers/${id}`),
   create: (data: Driver) => fetchAPI<Driver>('/drivers', {
     method: 'POST',
@@ -151,8 +221,13 @@ export interface Depot {
   place_id?: string;
 }
 
+export interface DepotQuery extends PageQuery {
+  status?: string;
+}
+
 export const depotsAPI = {
-  getAll: () => fetchAPI<Depot[]>('/depots'),
+  getPage: (query: DepotQuery = {}) => fetchPage<Depot>('/depots/', query),
+  getAll: (query: DepotQuery = {}) => fetchFirstPage<Depot>('/depots/', query),
   getById: (id: number) => fetchAPI<Depot>(`/depots/${id}`),
   create: (data: Depot) => fetchAPI<Depot>('/depots', {
     method: 'POST',